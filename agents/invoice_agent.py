@@ -1,52 +1,120 @@
-from langchain_core.tools import tool
+from datetime import date
+from typing import Optional
+
 from langgraph.prebuilt import create_react_agent
 from langchain_core.messages import SystemMessage
 
-from config import llm, checkpointer, store, db
+from config import get_llm, LazyResource, sub_agent_checkpointer, store, history_policy
+from schemas import State
+from history import build_llm_messages
+from database import sql_tool, fetch_rows, QueryResult
+from queries import (INVOICES_BY_DATE, INVOICES_BY_UNIT_PRICE, INVOICE_TOTALS_BY_MONTH,
+                     EMPLOYEE_BY_INVOICE_AND_CUSTOMER)
+
+
+# Upper bound on rows a single tool call may return to the LLM
+MAX_PAGE_SIZE = 50
+
+
+def _invoice_parameters(customer_id: str, start_date: Optional[str], end_date: Optional[str]) -> dict:
+    """Validate tool arguments into query parameters.
+
+    Raises:
+        ValueError: If the customer ID or a date is malformed.
+    """
+    for value in (start_date, end_date):
+        if value:
+            date.fromisoformat(value)
+    return {"customer_id": int(customer_id),
+            "start_date": start_date or None,
+            "end_date": end_date or None}
+
+
+@sql_tool
+def get_invoices_by_customer_sorted_by_date(customer_id: str, limit: int = 10, offset: int = 0,
+                                            start_date: Optional[str] = None,
+                                            end_date: Optional[str] = None) -> str:
+    """Retrieve a page of a customer's invoices, sorted by invoice date (newest first).
+
+    Args:
+        customer_id (str): The unique identifier of the customer.
+        limit (int): Maximum number of invoices to return (at most 50).
+        offset (int): Number of invoices to skip, for fetching the next page.
+        start_date (str, optional): Only invoices on or after this date (YYYY-MM-DD).
+        end_date (str, optional): Only invoices on or before this date (YYYY-MM-DD).
+
+    Returns:
+        str: A tab-separated table of invoices sorted by date in descending order,
+        followed by a hint when more pages are available.
+    """
+    try:
+        parameters = _invoice_parameters(customer_id, start_date, end_date)
+    except ValueError:
+        return "Invalid customer ID or date format. Dates must be YYYY-MM-DD."
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = max(0, offset)
+    # Fetch one extra row to know whether another page exists
+    result = fetch_rows(INVOICES_BY_DATE, {**parameters, "limit": limit + 1, "offset": offset})
+    if not result:
+        return "No invoices found for this customer."
+
+    page = QueryResult(result.columns, result.rows[:limit])
+    if len(result) > limit:
+        return f"{page.to_table()}\nMore invoices available: call again with offset={offset + limit}."
+    return page.to_table()
 
 
-@tool
-def get_invoices_by_customer_sorted_by_date(customer_id: str) -> str:
-    """Retrieve all invoices for a customer, sorted by invoice date (newest first).
+@sql_tool
+def get_invoices_sorted_by_unit_price(customer_id: str, limit: int = 10,
+                                      start_date: Optional[str] = None,
+                                      end_date: Optional[str] = None) -> str:
+    """Fetch a customer's most expensive invoice lines, sorted by unit price (highest first).
 
     Args:
         customer_id (str): The unique identifier of the customer.
+        limit (int): Number of top lines to return (at most 50).
+        start_date (str, optional): Only invoices on or after this date (YYYY-MM-DD).
+        end_date (str, optional): Only invoices on or before this date (YYYY-MM-DD).
 
     Returns:
-        str: A list of invoices sorted by date in descending order.
+        str: A tab-separated table of invoice lines with track and unit price, sorted by unit price descending.
     """
-    query = """
-            SELECT *
-            FROM "Invoice"
-            WHERE "CustomerId" = %(customer_id)s
-            ORDER BY "InvoiceDate" DESC
-            """
-    parameters = {"customer_id": int(customer_id)}
-    return db.run(query, parameters=parameters)
+    try:
+        parameters = _invoice_parameters(customer_id, start_date, end_date)
+    except ValueError:
+        return "Invalid customer ID or date format. Dates must be YYYY-MM-DD."
+
+    parameters["limit"] = max(1, min(limit, MAX_PAGE_SIZE))
+    result = fetch_rows(INVOICES_BY_UNIT_PRICE, parameters)
+    return result.to_table() if result else "No invoices found for this customer."
+
 
+@sql_tool
+def get_invoice_totals_by_month(customer_id: str, start_date: Optional[str] = None,
+                                end_date: Optional[str] = None) -> str:
+    """Summarize a customer's spending per month: number of invoices and total amount.
 
-@tool
-def get_invoices_sorted_by_unit_price(customer_id: str) -> str:
-    """Fetch all invoices for a customer, sorted by unit price (highest first).
+    Use this for questions about spending over time instead of listing every invoice.
 
     Args:
         customer_id (str): The unique identifier of the customer.
+        start_date (str, optional): Only invoices on or after this date (YYYY-MM-DD).
+        end_date (str, optional): Only invoices on or before this date (YYYY-MM-DD).
 
     Returns:
-        str: Invoices with unit price information, sorted by unit price descending.
+        str: A tab-separated table of months (newest first) with invoice counts and totals.
     """
-    query = """
-            SELECT "Invoice".*, "InvoiceLine"."UnitPrice"
-            FROM "Invoice"
-            JOIN "InvoiceLine" ON "Invoice"."InvoiceId" = "InvoiceLine"."InvoiceId"
-            WHERE "Invoice"."CustomerId" = %(customer_id)s
-            ORDER BY "InvoiceLine"."UnitPrice" DESC
-            """
-    parameters = {"customer_id": int(customer_id)}
-    return db.run(query, parameters=parameters)
-
-
-@tool
+    try:
+        parameters = _invoice_parameters(customer_id, start_date, end_date)
+    except ValueError:
+        return "Invalid customer ID or date format. Dates must be YYYY-MM-DD."
+
+    result = fetch_rows(INVOICE_TOTALS_BY_MONTH, parameters)
+    return result.to_table() if result else "No invoices found for this customer."
+
+
+@sql_tool
 def get_employee_by_invoice_and_customer(invoice_id: str, customer_id: str) -> str:
     """Find the employee associated with a specific invoice and customer.
 
@@ -61,22 +129,13 @@ def get_employee_by_invoice_and_customer(invoice_id: str, customer_id: str) -> s
     if not invoice_id or not customer_id:
         return "Both invoice ID and customer ID are required"
 
-    query = """
-            SELECT "Employee"."FirstName", "Employee"."Title", "Employee"."Email"
-            FROM "Employee"
-            JOIN "Customer" ON "Customer"."SupportRepId" = "Employee"."EmployeeId"
-            JOIN "Invoice" ON "Invoice"."CustomerId" = "Customer"."CustomerId"
-            WHERE "Invoice"."InvoiceId" = %(invoice_id)s
-              AND "Invoice"."CustomerId" = %(customer_id)s
-            """
-    
     try:
         parameters = {"invoice_id": int(invoice_id), "customer_id": int(customer_id)}
-        result = db.run(query, parameters=parameters)
+        result = fetch_rows(EMPLOYEE_BY_INVOICE_AND_CUSTOMER, parameters)
         
         # Return appropriate message based on result
-        if result and result != "[]":
-            return result
+        if result:
+            return result.to_table()
         else:
             return "No employee information found for that invoice."
             
@@ -89,6 +148,7 @@ def get_employee_by_invoice_and_customer(invoice_id: str, customer_id: str) -> s
 # Available tools for the invoice agent
 invoice_tools = [get_invoices_by_customer_sorted_by_date,
                  get_invoices_sorted_by_unit_price,
+                 get_invoice_totals_by_month,
                  get_employee_by_invoice_and_customer]
 
 # System prompt defining the agent's role and capabilities
@@ -97,8 +157,9 @@ You are the invoice-information specialist. Your goal is to answer invoice-relat
 The customer's ID is available in the state under the 'customer_id' key. You must use this ID for all tool calls.
 
 TOOLS
-- get_invoices_by_customer_sorted_by_date
-- get_invoices_sorted_by_unit_price
+- get_invoices_by_customer_sorted_by_date (paginated; use offset to fetch more, dates to narrow down)
+- get_invoices_sorted_by_unit_price (top-N most expensive lines)
+- get_invoice_totals_by_month (spending per month; prefer it for totals and trends)
 - get_employee_by_invoice_and_customer
 
 CORE RESPONSIBILITIES
@@ -109,13 +170,37 @@ If the data cannot be retrieved, apologize and ask if the customer would like to
 """
 
 
+def prepare_invoice_model_input(state: State) -> dict:
+    """Build the invoice agent's LLM input from the prompt, summary and trimmed history.
+
+    Args:
+        state (State): The current conversation state.
+
+    Returns:
+        dict: The messages to send to the LLM under ``llm_input_messages``.
+    """
+    prompt = f"{invoice_subagent_prompt}\nThe customer's ID is {state.get('customer_id')}."
+    return {"llm_input_messages": build_llm_messages(state, prompt, history_policy)}
+
+
+# Bound on first use, so building the agent does not create the LLM client
+llm_with_invoice_tools = LazyResource("llm_with_invoice_tools", lambda: get_llm(cache=False).bind_tools(invoice_tools))
+
+
+def _invoice_model(state: State, runtime):
+    """Model for ``create_react_agent``, resolved when the agent first runs."""
+    return llm_with_invoice_tools.resolve()
+
+
 def create_invoice_agent():
     """Create and configure the invoice-information sub-agent.
 
     Returns:
         The configured invoice agent ready to process queries.
     """
-    return create_react_agent(llm,
+    return create_react_agent(_invoice_model,
                               tools=invoice_tools,
-                              checkpointer=checkpointer,
+                              state_schema=State,
+                              pre_model_hook=prepare_invoice_model_input,
+                              checkpointer=sub_agent_checkpointer,
                               name='invoice_agent')
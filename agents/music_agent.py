@@ -1,27 +1,63 @@
-from langchain_core.tools import tool
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
-from langchain_core.messages import SystemMessage, AIMessage
+from langchain_core.messages import AIMessage
 import json
+from typing import Optional
 
-from config import llm, checkpointer, store, db, vector_retriever
+from config import (get_llm, LazyResource, sub_agent_checkpointer, store, vector_retriever, history_policy, engine,
+                    embedding_function, llm_flight, tool_flight, MUSIC_SEARCH_K, MUSIC_SEARCH_MAX_K, MUSIC_SEARCH_RRF_K,
+                    CATALOG_SYNC_BATCH_SIZE, CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL, CATALOG_CACHE_CHECK_INTERVAL,
+                    EMBEDDING_CACHE_LOWERCASE)
 from schemas import State
-
-
-@tool
-def search_for_music(query: str) -> str:
+from retrieval import HybridRetriever
+from catalog_sync import CatalogSync
+from catalog_cache import CatalogResultCache
+from cache import LRUCache
+from history import build_llm_messages
+from database import sql_tool, fetch_rows
+from instrumentation import instrumented_tool
+from llm_cache import ainvoke_coalesced
+from utils import offloaded_tool
+from queries import ALBUMS_BY_ARTIST
+
+
+# Lexical name index fused with the vector store
+music_retriever = HybridRetriever(vector_retriever, k=MUSIC_SEARCH_K, rrf_k=MUSIC_SEARCH_RRF_K)
+
+# Results of the catalog tools and the lexical index, dropped whenever the catalog is reseeded or synced
+catalog_cache = CatalogResultCache(LRUCache(maxsize=CATALOG_CACHE_SIZE, ttl=CATALOG_CACHE_TTL), store,
+                                   check_interval=CATALOG_CACHE_CHECK_INTERVAL,
+                                   on_invalidate=music_retriever.refresh)
+
+# Keeps the vector store in step with catalog edits; run as a background task
+catalog_sync = CatalogSync(engine, vector_retriever, embedding_function, store,
+                           batch_size=CATALOG_SYNC_BATCH_SIZE, on_change=catalog_cache.invalidate)
+
+
+@offloaded_tool(coalesce=tool_flight)
+@instrumented_tool
+# Case only matters to the search if the embedding model is cased
+@catalog_cache.cached(casefold=("query",) if EMBEDDING_CACHE_LOWERCASE else ())
+def search_for_music(query: str, genre: Optional[str] = None, min_price: Optional[float] = None,
+                     max_price: Optional[float] = None, k: Optional[int] = None) -> str:
     """Search for tracks, artists, albums, or genres in the music catalog.
 
     Use this for any music-related questions such as finding songs, getting recommendations,
-    or checking for artists.
+    or checking for artists. Exact track, artist or album names work best on their own.
 
     Args:
         query (str): The search query for music content.
+        genre (str, optional): Only return tracks of this genre, e.g. "Rock" or "Jazz".
+        min_price (float, optional): Only return tracks costing at least this much.
+        max_price (float, optional): Only return tracks costing at most this much.
+        k (int, optional): Number of results to return.
 
     Returns:
         str: JSON formatted search results or a message indicating no results found.
     """
-    retrieved_docs = vector_retriever.similarity_search(query, k=5)
+    k = max(1, min(k or MUSIC_SEARCH_K, MUSIC_SEARCH_MAX_K))
+    retrieved_docs = music_retriever.search(query, k=k, genre=genre,
+                                            min_price=min_price, max_price=max_price)
     
     # Handle case when no results are found
     if not retrieved_docs:
@@ -33,7 +69,8 @@ def search_for_music(query: str) -> str:
     return formatted_results
 
 
-@tool
+@sql_tool
+@catalog_cache.cached(casefold=("artist",))
 def get_albums_by_artist(artist: str) -> str:
     """Get all albums by a specific artist.
 
@@ -43,22 +80,16 @@ def get_albums_by_artist(artist: str) -> str:
         artist (str): The name of the artist to search for.
 
     Returns:
-        str: List of album titles or an error message.
+        str: A table of album titles or an error message.
     """
     # Validate artist name is provided
     if not artist or not artist.strip():
         return "Artist name required"
 
-    query = """
-            SELECT "Album"."Title"
-            FROM "Album"
-            JOIN "Artist" ON "Album"."ArtistId" = "Artist"."ArtistId"
-            WHERE "Artist"."Name" ILIKE %(artist_name)s
-            """
-    
     search_pattern = f"%{artist.strip()}%"
     parameters = {"artist_name": search_pattern}
-    return db.run(query, parameters=parameters)
+    result = fetch_rows(ALBUMS_BY_ARTIST, parameters)
+    return result.to_table() if result else f"No albums found for {artist.strip()}."
 
 
 # Available tools for the music agent
@@ -66,7 +97,7 @@ music_tools = [search_for_music, get_albums_by_artist]
 
 # Create tool node and bind tools to LLM
 music_tool_node = ToolNode(music_tools)
-llm_with_music_tools = llm.bind_tools(music_tools)
+llm_with_music_tools = LazyResource("llm_with_music_tools", lambda: get_llm(cache=False).bind_tools(music_tools))
 
 
 async def music_assistant_agent(state: State):
@@ -87,8 +118,8 @@ Use the `search_for_music` tool for general queries, recommendations, or finding
 Only use `get_albums_by_artist` when a user specifically asks for an artist's discography or albums.
     """
     
-    messages = [SystemMessage(content=music_assistant_prompt)] + state["messages"]
-    response = await llm_with_music_tools.ainvoke(messages)
+    messages = build_llm_messages(state, music_assistant_prompt, history_policy)
+    response = await ainvoke_coalesced(llm_with_music_tools, messages, "music_agent", llm_flight)
     return {"messages": [response]}
 
 
@@ -128,4 +159,4 @@ def create_music_agent_graph():
                                 {"continue": "tools", "end": END})
     graph.add_edge("tools", "agent")
     
-    return graph.compile(checkpointer=checkpointer)
+    return graph.compile(checkpointer=sub_agent_checkpointer)
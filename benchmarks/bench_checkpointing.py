@@ -0,0 +1,116 @@
+"""
+Measure checkpoint bytes and serialization time per turn for each sub-agent
+checkpoint mode.
+
+Builds a parent graph shaped like ``workflow.multi_agent_final_graph`` (a
+routing step into a tool-looping sub-agent) with scripted nodes instead of
+LLM calls, then replays a conversation through it with every value of
+``SUBAGENT_CHECKPOINT_MODE`` and both durability settings. All serialization
+goes through a counting serializer, so the numbers reflect exactly what a
+persistent backend would write.
+
+Usage:
+    poetry run python -m benchmarks.bench_checkpointing [--turns 20]
+"""
+import argparse
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import END, START, StateGraph
+
+from checkpointing import SUBAGENT_CHECKPOINT_MODES, resolve_subagent_checkpointer
+from schemas import State
+
+TOOL_RESULT = "Track: Bohemian Rhapsody\nArtist: Queen\nAlbum: A Night at the Opera\n" * 5
+
+
+class CountingSerializer:
+    """Serializer wrapper recording bytes produced and time spent."""
+
+    def __init__(self):
+        self.inner = JsonPlusSerializer()
+        self.reset()
+
+    def reset(self):
+        self.bytes_written = 0
+        self.seconds = 0.0
+        self.calls = 0
+
+    def dumps_typed(self, obj):
+        start = time.perf_counter()
+        type_, data = self.inner.dumps_typed(obj)
+        self.seconds += time.perf_counter() - start
+        self.bytes_written += len(data)
+        self.calls += 1
+        return type_, data
+
+    def loads_typed(self, data):
+        return self.inner.loads_typed(data)
+
+
+def build_sub_agent(checkpointer):
+    """A two-step agent/tools loop like the music sub-agent."""
+    def agent(state):
+        if isinstance(state["messages"][-1], ToolMessage):
+            return {"messages": [AIMessage(content="Here is what I found.")]}
+        call = {"name": "search_for_music", "args": {"query": "queen"}, "id": f"call-{len(state['messages'])}"}
+        return {"messages": [AIMessage(content="", tool_calls=[call])]}
+
+    def tools(state):
+        call_id = state["messages"][-1].tool_calls[0]["id"]
+        return {"messages": [ToolMessage(content=TOOL_RESULT, tool_call_id=call_id)]}
+
+    graph = StateGraph(State)
+    graph.add_node("agent", agent)
+    graph.add_node("tools", tools)
+    graph.add_edge(START, "agent")
+    graph.add_conditional_edges("agent", lambda s: "tools" if s["messages"][-1].tool_calls else END)
+    graph.add_edge("tools", "agent")
+    return graph.compile(checkpointer=checkpointer)
+
+
+def build_parent(saver, mode):
+    graph = StateGraph(State)
+    graph.add_node("music_agent", build_sub_agent(resolve_subagent_checkpointer(mode, saver)))
+    graph.add_edge(START, "music_agent")
+    graph.add_edge("music_agent", END)
+    return graph.compile(checkpointer=saver)
+
+
+async def measure(mode, durability, turns):
+    serde = CountingSerializer()
+    graph = build_parent(MemorySaver(serde=serde), mode)
+    config = {"configurable": {"thread_id": f"bench-{mode}-{durability}"}}
+
+    start = time.perf_counter()
+    for turn in range(turns):
+        await graph.ainvoke({"messages": [HumanMessage(content=f"Songs by Queen, take {turn}")]},
+                            config, durability=durability)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "kb_per_turn": serde.bytes_written / turns / 1024,
+        "serialize_ms_per_turn": serde.seconds / turns * 1000,
+        "dumps_per_turn": serde.calls / turns,
+        "turn_ms": elapsed / turns * 1000,
+    }
+
+
+async def run_benchmark(turns):
+    print(f"{turns} turns per run\n")
+    print(f"{'mode':>9} {'durability':>10} {'KB/turn':>9} {'ser ms/turn':>12} {'dumps/turn':>11} {'turn ms':>8}")
+    for durability in ("async", "exit"):
+        for mode in SUBAGENT_CHECKPOINT_MODES:
+            stats = await measure(mode, durability, turns)
+            print(f"{mode:>9} {durability:>10} {stats['kb_per_turn']:9.1f} "
+                  f"{stats['serialize_ms_per_turn']:12.2f} {stats['dumps_per_turn']:11.1f} {stats['turn_ms']:8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.turns))
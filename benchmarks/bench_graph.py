@@ -0,0 +1,249 @@
+"""
+Offline benchmark of the full multi-agent graph.
+
+Replays the recorded conversations in ``benchmarks/fixtures/graph_traces.jsonl``
+through ``workflow.multi_agent_final_graph`` with the stand-ins from
+``benchmarks/offline.py``: a scripted chat model with a fixed delay per call,
+a seeded in-memory catalog instead of Postgres and fake embeddings. Reports
+per-node latency percentiles, turn throughput at each concurrency level and
+memory allocated per turn. No network access or API key is needed, and the
+same arguments give comparable numbers, so it can be run for every change.
+
+Fake embeddings carry no meaning, so the local intent classifier is bypassed
+and routing goes through the scripted LLM; ``bench_intent_classifier``
+covers the classifier itself.
+
+Usage:
+    poetry run python -m benchmarks.bench_graph [--llm-latency-ms 100] [--concurrency 1 4 16]
+                                                [--repeat 3] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from langchain_core.stores import InMemoryByteStore
+
+from benchmarks import offline
+
+TRACES = os.path.join(os.path.dirname(__file__), "fixtures", "graph_traces.jsonl")
+
+
+def load_traces(path=TRACES):
+    """Load ``{"id", "turns"}`` conversations from a JSON-lines file."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` for ``q`` in [0, 100]."""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))]
+
+
+def summarize(seconds):
+    """Count and millisecond percentiles of a list of durations."""
+    return {"count": len(seconds),
+            "p50_ms": percentile(seconds, 50) * 1000,
+            "p90_ms": percentile(seconds, 90) * 1000,
+            "p99_ms": percentile(seconds, 99) * 1000,
+            "max_ms": max(seconds) * 1000}
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Callback handler recording the wall time of every graph node run.
+
+    Sub-agent nodes are labelled with their parent, e.g. ``music_agent/tools``.
+    Conditional edges run inside their source node, so ``summarize_history``
+    includes the router.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self.started = {}
+        self.timings = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            namespace = metadata.get("langgraph_checkpoint_ns", node)
+            label = "/".join(part.split(":")[0] for part in namespace.split("|"))
+            # A named sub-agent graph starts a second run inside its node; count the node once
+            if self.started.get(parent_run_id, (None,))[0] != label:
+                self.started[run_id] = (label, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        entry = self.started.pop(run_id, None)
+        if entry:
+            self.timings[entry[0]].append(time.perf_counter() - entry[1])
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.started.pop(run_id, None)
+
+
+class GraphBenchmark:
+    """Replays traces through the graph and collects the measurements."""
+
+    def __init__(self, traces, durability="exit"):
+        import workflow
+        from agents.music_agent import catalog_cache
+
+        self.workflow = workflow
+        self.catalog_cache = catalog_cache
+        self.graph = workflow.multi_agent_final_graph
+        self.traces = traces
+        self.durability = durability
+        self.diverged = []
+        # Fake embeddings would make the local classifier's answers arbitrary
+        workflow.intent_classifier.confidence_threshold = float("inf")
+
+    def reset_caches(self):
+        """Start every pass from the same cold caches."""
+        self.workflow.route_cache.clear()
+        self.workflow.customer_lookup.cache.clear()
+        self.workflow.verified_identities.store = InMemoryByteStore()
+        self.catalog_cache.invalidate()
+
+    async def replay(self, trace, callbacks=(), on_turn=None):
+        """Run one conversation on a fresh thread; return each turn's latency."""
+        config = {"configurable": {"thread_id": f"{trace['id']}-{uuid.uuid4()}"}, "callbacks": list(callbacks)}
+        latencies = []
+        for turn in trace["turns"]:
+            start = time.perf_counter()
+            result = await self.graph.ainvoke({"messages": [HumanMessage(content=turn["user"])]}, config,
+                                              durability=self.durability)
+            latencies.append(time.perf_counter() - start)
+            if on_turn:
+                on_turn()
+            if result["messages"][-1].content != turn["answer"]:
+                self.diverged.append(f"{trace['id']}: {turn['user']!r}")
+        return latencies
+
+    async def node_latencies(self, repeat):
+        """Per-node latency percentiles over sequential replays."""
+        self.reset_caches()
+        timer = NodeTimer()
+        for _ in range(repeat):
+            for trace in self.traces:
+                await self.replay(trace, callbacks=[timer])
+        return {label: summarize(seconds) for label, seconds in sorted(timer.timings.items())}
+
+    async def throughput(self, concurrency, repeat):
+        """Turns per second with ``concurrency`` conversations in flight."""
+        self.reset_caches()
+        queue = asyncio.Queue()
+        for _ in range(repeat):
+            for trace in self.traces:
+                queue.put_nowait(trace)
+        latencies = []
+
+        async def worker():
+            while not queue.empty():
+                latencies.extend(await self.replay(queue.get_nowait()))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        return {"concurrency": concurrency,
+                "turns": len(latencies),
+                "turns_per_second": len(latencies) / elapsed,
+                "p50_turn_ms": percentile(latencies, 50) * 1000,
+                "p95_turn_ms": percentile(latencies, 95) * 1000}
+
+    async def allocations(self, top):
+        """Memory allocated per turn and the lines allocating the most."""
+        self.reset_caches()
+        peaks, retained = [], []
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        baseline = [tracemalloc.get_traced_memory()[0]]
+
+        def record_turn():
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline[0])
+            retained.append(current - baseline[0])
+            tracemalloc.reset_peak()
+            baseline[0] = current
+
+        for trace in self.traces:
+            await self.replay(trace, on_turn=record_turn)
+        stats = tracemalloc.take_snapshot().compare_to(before, "lineno")
+        tracemalloc.stop()
+
+        return {"peak_kb_per_turn_p50": percentile(peaks, 50) / 1024,
+                "peak_kb_per_turn_max": max(peaks) / 1024,
+                "retained_kb_per_turn": sum(retained) / len(retained) / 1024,
+                "top_sites": [{"site": str(stat.traceback), "kb": stat.size_diff / 1024, "blocks": stat.count_diff}
+                              for stat in stats[:top]]}
+
+
+async def run_benchmark(args):
+    traces = load_traces(args.traces)
+    script = {turn["user"]: turn for trace in traces for turn in trace["turns"]}
+    offline.install(script, seed=args.seed, llm_latency=args.llm_latency_ms / 1000,
+                    db_latency=args.db_latency_ms / 1000, vector_latency=args.vector_latency_ms / 1000)
+    bench = GraphBenchmark(traces)
+
+    # Pay one-off costs (imports, BM25 index, lazy bindings) before measuring
+    for trace in traces:
+        await bench.replay(trace)
+    bench.diverged.clear()
+
+    turns = sum(len(trace["turns"]) for trace in traces)
+    print(f"{len(traces)} conversations, {turns} turns; LLM {args.llm_latency_ms:g} ms, "
+          f"SQL {args.db_latency_ms:g} ms, vector search {args.vector_latency_ms:g} ms\n")
+
+    nodes = await bench.node_latencies(args.repeat)
+    print(f"{'node':<28} {'runs':>5} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for label, stats in nodes.items():
+        print(f"{label:<28} {stats['count']:>5} {stats['p50_ms']:8.1f} {stats['p90_ms']:8.1f} "
+              f"{stats['p99_ms']:8.1f} {stats['max_ms']:8.1f}")
+
+    print(f"\n{'threads':>7} {'turns':>6} {'turns/s':>8} {'p50 turn ms':>12} {'p95 turn ms':>12}")
+    throughput = []
+    for concurrency in args.concurrency:
+        stats = await bench.throughput(concurrency, args.repeat)
+        throughput.append(stats)
+        print(f"{concurrency:>7} {stats['turns']:>6} {stats['turns_per_second']:8.1f} "
+              f"{stats['p50_turn_ms']:12.1f} {stats['p95_turn_ms']:12.1f}")
+
+    allocations = await bench.allocations(args.top)
+    print(f"\nAllocated per turn: peak {allocations['peak_kb_per_turn_p50']:.0f} KB (p50), "
+          f"{allocations['peak_kb_per_turn_max']:.0f} KB (max); "
+          f"retained {allocations['retained_kb_per_turn']:.1f} KB")
+    for site in allocations["top_sites"]:
+        print(f"  {site['kb']:9.1f} KB {site['blocks']:>7} blocks  {site['site']}")
+
+    if bench.diverged:
+        print(f"\nWARNING: {len(bench.diverged)} turns did not end with the recorded answer:")
+        for turn in sorted(set(bench.diverged)):
+            print(f"  {turn}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": {key: value for key, value in vars(args).items() if key != "output"},
+                       "nodes": nodes, "throughput": throughput, "allocations": allocations,
+                       "diverged_turns": len(bench.diverged)}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--traces", default=TRACES, help="JSON-lines conversation traces")
+    parser.add_argument("--llm-latency-ms", type=float, default=100)
+    parser.add_argument("--db-latency-ms", type=float, default=2)
+    parser.add_argument("--vector-latency-ms", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=3, help="Replays of every trace per measurement")
+    parser.add_argument("--top", type=int, default=5, help="Allocation sites to list")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the stand-in catalog")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args))
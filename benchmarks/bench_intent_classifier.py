@@ -0,0 +1,85 @@
+"""
+Offline accuracy and latency benchmark for the local intent classifier.
+
+Runs the nearest-centroid classifier from ``routing.py`` over the labelled
+fixtures in ``benchmarks/fixtures/routing_labelled.jsonl`` using the same
+SentenceTransformer model as the application. No database or OpenAI access
+is needed; only the model weights must be available locally.
+
+Usage:
+    poetry run python -m benchmarks.bench_intent_classifier [--threshold 0.55] [--margin 0.05]
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+from langchain_community.embeddings import SentenceTransformerEmbeddings
+
+from routing import IntentClassifier
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "routing_labelled.jsonl")
+
+
+def load_fixtures(path=FIXTURES):
+    """Load labelled ``{"text", "label"}`` records from a JSON-lines file."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_benchmark(threshold, margin, path=FIXTURES):
+    """Classify every fixture and print accuracy, coverage and latency."""
+    fixtures = load_fixtures(path)
+    embeddings = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+    classifier = IntentClassifier(embeddings.embed_documents,
+                                  confidence_threshold=threshold,
+                                  min_margin=margin)
+
+    start = time.perf_counter()
+    classifier.fit()
+    fit_ms = (time.perf_counter() - start) * 1000
+
+    embed_times, classify_times = [], []
+    confident, correct, confusion = 0, 0, Counter()
+    for record in fixtures:
+        start = time.perf_counter()
+        vector = embeddings.embed_query(record["text"])
+        embed_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        prediction = classifier.predict(vector)
+        classify_times.append(time.perf_counter() - start)
+
+        if prediction is None:
+            confusion[(record["label"], "escalate")] += 1
+            continue
+        confident += 1
+        # Invoice and verification intents share a route decided by customer_id
+        same_route = {prediction, record["label"]} <= {"invoice", "verify_customer"}
+        correct += prediction == record["label"] or same_route
+        confusion[(record["label"], prediction)] += 1
+
+    def percentiles(samples):
+        ms = np.asarray(samples) * 1000
+        return f"p50={np.percentile(ms, 50):.3f}ms p95={np.percentile(ms, 95):.3f}ms"
+
+    print(f"Fixtures:          {len(fixtures)}")
+    print(f"Fit (one-off):     {fit_ms:.1f}ms")
+    print(f"Coverage:          {confident / len(fixtures):.1%} answered without the LLM")
+    print(f"Accuracy:          {correct / max(confident, 1):.1%} on confident predictions")
+    print(f"Embedding latency: {percentiles(embed_times)}")
+    print(f"Classify latency:  {percentiles(classify_times)}")
+    print("\nConfusion (expected -> predicted):")
+    for (expected, predicted), count in sorted(confusion.items()):
+        print(f"  {expected:>15} -> {predicted:<15} {count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--threshold", type=float, default=0.55)
+    parser.add_argument("--margin", type=float, default=0.05)
+    parser.add_argument("--fixtures", default=FIXTURES)
+    args = parser.parse_args()
+    run_benchmark(args.threshold, args.margin, args.fixtures)
@@ -0,0 +1,101 @@
+"""
+Compare the paginated and aggregated invoice queries against unbounded reads
+for a synthetic high-volume customer.
+
+Inserts one customer with thousands of invoices and invoice lines into the
+Chinook database inside a transaction, times each query on that connection
+and reports the size of the table a tool would hand to the LLM. The
+transaction is rolled back at the end, so the database is left untouched.
+Needs the seeded database from ``make seed``.
+
+Usage:
+    poetry run python -m benchmarks.bench_invoice_tools [--invoices 5000] [--repeat 20]
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+from config import engine
+from database import QueryResult
+from queries import INVOICES_BY_DATE, INVOICES_BY_UNIT_PRICE, INVOICE_TOTALS_BY_MONTH
+
+# What the tools ran before pagination: every invoice or line for the customer
+UNBOUNDED_INVOICES = """
+    SELECT * FROM "Invoice"
+    WHERE "CustomerId" = :customer_id
+    ORDER BY "InvoiceDate" DESC
+"""
+
+UNBOUNDED_LINES = """
+    SELECT "Invoice"."InvoiceId", "InvoiceLine"."UnitPrice", "InvoiceLine"."Quantity"
+    FROM "Invoice"
+    JOIN "InvoiceLine" ON "Invoice"."InvoiceId" = "InvoiceLine"."InvoiceId"
+    WHERE "Invoice"."CustomerId" = :customer_id
+    ORDER BY "InvoiceLine"."UnitPrice" DESC
+"""
+
+SEED_CUSTOMER = """
+    INSERT INTO "Customer" ("FirstName", "LastName", "Email", "SupportRepId")
+    VALUES ('Bench', 'Customer', 'bench.customer@example.com', 3)
+    RETURNING "CustomerId"
+"""
+
+SEED_INVOICES = """
+    INSERT INTO "Invoice" ("CustomerId", "InvoiceDate", "BillingCity", "BillingCountry", "Total")
+    SELECT :customer_id, now() - n * interval '6 hours', 'Benchville', 'Nowhere', (n % 20) + 0.99
+    FROM generate_series(1, :invoices) AS n
+"""
+
+SEED_LINES = """
+    INSERT INTO "InvoiceLine" ("InvoiceId", "TrackId", "UnitPrice", "Quantity")
+    SELECT "InvoiceId", 1 + ("InvoiceId" * line) % 3000, 0.99 + line, 1
+    FROM "Invoice", generate_series(1, 3) AS line
+    WHERE "CustomerId" = :customer_id
+"""
+
+
+def timed(conn, query, parameters, repeat):
+    """Mean milliseconds per execution and the formatted output of the last run."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = conn.execute(text(query), parameters)
+        rows = QueryResult(tuple(result.keys()), [tuple(row) for row in result])
+    return (time.perf_counter() - start) / repeat * 1000, rows
+
+
+def run_benchmark(invoices, repeat):
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            customer_id = conn.execute(text(SEED_CUSTOMER)).scalar()
+            conn.execute(text(SEED_INVOICES), {"customer_id": customer_id, "invoices": invoices})
+            conn.execute(text(SEED_LINES), {"customer_id": customer_id})
+            conn.execute(text('ANALYZE "Invoice"'))
+            conn.execute(text('ANALYZE "InvoiceLine"'))
+
+            no_range = {"customer_id": customer_id, "start_date": None, "end_date": None}
+            cases = [
+                ("unbounded invoices", UNBOUNDED_INVOICES, {"customer_id": customer_id}),
+                ("invoices page (10)", INVOICES_BY_DATE, {**no_range, "limit": 11, "offset": 0}),
+                ("invoices page @1000", INVOICES_BY_DATE, {**no_range, "limit": 11, "offset": 1000}),
+                ("unbounded lines", UNBOUNDED_LINES, {"customer_id": customer_id}),
+                ("top lines (10)", INVOICES_BY_UNIT_PRICE, {**no_range, "limit": 10}),
+                ("monthly totals", INVOICE_TOTALS_BY_MONTH, no_range),
+            ]
+
+            print(f"customer with {invoices} invoices, {invoices * 3} lines; {repeat} runs each\n")
+            print(f"{'query':>20} {'ms':>8} {'rows':>7} {'output KB':>10}")
+            for name, query, parameters in cases:
+                ms, rows = timed(conn, query, parameters, repeat)
+                print(f"{name:>20} {ms:8.2f} {len(rows):7d} {len(rows.to_table()) / 1024:10.1f}")
+        finally:
+            transaction.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--invoices", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run_benchmark(args.invoices, args.repeat)
@@ -0,0 +1,63 @@
+"""
+Micro-benchmark for the routing keyword matcher.
+
+Compares the single-pass ``KeywordMatcher`` against the previous per-keyword
+substring scans and a compiled word-boundary alternation regex over short
+and long multi-paragraph messages.
+
+Usage:
+    poetry run python -m benchmarks.bench_keyword_matcher [--paragraphs 20] [--repeat 2000]
+"""
+import argparse
+import random
+import re
+import timeit
+
+from routing import INTENT_KEYWORDS, keyword_matcher
+
+FILLER = ("I have been a customer for a long time and I usually listen to a lot of "
+          "different things while working, commuting or relaxing at home on weekends. "
+          "Last week my buyer account showed something odd on the trackpad screen. ")
+
+
+def build_message(paragraphs, seed=0):
+    """Build a long message with one keyword hidden near the end."""
+    rng = random.Random(seed)
+    body = "\n\n".join(FILLER * rng.randint(2, 5) for _ in range(paragraphs))
+    return body + "\n\nCould you also show me my latest invoice?"
+
+
+def substring_scan(text):
+    """The previous approach: lowercase, then one substring scan per intent."""
+    lowered = text.lower()
+    return {intent for intent, words in INTENT_KEYWORDS.items()
+            if any(word in lowered for word in words)}
+
+
+_GROUPS = "|".join(f"(?P<{intent}>{'|'.join(words)})" for intent, words in INTENT_KEYWORDS.items())
+_ALTERNATION = re.compile(rf"\b(?:{_GROUPS})(?:s|es|d|ed|ing)?\b", re.IGNORECASE)
+
+
+def regex_scan(text):
+    """One compiled alternation regex with word boundaries."""
+    return {match.lastgroup for match in _ALTERNATION.finditer(text)}
+
+
+def run_benchmark(paragraphs, repeat):
+    candidates = (("substring scan", substring_scan),
+                  ("alternation regex", regex_scan),
+                  ("keyword matcher", keyword_matcher.match))
+
+    for message in ("Can you find songs by Queen, or should I ask the buyer?", build_message(paragraphs)):
+        print(f"\nMessage length: {len(message)} chars")
+        for name, func in candidates:
+            seconds = min(timeit.repeat(lambda: func(message), number=repeat, repeat=5))
+            print(f"{name:>18}: {seconds / repeat * 1e6:8.2f} us/message  -> {sorted(func(message))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    run_benchmark(args.paragraphs, args.repeat)
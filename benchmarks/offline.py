@@ -0,0 +1,413 @@
+"""
+Offline stand-ins for the services behind ``workflow.multi_agent_final_graph``.
+
+``install()`` points the shared resources in ``config`` at local fakes before
+they are first used, so the full graph runs without OpenAI or Postgres:
+
+- ``ScriptedChatModel`` answers from a script keyed on the user's message,
+  emitting canned tool calls (including the router's structured output)
+  after a configurable delay.
+- ``StandInEngine`` answers the SQL in ``queries.py`` from a seeded,
+  Chinook-shaped in-memory catalog.
+- ``StandInVectorStore`` serves the same catalog's track documents to
+  ``HybridRetriever`` with deterministic fake embeddings.
+
+Everything is derived from a seed, so two runs see identical data.
+"""
+import asyncio
+import difflib
+import os
+import random
+import re
+import time
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# config refuses to import without these; nothing connects to them offline
+OFFLINE_ENVIRONMENT = {
+    "OPENAI_API_KEY": "offline",
+    "DB_USER": "offline",
+    "DB_PASSWORD": "offline",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "offline",
+}
+
+FALLBACK_ANSWER = "I can help you with music and with your invoices."
+
+Track = namedtuple("Track", "TrackId track_name artist_name album_title genre composer milliseconds unit_price")
+Invoice = namedtuple("Invoice", "InvoiceId CustomerId InvoiceDate BillingCity BillingCountry Total")
+InvoiceLine = namedtuple("InvoiceLine", "InvoiceId TrackId UnitPrice Quantity")
+Customer = namedtuple("Customer", "CustomerId FirstName LastName Email SupportRepId City Country")
+Employee = namedtuple("Employee", "EmployeeId FirstName Title Email")
+
+# The first customers and artists of the real Chinook data, so traces read naturally
+KNOWN_CUSTOMERS = [
+    ("Luís", "Gonçalves", "luisg@embraer.com.br", "São José dos Campos", "Brazil"),
+    ("Leonie", "Köhler", "leonekohler@surfeu.de", "Stuttgart", "Germany"),
+    ("François", "Tremblay", "ftremblay@gmail.com", "Montréal", "Canada"),
+    ("Bjørn", "Hansen", "bjorn.hansen@yahoo.no", "Oslo", "Norway"),
+    ("František", "Wichterlová", "frantisekw@jetbrains.com", "Prague", "Czech Republic"),
+]
+KNOWN_ARTISTS = [
+    ("AC/DC", "Rock"), ("Queen", "Rock"), ("Miles Davis", "Jazz"), ("Nirvana", "Rock"),
+    ("Metallica", "Metal"), ("Led Zeppelin", "Rock"), ("Beyoncé", "Pop"), ("Norah Jones", "Jazz"),
+    ("Daft Punk", "Electronic"), ("Johnny Cash", "Country"), ("B.B. King", "Blues"), ("Gilberto Gil", "Latin"),
+]
+EMPLOYEES = [
+    Employee(3, "Jane", "Sales Support Agent", "jane@chinookcorp.com"),
+    Employee(4, "Margaret", "Sales Support Agent", "margaret@chinookcorp.com"),
+    Employee(5, "Steve", "Sales Support Agent", "steve@chinookcorp.com"),
+]
+WORDS = ("Night", "Blue", "Fire", "Road", "Dream", "Heart", "Light", "River", "Stone", "Wild",
+         "Electric", "Silver", "Golden", "Midnight", "Summer", "Rain", "Crazy", "Little", "Black", "Love")
+
+
+class OfflineCatalog:
+    """
+    A seeded, Chinook-shaped catalog of artists, tracks, customers and invoices.
+
+    Args:
+        seed: Random seed; equal seeds give identical catalogs.
+        artists: Total artists, including the well-known ones.
+        customers: Total customers, including the well-known ones.
+    """
+
+    def __init__(self, seed: int = 7, artists: int = 200, customers: int = 59):
+        rng = random.Random(seed)
+        self.tracks: List[Track] = []
+        self.albums: Dict[str, List[str]] = defaultdict(list)
+        self.customers: List[Customer] = []
+        self.invoices: List[Invoice] = []
+        self.lines: List[InvoiceLine] = []
+
+        genres = sorted({genre for _, genre in KNOWN_ARTISTS})
+        names = KNOWN_ARTISTS + [(f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}", rng.choice(genres))
+                                 for i in range(len(KNOWN_ARTISTS), artists)]
+        for artist, genre in names:
+            for _ in range(rng.randint(1, 3)):
+                album = f"{rng.choice(WORDS)} {rng.choice(WORDS)}"
+                self.albums[artist].append(album)
+                for _ in range(rng.randint(8, 14)):
+                    self.tracks.append(Track(len(self.tracks) + 1, f"{rng.choice(WORDS)} {rng.choice(WORDS)}",
+                                             artist, album, genre, None, rng.randint(120000, 420000),
+                                             rng.choice((0.99, 0.99, 0.99, 1.99))))
+        self.tracks_by_id = {track.TrackId: track for track in self.tracks}
+
+        people = KNOWN_CUSTOMERS + [(f"Customer{i}", f"Number{i}", f"customer{i}@example.com", "Lisbon", "Portugal")
+                                    for i in range(len(KNOWN_CUSTOMERS) + 1, customers + 1)]
+        for customer_id, (first, last, email, city, country) in enumerate(people, start=1):
+            self.customers.append(Customer(customer_id, first, last, email,
+                                           rng.choice(EMPLOYEES).EmployeeId, city, country))
+            for _ in range(rng.randint(5, 12)):
+                invoice_id = len(self.invoices) + 1
+                invoice_date = datetime(2021, 1, 1) + timedelta(days=rng.randint(0, 4 * 365))
+                lines = [InvoiceLine(invoice_id, rng.choice(self.tracks).TrackId, 0.0, 1)
+                         for _ in range(rng.randint(1, 10))]
+                lines = [line._replace(UnitPrice=self.tracks_by_id[line.TrackId].unit_price) for line in lines]
+                self.lines.extend(lines)
+                self.invoices.append(Invoice(invoice_id, customer_id, invoice_date, city, country,
+                                             round(sum(line.UnitPrice for line in lines), 2)))
+        self.employees = {employee.EmployeeId: employee for employee in EMPLOYEES}
+
+
+def _ilike(pattern: str, value: str) -> bool:
+    # Backslash escapes the next character, as in Postgres
+    tokens = re.findall(r"\\.|.", pattern, re.DOTALL)
+    regex = "".join(re.escape(token[1]) if len(token) == 2 else ".*" if token == "%" else "." if token == "_"
+                    else re.escape(token) for token in tokens)
+    return re.fullmatch(regex, value, re.IGNORECASE | re.DOTALL) is not None
+
+
+def _in_range(invoice: Invoice, params: dict) -> bool:
+    start, end = params.get("start_date"), params.get("end_date")
+    day = invoice.InvoiceDate.date()
+    return (not start or day >= date.fromisoformat(start)) and (not end or day <= date.fromisoformat(end))
+
+
+class StandInResult:
+    """The slice of a SQLAlchemy ``Result`` the tools use."""
+
+    def __init__(self, columns: tuple, rows: list):
+        self.columns = columns
+        self.rows = rows
+
+    def keys(self):
+        return self.columns
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def all(self):
+        return list(self.rows)
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+
+class StandInConnection:
+    """Answers the SQL in ``queries.py`` from an ``OfflineCatalog``."""
+
+    def __init__(self, engine: "StandInEngine"):
+        self.engine = engine
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, statement: Any, parameters: Optional[dict] = None) -> StandInResult:
+        sql = getattr(statement, "text", statement)
+        handler = self.engine.handlers.get(" ".join(sql.split()))
+        if handler is None:
+            raise NotImplementedError(f"The stand-in database has no answer for: {sql.strip()[:80]}")
+        if self.engine.latency:
+            time.sleep(self.engine.latency)
+        self.engine.queries += 1
+        return handler(self.engine.catalog, parameters or {})
+
+
+class StandInEngine:
+    """
+    Drop-in for the SQLAlchemy engine, backed by an ``OfflineCatalog``.
+
+    Args:
+        catalog: The seeded data to answer from.
+        latency: Seconds added to every query, standing in for a round trip.
+    """
+
+    def __init__(self, catalog: OfflineCatalog, latency: float = 0.0):
+        import queries
+
+        self.catalog = catalog
+        self.latency = latency
+        self.queries = 0
+        answers = {
+            queries.CUSTOMER_BY_EMAIL: _customer_by_email,
+            queries.CUSTOMER_BY_FULL_NAME: _customer_by_full_name,
+            queries.CUSTOMER_BY_SIMILARITY: _customer_by_similarity,
+            queries.CUSTOMER_BY_PATTERN: _customer_by_pattern,
+            queries.INVOICES_BY_DATE: _invoices_by_date,
+            queries.INVOICES_BY_UNIT_PRICE: _invoices_by_unit_price,
+            queries.INVOICE_TOTALS_BY_MONTH: _invoice_totals_by_month,
+            queries.EMPLOYEE_BY_INVOICE_AND_CUSTOMER: _employee_by_invoice,
+            queries.ALBUMS_BY_ARTIST: _albums_by_artist,
+        }
+        self.handlers = {" ".join(sql.split()): handler for sql, handler in answers.items()}
+
+    def connect(self) -> StandInConnection:
+        return StandInConnection(self)
+
+
+def _customer_by_email(catalog, params):
+    rows = [(c.CustomerId,) for c in catalog.customers if c.Email.lower() == params["email"].lower()]
+    return StandInResult(("CustomerId",), rows[:2])
+
+
+def _customer_by_full_name(catalog, params):
+    rows = [(c.CustomerId,) for c in catalog.customers
+            if f"{c.FirstName} {c.LastName}".lower() == params["full_name"].lower()]
+    return StandInResult(("CustomerId",), rows[:2])
+
+
+def _customer_by_similarity(catalog, params):
+    # difflib's ratio stands in for pg_trgm's similarity()
+    def score(value):
+        return difflib.SequenceMatcher(None, value.lower(), params["identifier"].lower()).ratio()
+
+    scored = [(c.CustomerId, max(score(c.Email), score(f"{c.FirstName} {c.LastName}"))) for c in catalog.customers]
+    rows = sorted((row for row in scored if row[1] >= params["min_similarity"]), key=lambda row: (-row[1], row[0]))
+    return StandInResult(("CustomerId", "Score"), rows[:2])
+
+
+def _customer_by_pattern(catalog, params):
+    rows = [(c.CustomerId,) for c in catalog.customers
+            if _ilike(params["pattern"], c.Email) or _ilike(params["pattern"], f"{c.FirstName} {c.LastName}")]
+    return StandInResult(("CustomerId",), rows[:2])
+
+
+def _customer_invoices(catalog, params):
+    return [invoice for invoice in catalog.invoices
+            if invoice.CustomerId == params["customer_id"] and _in_range(invoice, params)]
+
+
+def _invoices_by_date(catalog, params):
+    invoices = sorted(_customer_invoices(catalog, params), key=lambda i: (i.InvoiceDate, i.InvoiceId), reverse=True)
+    page = invoices[params["offset"]:params["offset"] + params["limit"]]
+    return StandInResult(("InvoiceId", "InvoiceDate", "BillingCity", "BillingCountry", "Total"),
+                         [(i.InvoiceId, i.InvoiceDate, i.BillingCity, i.BillingCountry, i.Total) for i in page])
+
+
+def _invoices_by_unit_price(catalog, params):
+    invoices = {invoice.InvoiceId: invoice for invoice in _customer_invoices(catalog, params)}
+    rows = [(line.InvoiceId, invoices[line.InvoiceId].InvoiceDate, catalog.tracks_by_id[line.TrackId].track_name,
+             line.UnitPrice, line.Quantity) for line in catalog.lines if line.InvoiceId in invoices]
+    rows.sort(key=lambda row: (row[3], row[1]), reverse=True)
+    return StandInResult(("InvoiceId", "InvoiceDate", "TrackName", "UnitPrice", "Quantity"), rows[:params["limit"]])
+
+
+def _invoice_totals_by_month(catalog, params):
+    months = defaultdict(lambda: [0, 0.0])
+    for invoice in _customer_invoices(catalog, params):
+        month = months[invoice.InvoiceDate.strftime("%Y-%m")]
+        month[0] += 1
+        month[1] += invoice.Total
+    return StandInResult(("Month", "Invoices", "Total"),
+                         [(month, count, round(total, 2)) for month, (count, total) in sorted(months.items(), reverse=True)])
+
+
+def _employee_by_invoice(catalog, params):
+    customers = {c.CustomerId: c for c in catalog.customers}
+    rows = [catalog.employees[customers[i.CustomerId].SupportRepId] for i in catalog.invoices
+            if i.InvoiceId == params["invoice_id"] and i.CustomerId == params["customer_id"]]
+    return StandInResult(("FirstName", "Title", "Email"), [(e.FirstName, e.Title, e.Email) for e in rows])
+
+
+def _albums_by_artist(catalog, params):
+    rows = [(album,) for artist, albums in catalog.albums.items()
+            if _ilike(params["artist_name"], artist) for album in albums]
+    return StandInResult(("Title",), rows)
+
+
+def _matches_where(metadata: dict, where: Optional[dict]) -> bool:
+    """Evaluate the subset of Chroma ``where`` clauses built by ``retrieval.chroma_filter``."""
+    if not where:
+        return True
+    if "$and" in where:
+        return all(_matches_where(metadata, clause) for clause in where["$and"])
+    (field, condition), = where.items()
+    value = metadata.get(field)
+    if not isinstance(condition, dict):
+        return value == condition
+    (operator, bound), = condition.items()
+    return value >= bound if operator == "$gte" else value <= bound
+
+
+class StandInVectorStore:
+    """
+    In-memory replacement for the Chroma store over an ``OfflineCatalog``.
+
+    Args:
+        catalog: Tracks to index, as built by ``catalog_sync.track_document``.
+        embeddings: Embeddings for documents and queries.
+        latency: Seconds added to every similarity search.
+    """
+
+    def __init__(self, catalog: OfflineCatalog, embeddings: Any, latency: float = 0.0):
+        from catalog_sync import track_document
+
+        self.ids, self.documents, self.metadatas = (list(values) for values in
+                                                    zip(*(track_document(track) for track in catalog.tracks)))
+        self.embeddings = embeddings
+        self.latency = latency
+        self.matrix = np.asarray(embeddings.embed_documents(self.documents), dtype=np.float32)
+        self.matrix /= np.linalg.norm(self.matrix, axis=1, keepdims=True)
+
+    def get(self, include: Optional[list] = None, **kwargs) -> dict:
+        return {"ids": self.ids, "documents": self.documents, "metadatas": self.metadatas}
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs) -> List[Document]:
+        if self.latency:
+            time.sleep(self.latency)
+        scores = self.matrix @ np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        ranked = [i for i in np.argsort(-scores) if _matches_where(self.metadatas[i], filter)][:k]
+        return [Document(page_content=self.documents[i], metadata=self.metadatas[i]) for i in ranked]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that replays canned turns instead of calling an API.
+
+    Each turn of the script is keyed on the user's message and may give a
+    ``route`` for the router's structured output, ``tool_calls`` to make
+    one after another (only those whose tool is bound are used) and the
+    ``answer`` to finish with. Unknown messages get ``FALLBACK_ANSWER``.
+    """
+
+    script: Dict[str, dict] = {}
+    latency: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: list, **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _respond(self, messages: List[BaseMessage], tools: Optional[list]) -> AIMessage:
+        self.calls += 1
+        last_human = max((i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)), default=-1)
+        turn = self.script.get(messages[last_human].content, {}) if last_human >= 0 else {}
+        bound = {tool["function"]["name"] for tool in tools or []}
+
+        if "RouteQuery" in bound:
+            return _tool_call_message("RouteQuery", {"destination": turn.get("route", "end")}, 0)
+
+        # Make the next scripted call the agent has not yet had a result for
+        calls = [call for call in turn.get("tool_calls", []) if call["name"] in bound]
+        answered = sum(isinstance(msg, ToolMessage) for msg in messages[last_human + 1:])
+        if answered < len(calls):
+            return _tool_call_message(calls[answered]["name"], calls[answered]["args"], answered)
+        return AIMessage(content=turn.get("answer", FALLBACK_ANSWER))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, kwargs.get("tools")))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, kwargs.get("tools")))])
+
+
+def _tool_call_message(name: str, args: dict, index: int) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{name}_{index}"}])
+
+
+def install(script: Dict[str, dict], seed: int = 7, llm_latency: float = 0.0, db_latency: float = 0.0,
+            vector_latency: float = 0.0) -> OfflineCatalog:
+    """Point ``config``'s shared resources at offline stand-ins.
+
+    Must run before anything resolves them; importing ``workflow`` does not.
+
+    Args:
+        script: Turns for the ``ScriptedChatModel``, keyed on user message.
+        seed: Seed for the catalog data.
+        llm_latency: Seconds per chat model call.
+        db_latency: Seconds per SQL query.
+        vector_latency: Seconds per vector search.
+
+    Returns:
+        OfflineCatalog: The data the stand-ins answer from.
+    """
+    for name, value in OFFLINE_ENVIRONMENT.items():
+        os.environ.setdefault(name, value)
+    # Keep checkpoints in memory and skip the background warm-up
+    os.environ["CHECKPOINTER_BACKEND"] = "memory"
+    os.environ["STARTUP_WARMUP"] = "false"
+
+    import config
+    from embeddings import CachedEmbeddings
+
+    catalog = OfflineCatalog(seed=seed)
+    embeddings = CachedEmbeddings(DeterministicFakeEmbedding(size=384), model_name="offline-fake")
+    config.llm.override(ScriptedChatModel(script=script, latency=llm_latency))
+    config.engine.override(StandInEngine(catalog, latency=db_latency))
+    config.embedding_function.override(embeddings)
+    config.vector_store.override(StandInVectorStore(catalog, embeddings, latency=vector_latency))
+    return catalog
@@ -0,0 +1,148 @@
+"""
+In-process caching primitives shared by the routing, retrieval and tool layers.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a cache instance."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with optional per-entry TTL.
+
+    Args:
+        maxsize: Maximum number of entries kept before the least recently
+            used one is evicted.
+        ttl: Seconds an entry stays valid. ``None`` disables expiry.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key`` or ``default`` on a miss."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                self.stats.misses += 1
+                self.stats.evictions += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store ``value`` under ``key``, evicting the oldest entry if full."""
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0.0
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def touch(self, key: Hashable) -> None:
+        """Mark ``key`` as recently used without changing when it expires."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry. Counters are kept."""
+        with self._lock:
+            self._data.clear()
+
+    def items(self) -> list:
+        """Snapshot of live ``(key, value)`` pairs, oldest first."""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (value, expires_at) in self._data.items()
+                    if not expires_at or expires_at >= now]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (not entry[1] or entry[1] >= time.monotonic())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class SingleFlight:
+    """
+    Deduplicates identical async calls that are in flight at the same time.
+
+    The first caller for a key starts the call; callers arriving before it
+    finishes await the same result (or exception) instead of repeating the
+    work. Nothing is kept once the call completes, so this only flattens
+    concurrent bursts; pair it with a cache for repeats over time.
+
+    The call runs as its own task: a caller that is cancelled stops waiting
+    but does not cancel the call for the others.
+
+    ``stats.hits`` counts callers that joined a call in flight and
+    ``stats.misses`` the calls actually made.
+    """
+
+    def __init__(self):
+        self.stats = CacheStats()
+        self._calls: "dict[Hashable, asyncio.Future]" = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Return ``await func()``, sharing one call among concurrent callers with ``key``."""
+        call = self._calls.get(key)
+        if call is None:
+            self.stats.misses += 1
+            call = asyncio.ensure_future(func())
+            self._calls[key] = call
+            call.add_done_callback(functools.partial(self._finish, key))
+        else:
+            self.stats.hits += 1
+        return await asyncio.shield(call)
+
+    def _finish(self, key: Hashable, call: "asyncio.Future") -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every caller stopped waiting
+        if not call.cancelled():
+            call.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,134 @@
+"""
+Result cache for the music catalog tools.
+
+The catalog changes rarely, while the music agent asks for the same artists
+and searches again and again, within one ReAct loop and across users.
+``CatalogResultCache.cached`` wraps a tool function so that calls with the
+same normalized arguments are answered from an LRU with a TTL.
+
+Everything that rewrites the catalog calls ``mark_catalog_changed`` on the
+shared byte store: the seed scripts, which run as separate processes, and
+``CatalogSync`` after applying changes. Each cache compares that marker with
+the one it last saw (at most every ``check_interval`` seconds) and drops all
+entries when it moved, together with anything else registered through
+``on_invalidate`` (the music agent's lexical index), so reseeding takes
+effect without a restart.
+"""
+
+import functools
+import inspect
+import json
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from langchain_core.stores import ByteStore
+
+from cache import LRUCache
+from instrumentation import metrics
+
+CATALOG_VERSION_KEY = "catalog/version"
+
+
+def mark_catalog_changed(store: ByteStore) -> None:
+    """Record that the catalog changed, invalidating every ``CatalogResultCache`` on ``store``."""
+    store.mset([(CATALOG_VERSION_KEY, str(time.time_ns()).encode())])
+
+
+def catalog_version(store: ByteStore) -> Optional[bytes]:
+    """The current catalog marker, or ``None`` if nothing was marked yet."""
+    return store.mget([CATALOG_VERSION_KEY])[0]
+
+
+def _normalize(value: Any, casefold: bool) -> Any:
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        return value.casefold() if casefold else value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+class CatalogResultCache:
+    """
+    LRU cache of catalog tool results, cleared when the catalog changes.
+
+    Args:
+        cache: Results by tool and normalized arguments; its TTL bounds how
+            stale a result can get if a change is never marked.
+        store: Byte store holding the catalog marker, e.g. ``config.store``.
+            ``None`` leaves invalidation to ``invalidate``.
+        check_interval: Seconds between reads of the marker.
+        on_invalidate: Called on every invalidation, before results are
+            dropped, to reset other state derived from the catalog.
+    """
+
+    def __init__(self, cache: Optional[LRUCache] = None, store: Optional[ByteStore] = None,
+                 check_interval: float = 5.0, on_invalidate: Optional[Callable[[], None]] = None):
+        self.cache = cache if cache is not None else LRUCache(maxsize=512, ttl=3600)
+        self.store = store
+        self.check_interval = check_interval
+        self.on_invalidate = on_invalidate
+        self._version = catalog_version(store) if store is not None else None
+        self._checked_at = time.monotonic()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Drop every cached result and run ``on_invalidate``."""
+        # Reset derived state first, so a result computed after the drop never comes from it
+        if self.on_invalidate is not None:
+            self.on_invalidate()
+        self._generation += 1
+        self.cache.clear()
+
+    def _check_version(self) -> None:
+        if self.store is None or time.monotonic() - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return
+            version = catalog_version(self.store)
+            if version != self._version:
+                self._version = version
+                self.invalidate()
+            self._checked_at = time.monotonic()
+
+    def cached(self, casefold: Iterable[str] = ()) -> Callable[[Callable], Callable]:
+        """
+        Decorator caching a tool function's results.
+
+        String arguments are compared with whitespace collapsed, and numbers
+        by value; omitted arguments count as their defaults.
+
+        Args:
+            casefold: Arguments that are also compared ignoring case. Only
+                list those the lookup already treats case-insensitively.
+        """
+        casefold = frozenset(casefold)
+
+        def decorator(func: Callable) -> Callable:
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = {name: _normalize(value, name in casefold) for name, value in bound.arguments.items()}
+                key = (func.__name__, json.dumps(arguments, sort_keys=True, default=str))
+
+                self._check_version()
+                result = self.cache.get(key)
+                metrics.increment("tool_cache_lookups_total", tool=func.__name__,
+                                  result="hit" if result is not None else "miss")
+                if result is None:
+                    generation = self._generation
+                    result = func(*args, **kwargs)
+                    # A result read while the catalog was being invalidated may already be stale
+                    if generation == self._generation:
+                        self.cache.set(key, result)
+                return result
+
+            return wrapper
+
+        return decorator
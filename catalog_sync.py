@@ -0,0 +1,303 @@
+"""
+Incremental sync of the Postgres music catalog into the Chroma vector store.
+
+Triggers on ``Track``, ``Album``, ``Artist`` and ``Genre`` append the IDs of
+affected tracks, and of the writing transaction, to a ``CatalogChange`` log.
+``CatalogSync`` reads the changes of transactions past a stored high-water
+mark, re-reads the current state of those tracks, re-embeds the ones whose
+document actually changed and deletes the ones that no longer exist.
+``seed_music_data.py`` records the mark when a full seed starts, so the sync
+job only ever processes later changes. Every pass that changes the catalog
+also marks it changed for the catalog tool result cache.
+
+The mark is a transaction ID, not a ``ChangeId``: a transaction can take a
+lower ``ChangeId`` and commit after a higher one is read. Each pass only
+reads transactions below the oldest one still running (the snapshot xmin),
+all of which have finished, and then moves the mark up to that xmin.
+
+Usage:
+    poetry run python catalog_sync.py --install   # create the change log and triggers
+    poetry run python catalog_sync.py --once      # apply pending changes and exit
+    poetry run python catalog_sync.py             # keep syncing every CATALOG_SYNC_INTERVAL seconds
+"""
+import argparse
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from catalog_cache import mark_catalog_changed
+
+TRACKS_SELECT = """
+    SELECT
+        t."TrackId",
+        t."Name" AS track_name,
+        a."Name" AS artist_name,
+        al."Title" AS album_title,
+        g."Name" AS genre,
+        t."Composer" AS composer,
+        t."Milliseconds" AS milliseconds,
+        t."UnitPrice" AS unit_price
+    FROM "Track" t
+    JOIN "Album" al ON t."AlbumId" = al."AlbumId"
+    JOIN "Artist" a ON al."ArtistId" = a."ArtistId"
+    LEFT JOIN "Genre" g ON t."GenreId" = g."GenreId"
+"""
+
+TRACKS_BY_ID = TRACKS_SELECT + """
+    WHERE t."TrackId" = ANY(:track_ids)
+"""
+
+# Changes of finished transactions in [since, until), paged by ChangeId
+PENDING_CHANGES = """
+    SELECT "ChangeId", "TrackId"
+    FROM "CatalogChange"
+    WHERE "TxId" >= :since AND "TxId" < :until
+      AND "ChangeId" > :after
+    ORDER BY "ChangeId"
+    LIMIT :limit
+"""
+
+# Every transaction below this ID has committed or rolled back
+SNAPSHOT_XMIN = "SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+CHANGE_LOG_DDL = """
+CREATE TABLE IF NOT EXISTS "CatalogChange" (
+    "ChangeId" bigserial PRIMARY KEY,
+    "TrackId" integer NOT NULL,
+    "ChangedAt" timestamptz NOT NULL DEFAULT now()
+);
+ALTER TABLE "CatalogChange"
+    ADD COLUMN IF NOT EXISTS "TxId" bigint NOT NULL DEFAULT pg_current_xact_id()::text::bigint;
+CREATE INDEX IF NOT EXISTS idx_catalog_change_txid ON "CatalogChange" ("TxId", "ChangeId");
+
+CREATE OR REPLACE FUNCTION log_track_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO "CatalogChange" ("TrackId") VALUES (OLD."TrackId");
+    ELSE
+        INSERT INTO "CatalogChange" ("TrackId") VALUES (NEW."TrackId");
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION log_album_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO "CatalogChange" ("TrackId")
+    SELECT "TrackId" FROM "Track" WHERE "AlbumId" = NEW."AlbumId";
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION log_artist_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO "CatalogChange" ("TrackId")
+    SELECT t."TrackId" FROM "Track" t
+    JOIN "Album" al ON t."AlbumId" = al."AlbumId"
+    WHERE al."ArtistId" = NEW."ArtistId";
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION log_genre_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO "CatalogChange" ("TrackId")
+    SELECT "TrackId" FROM "Track" WHERE "GenreId" = NEW."GenreId";
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS track_catalog_change ON "Track";
+CREATE TRIGGER track_catalog_change AFTER INSERT OR UPDATE OR DELETE ON "Track"
+    FOR EACH ROW EXECUTE FUNCTION log_track_change();
+
+DROP TRIGGER IF EXISTS album_catalog_change ON "Album";
+CREATE TRIGGER album_catalog_change AFTER UPDATE OF "Title", "ArtistId" ON "Album"
+    FOR EACH ROW EXECUTE FUNCTION log_album_change();
+
+DROP TRIGGER IF EXISTS artist_catalog_change ON "Artist";
+CREATE TRIGGER artist_catalog_change AFTER UPDATE OF "Name" ON "Artist"
+    FOR EACH ROW EXECUTE FUNCTION log_artist_change();
+
+DROP TRIGGER IF EXISTS genre_catalog_change ON "Genre";
+CREATE TRIGGER genre_catalog_change AFTER UPDATE OF "Name" ON "Genre"
+    FOR EACH ROW EXECUTE FUNCTION log_genre_change();
+"""
+
+# Holds a transaction ID; the key changed when the mark stopped being a ChangeId
+HIGH_WATER_MARK_KEY = "catalog_sync/xmin"
+
+
+def track_document(track) -> tuple:
+    """Build the ID, searchable text and metadata for one track row.
+
+    Returns:
+        tuple: ``(document_id, content, metadata)``.
+    """
+    genre = track.genre or "Unknown"
+    price = float(track.unit_price or 0)
+    content = f"""
+Track: {track.track_name}
+Artist: {track.artist_name}
+Album: {track.album_title}
+Genre: {genre}
+Composer: {track.composer or 'Unknown'}
+Duration: {track.milliseconds or 0} ms
+Price: ${price}
+    """.strip()
+
+    metadata = {
+        'track_id': track.TrackId,
+        'track_name': track.track_name,
+        'artist_name': track.artist_name,
+        'album_title': track.album_title,
+        'genre': genre,
+        'price': price,
+        'content_hash': hashlib.sha256(content.encode()).hexdigest(),
+    }
+    return f"track-{track.TrackId}", content, metadata
+
+
+@dataclass
+class SyncResult:
+    """What one sync pass changed in the vector store."""
+    upserted: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    high_water_mark: int = 0
+
+
+class CatalogSync:
+    """
+    Apply logged catalog changes to the vector store.
+
+    Args:
+        engine: SQLAlchemy engine for the catalog database.
+        vector_store: The Chroma store holding the track documents.
+        embeddings: Embeddings used for changed documents.
+        store: Byte store keeping the high-water mark, e.g. ``config.store``.
+        batch_size: Change-log rows processed per round trip.
+        on_change: Called after a pass that modified the vector store.
+    """
+
+    def __init__(self, engine: Any, vector_store: Any, embeddings: Any, store: Any,
+                 batch_size: int = 500, on_change: Optional[Callable[[], None]] = None):
+        self.engine = engine
+        self.vector_store = vector_store
+        self.embeddings = embeddings
+        self.store = store
+        self.batch_size = batch_size
+        self.on_change = on_change
+
+    def install(self) -> None:
+        """Create the change log table and triggers (idempotent)."""
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(CHANGE_LOG_DDL)
+
+    @property
+    def high_water_mark(self) -> int:
+        """Transaction ID below which every change has been applied to the vector store."""
+        raw = self.store.mget([HIGH_WATER_MARK_KEY])[0]
+        return int(raw) if raw else 0
+
+    @high_water_mark.setter
+    def high_water_mark(self, xid: int) -> None:
+        self.store.mset([(HIGH_WATER_MARK_KEY, str(xid).encode())])
+
+    def snapshot_xmin(self) -> Optional[int]:
+        """The oldest running transaction ID, or ``None`` if the server cannot report it."""
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(text(SNAPSHOT_XMIN)).scalar()
+        except ProgrammingError:
+            return None
+
+    def sync_once(self) -> SyncResult:
+        """Apply every change of the transactions finished since the high-water mark."""
+        result = SyncResult(high_water_mark=self.high_water_mark)
+        after = 0
+        until = self.snapshot_xmin()
+        if until is None or until <= result.high_water_mark:
+            return result
+
+        while True:
+            with self.engine.connect() as conn:
+                changes = conn.execute(text(PENDING_CHANGES), {"since": result.high_water_mark, "until": until,
+                                                               "after": after, "limit": self.batch_size}).all()
+                if not changes:
+                    break
+                track_ids = sorted({track_id for _, track_id in changes})
+                rows = conn.execute(text(TRACKS_BY_ID), {"track_ids": track_ids}).all()
+
+            self._apply(track_ids, rows, result)
+            after = changes[-1][0]
+            if len(changes) < self.batch_size:
+                break
+
+        # Only a completed window moves the mark; an interrupted one is re-read, which is idempotent
+        result.high_water_mark = until
+        self.high_water_mark = until
+
+        if result.upserted or result.deleted:
+            mark_catalog_changed(self.store)
+            if self.on_change:
+                self.on_change()
+        return result
+
+    def _apply(self, track_ids: list, rows: list, result: SyncResult) -> None:
+        collection = self.vector_store._collection
+        documents = [track_document(row) for row in rows]
+
+        # Tracks that were changed but no longer exist have been deleted
+        present = {f"track-{row.TrackId}" for row in rows}
+        removed = [f"track-{track_id}" for track_id in track_ids if f"track-{track_id}" not in present]
+        if removed:
+            collection.delete(ids=removed)
+            result.deleted += len(removed)
+
+        if not documents:
+            return
+        stored = collection.get(ids=[doc_id for doc_id, _, _ in documents], include=["metadatas"])
+        stored_hashes = {doc_id: (meta or {}).get('content_hash')
+                         for doc_id, meta in zip(stored["ids"], stored["metadatas"])}
+        changed = [doc for doc in documents if stored_hashes.get(doc[0]) != doc[2]['content_hash']]
+        result.unchanged += len(documents) - len(changed)
+        if not changed:
+            return
+
+        ids, contents, metadatas = (list(values) for values in zip(*changed))
+        collection.upsert(ids=ids, embeddings=self.embeddings.embed_documents(contents),
+                          documents=contents, metadatas=metadatas)
+        result.upserted += len(ids)
+
+    async def run(self, interval_seconds: float = 60) -> None:
+        """Sync forever; run as a background task."""
+        while True:
+            try:
+                result = await asyncio.to_thread(self.sync_once)
+                if result.upserted or result.deleted:
+                    print(f"Catalog sync: {result.upserted} tracks updated, {result.deleted} removed")
+            except Exception as e:
+                print(f"Catalog sync failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    from config import engine, vector_store, embedding_function, store, CATALOG_SYNC_INTERVAL
+
+    parser = argparse.ArgumentParser(description="Sync catalog changes into the vector database")
+    parser.add_argument("--install", action="store_true", help="Create the change log and triggers")
+    parser.add_argument("--once", action="store_true", help="Apply pending changes and exit")
+    args = parser.parse_args()
+
+    sync = CatalogSync(engine, vector_store, embedding_function, store)
+    if args.install:
+        sync.install()
+        print("SUCCESS: Catalog change log and triggers installed")
+    elif args.once:
+        print(sync.sync_once())
+    else:
+        try:
+            asyncio.run(sync.run(CATALOG_SYNC_INTERVAL or 60))
+        except KeyboardInterrupt:
+            print("\nCatalog sync stopped.")
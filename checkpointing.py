@@ -0,0 +1,211 @@
+"""
+Pluggable checkpointer backends for the conversation graphs.
+
+The graphs are compiled at import time, but the persistent async savers
+(SQLite, Postgres) must be created inside a running event loop. The
+``ManagedCheckpointer`` defined here is handed to ``compile`` immediately and
+opens the configured backend on first use.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (BaseCheckpointSaver, ChannelVersions, Checkpoint,
+                                       CheckpointMetadata, CheckpointTuple)
+from langgraph.checkpoint.memory import MemorySaver
+
+BACKENDS = ("memory", "sqlite", "postgres")
+
+# How compiled sub-agent graphs checkpoint when embedded in the parent graph:
+#   none     - no checkpoints of their own; state flows through the parent
+#   inherit  - use the parent's saver under the subgraph's checkpoint namespace
+#   separate - use the saver directly, persisting every sub-agent step
+SUBAGENT_CHECKPOINT_MODES = ("none", "inherit", "separate")
+
+# Postgres fast path for pruning; the generic path has to load every checkpoint
+_POSTGRES_IDLE_THREADS = """
+    SELECT thread_id
+    FROM checkpoints
+    GROUP BY thread_id
+    HAVING max((checkpoint->>'ts')::timestamptz) < now() - make_interval(secs => %s)
+"""
+
+
+def resolve_subagent_checkpointer(mode: str, checkpointer: BaseCheckpointSaver) -> Any:
+    """Resolve the ``checkpointer`` argument for compiling a sub-agent graph.
+
+    Args:
+        mode: One of ``SUBAGENT_CHECKPOINT_MODES``.
+        checkpointer: The parent graph's saver.
+
+    Returns:
+        ``False``, ``None`` or ``checkpointer``, as understood by ``compile``.
+    """
+    if mode not in SUBAGENT_CHECKPOINT_MODES:
+        raise ValueError(f"Unknown sub-agent checkpoint mode '{mode}'. "
+                         f"Expected one of {SUBAGENT_CHECKPOINT_MODES}.")
+    return {"none": False, "inherit": None, "separate": checkpointer}[mode]
+
+
+class ManagedCheckpointer(BaseCheckpointSaver):
+    """
+    Checkpoint saver that delegates to a lazily opened backend.
+
+    Args:
+        backend: One of ``"memory"``, ``"sqlite"`` or ``"postgres"``.
+        sqlite_path: Database file used by the SQLite backend.
+        postgres_url: libpq connection string used by the Postgres backend.
+        pool_size: Maximum connections in the Postgres connection pool.
+    """
+
+    def __init__(self, backend: str = "memory", sqlite_path: Optional[str] = None,
+                 postgres_url: Optional[str] = None, pool_size: int = 10):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown checkpointer backend '{backend}'. Expected one of {BACKENDS}.")
+        super().__init__()
+        self.backend = backend
+        self.sqlite_path = sqlite_path
+        self.postgres_url = postgres_url
+        self.pool_size = pool_size
+        self._saver: Optional[BaseCheckpointSaver] = MemorySaver() if backend == "memory" else None
+        self._resource: Any = None
+        self._open_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def saver(self) -> BaseCheckpointSaver:
+        """The opened backend saver."""
+        if self._saver is None:
+            raise RuntimeError(f"The {self.backend} checkpointer is opened on first async use; "
+                               "run the graph with ainvoke/astream or await setup() first.")
+        return self._saver
+
+    async def setup(self) -> BaseCheckpointSaver:
+        """Open the backend and create its tables if needed (idempotent)."""
+        if self._saver is not None:
+            return self._saver
+
+        if self._open_lock is None:
+            self._open_lock = asyncio.Lock()
+        async with self._open_lock:
+            if self._saver is None:
+                self._saver = await self._open_backend()
+        return self._saver
+
+    async def _open_backend(self) -> BaseCheckpointSaver:
+        try:
+            if self.backend == "sqlite":
+                import aiosqlite
+                from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+                self._resource = await aiosqlite.connect(self.sqlite_path)
+                saver = AsyncSqliteSaver(self._resource)
+            else:
+                from psycopg.rows import dict_row
+                from psycopg_pool import AsyncConnectionPool
+                from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+                self._resource = AsyncConnectionPool(
+                    self.postgres_url,
+                    max_size=self.pool_size,
+                    open=False,
+                    kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                )
+                await self._resource.open()
+                saver = AsyncPostgresSaver(self._resource)
+        except ImportError as e:
+            raise ImportError(f"The {self.backend} checkpointer backend needs an extra package: {e}. "
+                              "Run 'poetry install' to install required packages.") from e
+
+        await saver.setup()
+        self.serde = saver.serde
+        return saver
+
+    async def aclose(self) -> None:
+        """Close the backend connection or pool."""
+        if self._resource is not None:
+            await self._resource.close()
+            self._resource = None
+            self._saver = None
+
+    async def prune_idle_threads(self, ttl_seconds: float) -> int:
+        """Delete every thread whose latest checkpoint is older than ``ttl_seconds``.
+
+        Returns:
+            int: The number of threads deleted.
+        """
+        saver = await self.setup()
+        if self.backend == "postgres":
+            async with self._resource.connection() as conn:
+                rows = await (await conn.execute(_POSTGRES_IDLE_THREADS, (ttl_seconds,))).fetchall()
+            idle_threads = [row["thread_id"] for row in rows]
+        else:
+            cutoff = time.time() - ttl_seconds
+            last_seen: dict = {}
+            async for item in saver.alist(None):
+                thread_id = item.config["configurable"]["thread_id"]
+                ts = datetime.fromisoformat(item.checkpoint["ts"]).timestamp()
+                last_seen[thread_id] = max(ts, last_seen.get(thread_id, 0.0))
+            idle_threads = [thread_id for thread_id, ts in last_seen.items() if ts < cutoff]
+
+        for thread_id in idle_threads:
+            await saver.adelete_thread(thread_id)
+        return len(idle_threads)
+
+    async def run_pruner(self, ttl_seconds: float, interval_seconds: float = 300) -> None:
+        """Prune idle threads forever; run as a background task."""
+        while True:
+            try:
+                pruned = await self.prune_idle_threads(ttl_seconds)
+                if pruned:
+                    print(f"Pruned {pruned} idle conversation threads "
+                          f"at {datetime.now(timezone.utc).isoformat(timespec='seconds')}")
+            except Exception as e:
+                print(f"Checkpoint pruning failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    # Synchronous interface (only the memory backend supports it from the event loop)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.saver.get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], **kwargs: Any) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, **kwargs)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint,
+            metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]],
+                   task_id: str, task_path: str = "") -> None:
+        return self.saver.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        return self.saver.delete_thread(thread_id)
+
+    # Asynchronous interface
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await (await self.setup()).aget_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], **kwargs: Any) -> AsyncIterator[CheckpointTuple]:
+        async for item in (await self.setup()).alist(config, **kwargs):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint,
+                   metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return await (await self.setup()).aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]],
+                          task_id: str, task_path: str = "") -> None:
+        return await (await self.setup()).aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await (await self.setup()).adelete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[Any], channel: Any = None) -> Any:
+        if self._saver is None:
+            return super().get_next_version(current, channel)
+        return self._saver.get_next_version(current, channel)
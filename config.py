@@ -1,13 +1,22 @@
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
+import time
+
+# Start of the config import, for the start-up profile
+_import_started = time.perf_counter()
+
 from langchain.storage import LocalFileStore
-from sqlalchemy import create_engine
-from langchain_community.utilities.sql_database import SQLDatabase
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-from langchain_chroma import Chroma
+from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
+from checkpointing import ManagedCheckpointer, resolve_subagent_checkpointer
+from history import HistoryPolicy
+from embeddings import CachedEmbeddings
+from llm_cache import ResponseCache
+from cache import LRUCache, SingleFlight
+from instrumentation import enable_trace
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
 import os
 import sys
+import threading
 
 load_dotenv()
 
@@ -32,6 +41,27 @@ if missing_vars:
     print("\nPlease set these variables in your .env file.")
     sys.exit(1)
 
+# Console output options
+STREAM_OUTPUT = os.getenv("STREAM_OUTPUT", "false").lower() == "true"
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+# Build the LLM client, database engine and vector store in the background at start-up
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+
+# Per-node latency, token and query metrics (GET /metrics), plus an optional JSON-lines span file
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "true").lower() == "true"
+INSTRUMENTATION_TRACE_FILE = os.getenv("INSTRUMENTATION_TRACE_FILE", "")
+if INSTRUMENTATION_TRACE_FILE:
+    enable_trace(INSTRUMENTATION_TRACE_FILE)
+
+# Multi-session server configuration; the API and /metrics are unauthenticated, so only
+# listen beyond localhost behind a proxy that adds authentication
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_MAX_CONCURRENCY = int(os.getenv("SERVER_MAX_CONCURRENCY", "32"))
+SERVER_MAX_SESSIONS = int(os.getenv("SERVER_MAX_SESSIONS", "1024"))
+SESSION_QUEUE_SIZE = int(os.getenv("SESSION_QUEUE_SIZE", "8"))
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "300"))
+
 # Create storage directory
 STORAGE_DIR = "./storage"
 if not os.path.exists(STORAGE_DIR):
@@ -41,20 +71,61 @@ if not os.path.exists(STORAGE_DIR):
         print(f"ERROR: Could not create storage directory: {e}")
         sys.exit(1)
 
-# Initialize LLM with error handling
-try:
-    llm = ChatOpenAI(
-        model="gpt-4o-mini", 
-        temperature=0,
-        api_key=os.getenv("OPENAI_API_KEY")
-    )
-except Exception as e:
-    print(f"ERROR: Failed to initialize OpenAI client: {e}")
-    sys.exit(1)
+# Routing cache configuration
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", "2048"))
+ROUTE_CACHE_TTL = float(os.getenv("ROUTE_CACHE_TTL", "3600"))
+ROUTE_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("ROUTE_CACHE_SIMILARITY_THRESHOLD", "0.9"))
 
-# Initialize memory components
-checkpointer = MemorySaver()
-store = LocalFileStore(STORAGE_DIR)
+# Local intent classifier configuration
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.55"))
+INTENT_MIN_MARGIN = float(os.getenv("INTENT_MIN_MARGIN", "0.05"))
+
+# Music catalog search
+MUSIC_SEARCH_K = int(os.getenv("MUSIC_SEARCH_K", "5"))
+MUSIC_SEARCH_MAX_K = int(os.getenv("MUSIC_SEARCH_MAX_K", "20"))
+MUSIC_SEARCH_RRF_K = int(os.getenv("MUSIC_SEARCH_RRF_K", "60"))
+
+# Embedding model and its cache; all-MiniLM-L6-v2 is uncased, so case can be folded
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+# Only query vectors are persisted, up to this many files (0 removes the limit)
+EMBEDDING_CACHE_PERSIST = os.getenv("EMBEDDING_CACHE_PERSIST", "true").lower() == "true"
+EMBEDDING_CACHE_PERSIST_MAX = int(os.getenv("EMBEDDING_CACHE_PERSIST_MAX", "50000"))
+EMBEDDING_CACHE_LOWERCASE = os.getenv("EMBEDDING_CACHE_LOWERCASE", "true").lower() == "true"
+
+# Vector catalog seeding (seed_music_data.py)
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "1000"))
+# Every encoder process loads its own copy of the model, so keep this small
+SEED_EMBEDDING_PROCESSES = int(os.getenv("SEED_EMBEDDING_PROCESSES", "2"))
+
+# Incremental catalog sync into the vector store, in seconds; needs `catalog_sync.py --install`,
+# so the background job is off (0) unless set
+CATALOG_SYNC_INTERVAL = float(os.getenv("CATALOG_SYNC_INTERVAL", "0"))
+CATALOG_SYNC_BATCH_SIZE = int(os.getenv("CATALOG_SYNC_BATCH_SIZE", "500"))
+
+# Exact-match cache of LLM responses (the shared client runs at temperature 0)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "true").lower() == "true"
+# Identical LLM prompts and tool calls in flight at the same time share one execution
+COALESCE_CALLS = os.getenv("COALESCE_CALLS", "true").lower() == "true"
+
+# Results of the catalog tools; reseeding or a catalog sync clears them within the check interval
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "512"))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "3600"))
+CATALOG_CACHE_CHECK_INTERVAL = float(os.getenv("CATALOG_CACHE_CHECK_INTERVAL", "5"))
+
+# Customer verification lookup
+VERIFICATION_CACHE_SIZE = int(os.getenv("VERIFICATION_CACHE_SIZE", "1024"))
+VERIFICATION_CACHE_TTL = float(os.getenv("VERIFICATION_CACHE_TTL", "900"))
+VERIFICATION_MIN_SIMILARITY = float(os.getenv("VERIFICATION_MIN_SIMILARITY", "0.6"))
+# How far the best fuzzy match must out-score the next one to verify
+VERIFICATION_MIN_MARGIN = float(os.getenv("VERIFICATION_MIN_MARGIN", "0.1"))
+# How long a verified email or name skips the database lookup, in any thread (0 disables expiry)
+VERIFIED_IDENTITY_TTL = float(os.getenv("VERIFIED_IDENTITY_TTL", "86400"))
+# Key for the HMACs naming those entries; unset, each process uses a random key and only reuses its own
+VERIFIED_IDENTITY_SECRET = os.getenv("VERIFIED_IDENTITY_SECRET", "").encode() or None
 
 # Database Configuration with validation
 DB_USER = os.getenv("DB_USER")
@@ -65,31 +136,270 @@ DB_NAME = os.getenv("DB_NAME")
 
 DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# Connection pool sizing; SQL tools run on a thread pool of the same size
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Checkpointer configuration: memory, sqlite or postgres
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "memory")
+CHECKPOINT_SQLITE_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", f"{STORAGE_DIR}/checkpoints.sqlite")
+CHECKPOINT_POSTGRES_URL = os.getenv(
+    "CHECKPOINT_POSTGRES_URL",
+    f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+CHECKPOINT_POOL_SIZE = int(os.getenv("CHECKPOINT_POOL_SIZE", "10"))
+# "exit" writes one checkpoint per turn instead of one per graph step
+CHECKPOINT_DURABILITY = os.getenv("CHECKPOINT_DURABILITY", "exit")
+# Idle threads older than this many seconds are pruned; 0 disables pruning
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", "0"))
+CHECKPOINT_PRUNE_INTERVAL = float(os.getenv("CHECKPOINT_PRUNE_INTERVAL", "300"))
+# Sub-agents run to completion within a turn, so by default they skip checkpointing
+SUBAGENT_CHECKPOINT_MODE = os.getenv("SUBAGENT_CHECKPOINT_MODE", "none")
+
+# Conversation history sent to the LLM: last-N window, token budget, rolling summary
+history_policy = HistoryPolicy(
+    max_messages=int(os.getenv("HISTORY_MAX_MESSAGES", "20")),
+    max_tokens=int(os.getenv("HISTORY_MAX_TOKENS", "4000")),
+    summarize=os.getenv("HISTORY_SUMMARIZE", "true").lower() == "true"
+)
+
+# Initialize memory components
 try:
-    from sqlalchemy import text
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_recycle=300)
-    db = SQLDatabase(engine)
-    
-    # Test connection
-    with engine.connect() as conn:
-        conn.execute(text("SELECT 1"))
-    print("Database connection established successfully")
-    
-except Exception as e:
-    print(f"ERROR: Database connection failed: {e}")
-    print("Please check your database configuration and ensure the database is running.")
+    checkpointer = ManagedCheckpointer(
+        backend=CHECKPOINTER_BACKEND,
+        sqlite_path=CHECKPOINT_SQLITE_PATH,
+        postgres_url=CHECKPOINT_POSTGRES_URL,
+        pool_size=CHECKPOINT_POOL_SIZE
+    )
+    sub_agent_checkpointer = resolve_subagent_checkpointer(SUBAGENT_CHECKPOINT_MODE, checkpointer)
+except ValueError as e:
+    print(f"ERROR: {e}")
     sys.exit(1)
+store = LocalFileStore(STORAGE_DIR)
 
-# Vector Store Configuration with error handling
-try:
-    embedding_function = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
-    vector_store = Chroma(
-        persist_directory=f"{STORAGE_DIR}/chroma_db",
-        embedding_function=embedding_function
+# Responses of the shared LLM client, see get_llm(cache=False) for the opt-out
+response_cache = ResponseCache(
+    cache=LRUCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL or None),
+    path=f"{STORAGE_DIR}/llm_cache.sqlite" if LLM_CACHE_PERSIST else None,
+    ttl=LLM_CACHE_TTL or None
+)
+# Calls in flight, by prompt hash or by tool name and arguments
+llm_flight = SingleFlight() if COALESCE_CALLS else None
+tool_flight = SingleFlight() if COALESCE_CALLS else None
+
+
+class LazyResource:
+    """
+    A shared resource that is built on first use.
+
+    Attribute access is forwarded to the resource, so ``from config import
+    llm`` followed by ``llm.ainvoke(...)`` works as if ``llm`` were the
+    client itself. The first use builds it under a lock; a failed build is
+    retried on the next use. Pass ``resolve()`` where the real object is
+    needed, e.g. to code that type-checks its arguments.
+
+    Args:
+        name: Label used in the start-up profile.
+        factory: Builds the resource.
+    """
+
+    # Probed by asyncio, inspect and mock.patch to spot coroutine functions;
+    # answering here keeps that introspection from building the resource
+    _is_coroutine = None
+    _is_coroutine_marker = None
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.resource_name = name
+        self._factory = factory
+        self.init_seconds: Optional[float] = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._value is not None
+
+    def resolve(self) -> Any:
+        """The resource, building it if this is the first use."""
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    started = time.perf_counter()
+                    value = self._factory()
+                    self.init_seconds = time.perf_counter() - started
+                    self._value = value
+        return self._value
+
+    def override(self, value: Any) -> None:
+        """Use ``value`` instead of building the resource, e.g. an offline stand-in."""
+        with self._lock:
+            self._value = value
+            self.init_seconds = 0.0
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for attributes the proxy itself does not have
+        if name.startswith("__") or name in ("resource_name", "init_seconds", "_factory", "_value", "_lock"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __repr__(self) -> str:
+        state = "initialized" if self.initialized else "not initialized"
+        return f"<LazyResource {self.resource_name} ({state})>"
+
+
+def _create_llm():
+    from langchain_openai import ChatOpenAI
+
+    try:
+        return ChatOpenAI(
+            model="gpt-4o-mini",
+            temperature=0,
+            api_key=os.getenv("OPENAI_API_KEY"),
+            cache=response_cache if LLM_CACHE_ENABLED else False
+        )
+    except Exception as e:
+        print(f"ERROR: Failed to initialize OpenAI client: {e}")
+        raise
+
+
+def _create_engine():
+    try:
+        engine = create_engine(
+            DATABASE_URL,
+            pool_pre_ping=True,
+            pool_recycle=300,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+
+        # Test connection
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        print(f"ERROR: Database connection failed: {e}")
+        print("Please check your database configuration and ensure the database is running.")
+        raise
+    print("Database connection established successfully")
+    return engine
+
+
+def _create_embedding_function():
+    from langchain_community.embeddings import SentenceTransformerEmbeddings
+
+    return CachedEmbeddings(
+        SentenceTransformerEmbeddings(model_name=EMBEDDING_MODEL),
+        model_name=EMBEDDING_MODEL,
+        cache=LRUCache(maxsize=EMBEDDING_CACHE_SIZE),
+        store=LocalFileStore(f"{STORAGE_DIR}/embedding_cache") if EMBEDDING_CACHE_PERSIST else None,
+        lowercase=EMBEDDING_CACHE_LOWERCASE,
+        max_persisted=EMBEDDING_CACHE_PERSIST_MAX or None
     )
-    vector_retriever = vector_store
+
+
+def _create_vector_store():
+    from langchain_chroma import Chroma
+
+    try:
+        vector_store = Chroma(
+            persist_directory=f"{STORAGE_DIR}/chroma_db",
+            embedding_function=get_embedding_function()
+        )
+    except Exception as e:
+        print(f"ERROR: Vector store initialization failed: {e}")
+        raise
     print("Vector store initialized successfully")
-    
-except Exception as e:
-    print(f"ERROR: Vector store initialization failed: {e}")
-    sys.exit(1)
\ No newline at end of file
+    return vector_store
+
+
+# Shared resources, built on first use (or by warm_up)
+llm = LazyResource("llm", _create_llm)
+# The same client without the response cache, for prompts that never repeat
+uncached_llm = LazyResource("uncached_llm", lambda: get_llm().model_copy(update={"cache": False}))
+engine = LazyResource("engine", _create_engine)
+embedding_function = LazyResource("embedding_function", _create_embedding_function)
+vector_store = LazyResource("vector_store", _create_vector_store)
+vector_retriever = vector_store
+
+RESOURCES = (llm, engine, embedding_function, vector_store)
+
+
+def get_llm(cache: bool = True):
+    """The shared ``ChatOpenAI`` client.
+
+    Args:
+        cache: Answer repeated prompts from ``response_cache``. Pass
+            ``False`` for nodes whose prompts are specific to one
+            conversation or customer, so they neither miss on every call
+            nor write personal data to the cache.
+    """
+    return llm.resolve() if cache else uncached_llm.resolve()
+
+
+def get_engine():
+    """The SQLAlchemy engine, tested with ``SELECT 1`` when first built."""
+    return engine.resolve()
+
+
+def get_embedding_function():
+    """The cached sentence-transformer embeddings."""
+    return embedding_function.resolve()
+
+
+def get_vector_store():
+    """The Chroma store holding the music catalog."""
+    return vector_store.resolve()
+
+
+def _try_get(resource: LazyResource) -> None:
+    try:
+        resource.resolve()
+    except Exception:
+        # Already reported by the factory; the first real use retries
+        pass
+
+
+def warm_up(resources=(llm, engine, embedding_function, vector_store), report: bool = DEBUG) -> threading.Thread:
+    """Build the slow resources concurrently in a background thread.
+
+    The OpenAI client, the database connection test and the embedding model
+    load are independent, so they overlap; the vector store waits only for
+    the embeddings. Requests arriving meanwhile block on the resource they
+    need, not on all of them.
+
+    Args:
+        resources: The resources to build.
+        report: Print the start-up profile once they are built.
+
+    Returns:
+        threading.Thread: The (daemon) warm-up thread.
+    """
+    def run():
+        with ThreadPoolExecutor(max_workers=len(resources), thread_name_prefix="warmup") as pool:
+            list(pool.map(_try_get, resources))
+        if report:
+            print(startup_profile())
+
+    thread = threading.Thread(target=run, name="config-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def startup_profile() -> str:
+    """How long importing this module and building each resource took."""
+    lines = ["Start-up profile:", f"  {'config import':<20}{import_seconds * 1000:>9.0f} ms"]
+    for resource in RESOURCES:
+        if resource.init_seconds is None:
+            lines.append(f"  {resource.resource_name:<20}{'not built':>12}")
+        else:
+            lines.append(f"  {resource.resource_name:<20}{resource.init_seconds * 1000:>9.0f} ms")
+    return "\n".join(lines)
+
+
+import_seconds = time.perf_counter() - _import_started
+
+if __name__ == "__main__":
+    # poetry run python config.py: build everything once and show where start-up time goes
+    warm_up(report=False).join()
+    print(startup_profile())
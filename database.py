@@ -0,0 +1,88 @@
+"""
+Database access helpers shared by the agent tools.
+
+``fetch_rows`` returns plain tuples straight from the cursor together with
+the column names, and ``QueryResult.to_table`` renders them as a compact
+tab-separated table for the LLM instead of the repr of a list of dicts.
+
+SQL tools run the synchronous SQLAlchemy/psycopg2 stack, so their async path
+is offloaded to a dedicated thread pool sized to the engine's connection
+pool: a slow query then occupies one worker thread instead of the event
+loop, and threads never queue up waiting for a pooled connection.
+Concurrent calls of a tool with the same arguments run the query once.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from langchain_core.tools import StructuredTool
+from sqlalchemy import text
+
+from config import engine, tool_flight, DB_POOL_SIZE, DB_MAX_OVERFLOW
+from instrumentation import instrumented_tool, record_query
+from utils import offloaded_tool
+
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE + DB_MAX_OVERFLOW,
+                                 thread_name_prefix="sql")
+
+# SQL tools only read, so identical calls in flight can share one query
+_offload_to_db_executor = offloaded_tool(db_executor, coalesce=tool_flight)
+
+
+def sql_tool(func: Callable) -> StructuredTool:
+    """Decorator for tools that query the database; calls are timed per tool."""
+    return _offload_to_db_executor(instrumented_tool(func))
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, Decimal):
+        return format(value.normalize(), "f")
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat(sep=" ")
+    return str(value).replace("\t", " ").replace("\n", " ")
+
+
+@dataclass(frozen=True, slots=True)
+class QueryResult:
+    """Column names and row tuples returned by a query."""
+    columns: Tuple[str, ...]
+    rows: List[tuple]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[tuple]:
+        return iter(self.rows)
+
+    def first(self) -> Optional[tuple]:
+        """The first row, or ``None`` for an empty result."""
+        return self.rows[0] if self.rows else None
+
+    def to_table(self) -> str:
+        """Render as a tab-separated table with a header line."""
+        lines = ["\t".join(self.columns)]
+        lines.extend("\t".join(_format_value(value) for value in row) for row in self.rows)
+        return "\n".join(lines)
+
+
+def fetch_rows(query: str, parameters: Optional[dict] = None) -> QueryResult:
+    """Run a query and return its rows as tuples.
+
+    Args:
+        query: SQL text using ``:name`` bind parameters.
+        parameters: Values for the bind parameters.
+
+    Returns:
+        QueryResult: Column names and row tuples.
+    """
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        result = conn.execute(text(query), parameters or {})
+        query_result = QueryResult(tuple(result.keys()), [tuple(row) for row in result])
+    record_query(time.perf_counter() - started, len(query_result))
+    return query_result
@@ -0,0 +1,155 @@
+"""
+Embedding cache shared by retrieval, routing and any other embedding users.
+
+``CachedEmbeddings`` wraps a LangChain ``Embeddings`` model. Vectors are kept
+in an in-memory LRU and, optionally, in a byte store on disk so query vectors
+survive restarts. Keys combine the model name with the normalized text, so
+switching models never returns stale vectors.
+"""
+
+import hashlib
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.stores import ByteStore
+
+from cache import LRUCache
+from instrumentation import record_embedding
+
+
+@dataclass
+class EmbeddingCacheStats:
+    """Lookup counters across both cache tiers."""
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with an LRU and optional persistent cache.
+
+    Args:
+        embeddings: The model that computes vectors on a miss.
+        model_name: Included in every key to keep models apart.
+        cache: In-memory LRU of vectors.
+        store: Optional byte store (e.g. a ``LocalFileStore`` under
+            ``storage/``) persisting query vectors across restarts.
+        lowercase: Also fold case when normalizing text. Only enable this
+            for uncased models, where case does not change the vector.
+        persist_documents: Also write document vectors to ``store``. Off by
+            default: bulk jobs such as seeding and ``CatalogSync`` embed every
+            track, and the vector store already keeps those vectors.
+        max_persisted: Most vectors kept in ``store`` for this model; once
+            reached, new vectors are only cached in memory. ``None`` means
+            no limit.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: Optional[LRUCache] = None,
+                 store: Optional[ByteStore] = None, lowercase: bool = False,
+                 persist_documents: bool = False, max_persisted: Optional[int] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache if cache is not None else LRUCache(maxsize=4096)
+        self.store = store
+        self.lowercase = lowercase
+        self.persist_documents = persist_documents
+        self.max_persisted = max_persisted
+        self._persisted: Optional[int] = None
+        self._lock = threading.Lock()
+        self._disk_hits = 0
+        self._misses = 0
+
+    def normalize(self, text: str) -> str:
+        """Collapse whitespace (and case, if enabled) so trivial variants share a key."""
+        text = " ".join(text.split())
+        return text.lower() if self.lowercase else text
+
+    def _prefix(self) -> str:
+        return f"{self.model_name.replace('/', '_')}/"
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.sha256(f"{self.model_name}\0{self.normalize(text)}".encode()).hexdigest()
+        return f"{self._prefix()}{digest}"
+
+    def _persist(self, items: List[Tuple[str, List[float]]]) -> None:
+        """Write vectors to the store, up to ``max_persisted`` for this model."""
+        if self.max_persisted is None:
+            self.store.mset([(key, array("f", vector).tobytes()) for key, vector in items])
+            return
+        with self._lock:
+            if self._persisted is None:
+                # Counted once per process; later writes keep the count up to date
+                self._persisted = sum(1 for _ in self.store.yield_keys(prefix=self._prefix()))
+            items = items[:max(self.max_persisted - self._persisted, 0)]
+            if items:
+                self.store.mset([(key, array("f", vector).tobytes()) for key, vector in items])
+                self._persisted += len(items)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, computing only the ones not found in either cache tier."""
+        keys = [self._key(text) for text in texts]
+        vectors: List[Optional[List[float]]] = [self.cache.get(key) for key in keys]
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing and self.store is not None:
+            stored = self.store.mget([keys[i] for i in missing])
+            for i, raw in zip(missing, stored):
+                if raw is not None:
+                    vectors[i] = array("f", raw).tolist()
+                    self.cache.set(keys[i], vectors[i])
+                    self._disk_hits += 1
+            missing = [i for i in missing if vectors[i] is None]
+
+        if missing:
+            # Embed each distinct text once, even if it repeats within the batch
+            unique = list(dict.fromkeys(keys[i] for i in missing))
+            first_text = {keys[i]: texts[i] for i in reversed(missing)}
+            started = time.perf_counter()
+            computed = dict(zip(unique, self.embeddings.embed_documents([first_text[key] for key in unique])))
+            record_embedding(time.perf_counter() - started, len(unique), "documents")
+            for i in missing:
+                vectors[i] = computed[keys[i]]
+            for key, vector in computed.items():
+                self.cache.set(key, vector)
+            if self.store is not None and self.persist_documents:
+                self._persist(list(computed.items()))
+            self._misses += len(missing)
+
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query through the cache."""
+        key = self._key(text)
+        vector = self.cache.get(key)
+        if vector is not None:
+            return vector
+
+        raw = self.store.mget([key])[0] if self.store is not None else None
+        if raw is not None:
+            vector = array("f", raw).tolist()
+            self._disk_hits += 1
+        else:
+            started = time.perf_counter()
+            vector = self.embeddings.embed_query(text)
+            record_embedding(time.perf_counter() - started, 1, "query")
+            if self.store is not None:
+                self._persist([(key, vector)])
+            self._misses += 1
+        self.cache.set(key, vector)
+        return vector
+
+    def stats(self) -> EmbeddingCacheStats:
+        """Hit and miss counts since start-up."""
+        return EmbeddingCacheStats(memory_hits=self.cache.stats.hits,
+                                   disk_hits=self._disk_hits,
+                                   misses=self._misses)
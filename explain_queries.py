@@ -0,0 +1,85 @@
+"""
+Run EXPLAIN ANALYZE on every tool query and report plans and timings.
+
+Each query in ``queries.py`` is executed with representative parameters
+against the seeded database. The summary lists planning and execution time
+and flags sequential scans, which usually mean an index from
+``optimize_database.py`` is missing or not applicable.
+
+Usage:
+    poetry run python explain_queries.py [--verbose] [--query CUSTOMER_BY_EMAIL]
+"""
+import argparse
+import json
+
+from sqlalchemy import text
+
+import queries
+from config import engine
+
+# Representative values for every bind parameter used in queries.py
+SAMPLE_PARAMETERS = {
+    "email": "luisg@embraer.com.br",
+    "full_name": "Luís Gonçalves",
+    "identifier": "luis goncalves",
+    "min_similarity": 0.5,
+    "pattern": "%goncalves%",
+    "customer_id": 1,
+    "invoice_id": 1,
+    "start_date": None,
+    "end_date": None,
+    "limit": 10,
+    "offset": 0,
+    "artist_name": "%queen%",
+}
+
+
+def tool_queries() -> dict:
+    """Every public SQL constant defined in queries.py, by name."""
+    return {name: value for name, value in vars(queries).items()
+            if name.isupper() and not name.startswith("_") and isinstance(value, str)}
+
+
+def walk_plan(node: dict):
+    """Yield a plan node and all of its children."""
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+def sample_parameters(query: str) -> dict:
+    """Sample values for the bind parameters a query uses."""
+    return {name: SAMPLE_PARAMETERS[name] for name in text(query).compile().params}
+
+
+def explain(conn, query: str) -> dict:
+    """EXPLAIN ANALYZE a query with sample parameters and return the JSON plan."""
+    plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"),
+                        sample_parameters(query)).scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]
+
+
+def report(names=None, verbose=False):
+    selected = {name: query for name, query in tool_queries().items() if not names or name in names}
+
+    print(f"{'query':>34} {'plan ms':>8} {'exec ms':>8}  seq scans")
+    with engine.connect() as conn:
+        for name, query in selected.items():
+            result = explain(conn, query)
+            nodes = list(walk_plan(result["Plan"]))
+            seq_scans = sorted({node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"})
+            print(f"{name:>34} {result['Planning Time']:8.2f} {result['Execution Time']:8.2f}  "
+                  f"{', '.join(seq_scans) or '-'}")
+
+            if verbose:
+                for line in conn.execute(text(f"EXPLAIN ANALYZE {query}"), sample_parameters(query)):
+                    print(f"    {line[0]}")
+                print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--verbose", action="store_true", help="Print the full text plan of each query")
+    parser.add_argument("--query", action="append", help="Only explain this query (repeatable)")
+    args = parser.parse_args()
+    report(args.query, args.verbose)
@@ -0,0 +1,109 @@
+"""
+Conversation history policy shared by every node that calls the LLM.
+
+Long threads are kept bounded in two ways: a summarization step folds the
+oldest turns into a rolling ``summary`` stored on the state, and each node
+sends the LLM only a window of recent messages trimmed to a token budget.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from langchain_core.messages import (AnyMessage, BaseMessage, HumanMessage, RemoveMessage,
+                                     SystemMessage, trim_messages)
+from langchain_core.messages.utils import count_tokens_approximately
+
+
+@dataclass(frozen=True)
+class HistoryPolicy:
+    """
+    Limits applied to the message history sent to the LLM.
+
+    Args:
+        max_messages: Last-N message window; 0 disables the window.
+        max_tokens: Approximate token budget for the history; 0 disables it.
+        summarize: Fold messages beyond the window into a rolling summary.
+    """
+    max_messages: int = 20
+    max_tokens: int = 4000
+    summarize: bool = True
+
+
+def _window_start(messages: Sequence[AnyMessage], max_messages: int) -> int:
+    """Index where the last-N window starts, moved back to a human turn.
+
+    Starting on a human message keeps AI tool calls paired with their results.
+    """
+    if not max_messages or len(messages) <= max_messages:
+        return 0
+    start = len(messages) - max_messages
+    while start > 0 and not isinstance(messages[start], HumanMessage):
+        start -= 1
+    return start
+
+
+def trim_history(messages: Sequence[AnyMessage], policy: HistoryPolicy) -> List[AnyMessage]:
+    """Apply the message window and token budget to a history."""
+    window = list(messages[_window_start(messages, policy.max_messages):])
+    if not policy.max_tokens:
+        return window
+
+    trimmed = trim_messages(window,
+                            max_tokens=policy.max_tokens,
+                            token_counter=count_tokens_approximately,
+                            strategy="last",
+                            start_on="human",
+                            allow_partial=False)
+    # Always keep the latest turn, even if it alone exceeds the budget
+    return trimmed or window[_window_start(window, 1):]
+
+
+def build_llm_messages(state: dict, system_prompt: str, policy: HistoryPolicy) -> List[BaseMessage]:
+    """System prompt, rolling summary and trimmed history for an LLM call."""
+    messages: List[BaseMessage] = [SystemMessage(content=system_prompt)]
+    if state.get("summary"):
+        messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{state['summary']}"))
+    return messages + trim_history(state["messages"], policy)
+
+
+SUMMARY_PROMPT = """You maintain a running summary of a customer support conversation.
+Extend the existing summary with the new messages. Keep names, email addresses, invoice numbers,
+artists and any open requests. Reply with the updated summary only."""
+
+
+def create_summarize_node(llm, policy: HistoryPolicy):
+    """Create a graph node that folds messages beyond the window into ``summary``.
+
+    Summarization runs once the history exceeds ``policy.max_messages`` and
+    keeps about half the window, so it happens every few turns rather than
+    on every turn.
+
+    Args:
+        llm: Chat model used to write the summary.
+        policy: The history policy to enforce.
+
+    Returns:
+        An async node returning the summary and removals for old messages.
+    """
+    async def summarize_history(state: dict) -> dict:
+        messages = state["messages"]
+        if not policy.summarize or not policy.max_messages or len(messages) <= policy.max_messages:
+            return {}
+
+        keep_from = _window_start(messages, max(policy.max_messages // 2, 1))
+        overflow = messages[:keep_from]
+        if not overflow:
+            return {}
+
+        transcript = "\n".join(f"{msg.type}: {msg.content}" for msg in overflow if msg.content)
+        previous: Optional[str] = state.get("summary")
+        response = await llm.ainvoke([
+            ("system", SUMMARY_PROMPT),
+            ("human", f"Existing summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"),
+        ])
+        return {
+            "summary": response.content,
+            "messages": [RemoveMessage(id=msg.id) for msg in overflow],
+        }
+
+    return summarize_history
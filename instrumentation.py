@@ -0,0 +1,339 @@
+"""
+Latency, token and query instrumentation for the multi-agent graph.
+
+``InstrumentationHandler`` is a LangChain callback handler. Added to a turn's
+``callbacks`` it times the whole turn, every graph node (sub-agent nodes as
+``music_agent/agent``), every conditional edge such as ``router`` and every
+LLM call, and counts the LLM's prompt and completion tokens.
+``instrumented_tool`` wraps a tool function to time each call, and the
+database and embedding layers report their work through ``record_query``
+and ``record_embedding``. Those measurements are attributed to the graph
+node and tool they ran in.
+
+Everything is collected in ``metrics``, which renders in the Prometheus text
+format (``GET /metrics`` on the server). After ``enable_trace`` each
+measurement is also appended to a JSON-lines trace file as one span.
+"""
+
+import functools
+import json
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import var_child_runnable_config
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000)
+
+# Name of the instrumented tool running in the current context
+_current_tool: ContextVar[Optional[str]] = ContextVar("instrumented_tool", default=None)
+
+
+def _format_labels(labels: tuple, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    """
+    Thread-safe labelled counters and histograms.
+
+    Args:
+        prefix: Prepended to every metric name when rendered.
+    """
+
+    def __init__(self, prefix: str = "support_"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop every recorded value."""
+        with self._lock:
+            self._counters: Dict[str, Dict[tuple, float]] = defaultdict(lambda: defaultdict(float))
+            self._histograms: Dict[str, Dict[tuple, list]] = defaultdict(dict)
+            self._buckets: Dict[str, tuple] = {}
+
+    def increment(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """Add ``value`` to a counter."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._counters[name][key] += value
+
+    def observe(self, name: str, value: float, buckets: tuple = DURATION_BUCKETS, **labels: str) -> None:
+        """Record one observation in a histogram."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._buckets.setdefault(name, buckets)
+            # Per label set: one count per bucket, then sum and count
+            series = self._histograms[name].setdefault(key, [0] * len(self._buckets[name]) + [0.0, 0])
+            for i, bound in enumerate(self._buckets[name]):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def counter(self, name: str, **labels: str) -> float:
+        """Current value of a counter."""
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0.0)
+
+    def histogram(self, name: str, **labels: str) -> Tuple[int, float]:
+        """``(count, sum)`` of a histogram."""
+        with self._lock:
+            series = self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+            return (series[-1], series[-2]) if series else (0, 0.0)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {self.prefix}{name} counter")
+                lines.extend(f"{self.prefix}{name}{_format_labels(labels)} {value:g}"
+                             for labels, value in sorted(series.items()))
+            for name, series in sorted(self._histograms.items()):
+                full_name = self.prefix + name
+                lines.append(f"# TYPE {full_name} histogram")
+                for labels, values in sorted(series.items()):
+                    # Buckets are cumulative in the exposition format, and counted that way above
+                    for bound, count in zip(self._buckets[name], values):
+                        lines.append(f"{full_name}_bucket{_format_labels(labels, le=f'{bound:g}')} {count}")
+                    lines.append(f"{full_name}_bucket{_format_labels(labels, le='+Inf')} {values[-1]}")
+                    lines.append(f"{full_name}_sum{_format_labels(labels)} {values[-2]:g}")
+                    lines.append(f"{full_name}_count{_format_labels(labels)} {values[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+class TraceWriter:
+    """Appends spans to a JSON-lines file, opened on the first write."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, span: dict) -> None:
+        line = json.dumps(span, default=str)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+metrics = Metrics()
+_trace: Optional[TraceWriter] = None
+
+
+def enable_trace(path: str) -> None:
+    """Also append every measurement to ``path`` as a JSON span."""
+    global _trace
+    disable_trace()
+    _trace = TraceWriter(path)
+
+
+def disable_trace() -> None:
+    global _trace
+    if _trace is not None:
+        _trace.close()
+    _trace = None
+
+
+def _emit(kind: str, name: str, duration: float, **fields: Any) -> None:
+    if _trace is not None:
+        _trace.write({"ts": time.time() - duration, "kind": kind, "name": name,
+                      "duration_ms": round(duration * 1000, 3), **fields})
+
+
+def node_label(checkpoint_ns: str) -> str:
+    """``music_agent:<id>|tools:<id>`` -> ``music_agent/tools``."""
+    return "/".join(part.split(":")[0] for part in checkpoint_ns.split("|") if part)
+
+
+def _current_scope() -> Tuple[str, str, Optional[str]]:
+    """``(node, tool, thread_id)`` of the code running in this context."""
+    config = var_child_runnable_config.get() or {}
+    metadata = config.get("metadata") or {}
+    namespace = metadata.get("langgraph_checkpoint_ns")
+    node = node_label(namespace) if namespace else metadata.get("langgraph_node", "")
+    thread_id = metadata.get("thread_id") or (config.get("configurable") or {}).get("thread_id")
+    return node, _current_tool.get() or "", thread_id
+
+
+def record_query(seconds: float, rows: int) -> None:
+    """Record one SQL query's duration and row count."""
+    node, tool, thread_id = _current_scope()
+    metrics.observe("db_query_duration_seconds", seconds, node=node, tool=tool)
+    metrics.observe("db_query_rows", rows, buckets=ROW_BUCKETS, node=node, tool=tool)
+    _emit("db", tool or "query", seconds, node=node, rows=rows, thread_id=thread_id)
+
+
+def record_embedding(seconds: float, texts: int, operation: str) -> None:
+    """Record time spent computing embeddings (cache hits excluded)."""
+    node, tool, thread_id = _current_scope()
+    metrics.observe("embedding_duration_seconds", seconds, node=node, tool=tool, operation=operation)
+    metrics.increment("embedding_texts_total", texts, node=node, tool=tool, operation=operation)
+    _emit("embedding", operation, seconds, node=node, tool=tool, texts=texts, thread_id=thread_id)
+
+
+def instrumented_tool(func: Callable) -> Callable:
+    """
+    Time each call of a blocking tool function.
+
+    Queries and embeddings run inside the call are attributed to the tool.
+    Apply it beneath ``@tool`` (or inside ``sql_tool``) so the tool keeps
+    the function's name, docstring and signature.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current_tool.set(func.__name__)
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            _current_tool.reset(token)
+            node, _, thread_id = _current_scope()
+            metrics.observe("tool_duration_seconds", seconds, node=node, tool=func.__name__)
+            metrics.increment("tool_calls_total", node=node, tool=func.__name__, status=status)
+            _emit("tool", func.__name__, seconds, node=node, status=status, thread_id=thread_id)
+
+    return wrapper
+
+
+def _sequence_step(tags: list) -> int:
+    for tag in tags:
+        if tag.startswith("seq:step:"):
+            return int(tag.rsplit(":", 1)[1])
+    return 0
+
+
+class InstrumentationHandler(BaseCallbackHandler):
+    """
+    Callback handler timing turns, graph nodes, conditional edges and LLM calls.
+
+    One instance can serve every concurrent turn; runs are tracked by ID.
+
+    Args:
+        registry: Where measurements are recorded.
+    """
+
+    run_inline = True
+
+    def __init__(self, registry: Metrics = metrics):
+        self.registry = registry
+        # run ID -> (kind, label, start) for timed runs
+        self._timed: Dict[UUID, Tuple[str, str, float]] = {}
+        # run ID -> label of the node or edge it runs in, for every open chain run
+        self._labels: Dict[UUID, str] = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       tags: Optional[list] = None, metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        metadata, tags = metadata or {}, tags or []
+        node = metadata.get("langgraph_node")
+        with self._lock:
+            parent = self._timed.get(parent_run_id)
+            if parent_run_id is None:
+                kind, label = "turn", "graph"
+            elif node and any(tag.startswith("graph:step:") for tag in tags):
+                kind, label = "node", node_label(metadata.get("langgraph_checkpoint_ns", node))
+            elif parent and parent[0] == "node" and _sequence_step(tags) > 1:
+                # A node's own runnable is step 1 of its sequence; later traced steps are its conditional edges
+                kind, label = "edge", "/".join(parent[1].split("/")[:-1] + [kwargs.get("name") or "edge"])
+            else:
+                if parent_run_id in self._labels:
+                    self._labels[run_id] = self._labels[parent_run_id]
+                return
+            self._labels[run_id] = label
+            self._timed[run_id] = (kind, label, time.perf_counter())
+
+    def _finish(self, run_id: UUID, status: str, metadata: Optional[dict] = None) -> None:
+        with self._lock:
+            self._labels.pop(run_id, None)
+            timed = self._timed.pop(run_id, None)
+        if timed is None:
+            return
+        kind, label, started = timed
+        seconds = time.perf_counter() - started
+        if kind == "turn":
+            self.registry.observe("graph_turn_duration_seconds", seconds, status=status)
+        else:
+            self.registry.observe("graph_node_duration_seconds", seconds, node=label)
+            if status == "error":
+                self.registry.increment("graph_node_errors_total", node=label)
+        _emit(kind, label, seconds, status=status)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "ok")
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "error")
+
+    def _start_llm(self, run_id: UUID, parent_run_id: Optional[UUID], metadata: Optional[dict]) -> None:
+        with self._lock:
+            label = self._labels.get(parent_run_id)
+            if label is None:
+                label = node_label((metadata or {}).get("langgraph_checkpoint_ns", ""))
+            self._timed[run_id] = ("llm", label, time.perf_counter())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                            metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        self._start_llm(run_id, parent_run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                     metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        self._start_llm(run_id, parent_run_id, metadata)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            timed = self._timed.pop(run_id, None)
+        if timed is None:
+            return
+        _, label, started = timed
+        seconds = time.perf_counter() - started
+        prompt_tokens, completion_tokens = _token_usage(response)
+        self.registry.observe("llm_duration_seconds", seconds, node=label)
+        self.registry.increment("llm_tokens_total", prompt_tokens, node=label, type="prompt")
+        self.registry.increment("llm_tokens_total", completion_tokens, node=label, type="completion")
+        _emit("llm", label, seconds, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            timed = self._timed.pop(run_id, None)
+        if timed is not None:
+            self.registry.increment("llm_errors_total", node=timed[1])
+
+
+def _token_usage(response) -> Tuple[int, int]:
+    """Prompt and completion tokens from an ``LLMResult``."""
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+    if not (prompt_tokens or completion_tokens):
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens", 0)
+        completion_tokens = token_usage.get("completion_tokens", 0)
+    return prompt_tokens, completion_tokens
@@ -0,0 +1,211 @@
+"""
+Exact-match cache of chat model responses.
+
+``ResponseCache`` is a LangChain ``BaseCache``: set as a chat model's
+``cache`` it is consulted before every call. LangChain keys each lookup on
+the model's settings (model name, temperature, bound tools or structured
+output schema) and the serialized prompt messages, so only a call that
+would be sent to the API unchanged can be answered from the cache. That
+only gives the same answer as the API for a deterministic model, which is
+why it is attached to the temperature-0 client in ``config``.
+
+Responses are kept in an in-memory LRU and, optionally, in a SQLite file so
+they survive restarts. ``ainvoke_coalesced`` covers what the cache cannot:
+identical prompts sent at the same time, before the first answer is stored.
+Only the first caller's callbacks see that shared call, so callers that
+stream tokens always make their own.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+from langchain_core.runnables.config import var_child_runnable_config
+from langchain_core.tracers._streaming import _StreamingCallbackHandler
+
+from cache import LRUCache, SingleFlight
+from instrumentation import metrics
+
+
+class ResponseCache(BaseCache):
+    """
+    Chat model response cache with an LRU and optional SQLite tier.
+
+    A hit returns the stored messages as new messages: without an ID (the
+    graph assigns one), with fresh tool call IDs and with their token usage
+    set to zero, since no tokens were spent on them.
+
+    Args:
+        cache: In-memory LRU of serialized responses.
+        path: Optional SQLite file persisting responses across restarts.
+        ttl: Seconds a persisted response stays valid; ``None`` keeps them
+            until cleared. Pass the same TTL to ``cache``.
+    """
+
+    def __init__(self, cache: Optional[LRUCache] = None, path: Optional[str] = None,
+                 ttl: Optional[float] = None):
+        self.cache = cache if cache is not None else LRUCache(maxsize=1024, ttl=ttl)
+        self.path = path
+        self.ttl = ttl
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, created REAL)")
+            if self.ttl:
+                db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            db.commit()
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode()).hexdigest()
+
+    def _load(self, key: str) -> Optional[str]:
+        value = self.cache.get(key)
+        if value is None and self.path:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and (not self.ttl or row[1] >= time.time() - self.ttl):
+                value = row[0]
+                self.cache.set(key, value)
+        metrics.increment("llm_cache_lookups_total", result="hit" if value is not None else "miss")
+        return value
+
+    def _store(self, key: str, value: str) -> None:
+        self.cache.set(key, value)
+        if self.path:
+            with self._lock:
+                db = self._connection()
+                db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, value, time.time()))
+                db.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        """The cached generations for this prompt and model, if any."""
+        value = self._load(self._key(prompt, llm_string))
+        return _deserialize(value) if value is not None else None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        """Store a response. Responses that are not chat messages are skipped."""
+        value = _serialize(return_val)
+        if value is not None:
+            self._store(self._key(prompt, llm_string), value)
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self._key(prompt, llm_string)
+        if key in self.cache or not self.path:
+            value = self._load(key)
+        else:
+            value = await asyncio.to_thread(self._load, key)
+        return _deserialize(value) if value is not None else None
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        value = _serialize(return_val)
+        if value is None:
+            return
+        if self.path:
+            await asyncio.to_thread(self._store, self._key(prompt, llm_string), value)
+        else:
+            self._store(self._key(prompt, llm_string), value)
+
+    def clear(self, **kwargs) -> None:
+        """Drop every response from both tiers."""
+        self.cache.clear()
+        if self.path:
+            with self._lock:
+                db = self._connection()
+                db.execute("DELETE FROM responses")
+                db.commit()
+
+
+def _serialize(generations: Sequence[Generation]) -> Optional[str]:
+    if not all(isinstance(generation, ChatGeneration) for generation in generations):
+        return None
+    return json.dumps([{"message": message_to_dict(generation.message),
+                        "generation_info": generation.generation_info} for generation in generations],
+                      default=str)
+
+
+def _deserialize(value: str) -> list:
+    generations = []
+    for entry in json.loads(value):
+        message = messages_from_dict([entry["message"]])[0]
+        # A hit is a new message: reusing the stored IDs would make add_messages replace the
+        # earlier reply in the same thread, and pair new tool results with old tool calls
+        message.id = None
+        if getattr(message, "tool_calls", None):
+            new_ids = {call["id"]: f"call_{uuid.uuid4().hex}" for call in message.tool_calls}
+            message.tool_calls = [{**call, "id": new_ids[call["id"]]} for call in message.tool_calls]
+            raw_calls = message.additional_kwargs.get("tool_calls")
+            if raw_calls:
+                message.additional_kwargs["tool_calls"] = [{**call, "id": new_ids.get(call.get("id"), call.get("id"))}
+                                                           for call in raw_calls]
+        if getattr(message, "usage_metadata", None):
+            message.usage_metadata = {**message.usage_metadata, "input_tokens": 0, "output_tokens": 0,
+                                      "total_tokens": 0}
+        generations.append(ChatGeneration(message=message, generation_info=entry["generation_info"]))
+    return generations
+
+
+def prompt_key(messages: Sequence) -> str:
+    """Hash of a prompt, ignoring message IDs, as LangChain's cache keys it."""
+    normalized = [message.model_copy(update={"id": None}) if getattr(message, "id", None) else message
+                  for message in messages]
+    return hashlib.sha256(dumps(normalized).encode()).hexdigest()
+
+
+def _streams_tokens() -> bool:
+    """Whether the current run streams LLM tokens (``astream_events`` or ``stream_mode="messages"``)."""
+    callbacks = (var_child_runnable_config.get() or {}).get("callbacks")
+    handlers = getattr(callbacks, "handlers", callbacks) or []
+    return any(isinstance(handler, _StreamingCallbackHandler) for handler in handlers)
+
+
+async def ainvoke_coalesced(runnable: Any, messages: Sequence, name: str,
+                            flight: Optional[SingleFlight] = None) -> Any:
+    """
+    ``runnable.ainvoke(messages)``, shared with identical calls in flight.
+
+    The shared call runs with the first caller's callbacks. The others get
+    its response without LLM callbacks of their own: nothing is streamed to
+    them and no tokens or LLM latency are recorded for their node, only
+    ``llm_coalesced_total``. Callers that stream tokens are never shared.
+
+    Args:
+        runnable: The model (with its tools or output schema bound).
+        messages: The prompt.
+        name: Identifies the bound model, so the same prompt sent with
+            different tools is not shared.
+        flight: Where calls in flight are tracked; ``None`` always calls.
+
+    Returns:
+        The response. Callers that joined another call get their own copy.
+    """
+    if flight is None or _streams_tokens():
+        return await runnable.ainvoke(messages)
+    leader = []
+
+    async def call():
+        leader.append(True)
+        return await runnable.ainvoke(messages)
+
+    response = await flight.do((name, prompt_key(messages)), call)
+    if not leader:
+        metrics.increment("llm_coalesced_total", node=name)
+        # Each conversation adds the message to its own state, so never hand out the same object twice
+        if hasattr(response, "model_copy"):
+            response = response.model_copy(deep=True)
+    return response
@@ -1,27 +1,121 @@
 import uuid
+import time
 import asyncio
+import argparse
 from langchain_core.messages import HumanMessage, AIMessage
+from config import (checkpointer, CHECKPOINT_DURABILITY, CHECKPOINT_TTL, CHECKPOINT_PRUNE_INTERVAL,
+                    CATALOG_SYNC_INTERVAL, STREAM_OUTPUT, STARTUP_WARMUP, INSTRUMENTATION_ENABLED, DEBUG, warm_up)
+from instrumentation import InstrumentationHandler
 from workflow import multi_agent_final_graph
+from agents.music_agent import catalog_sync
 
-async def main():
+# Graph nodes whose LLM tokens are shown to the user as they arrive.
+# "agent" is the reasoning node of both the music and the invoice sub-agents.
+STREAMED_NODES = {"final_answer", "agent"}
+
+
+async def main(stream: bool = STREAM_OUTPUT):
     """Main conversation loop."""
+    # Load the models and connect while the user types the first message
+    if STARTUP_WARMUP:
+        warm_up()
+
     thread_id = str(uuid.uuid4())
     config = {"configurable": {"thread_id": thread_id}}
+    if INSTRUMENTATION_ENABLED:
+        config["callbacks"] = [InstrumentationHandler()]
 
     print("Welcome to Customer Support!")
     print("Type 'exit' to quit the conversation.\n")
 
+    # Periodically drop idle conversation threads from the checkpointer
+    pruner = None
+    if CHECKPOINT_TTL > 0:
+        pruner = asyncio.create_task(checkpointer.run_pruner(CHECKPOINT_TTL, CHECKPOINT_PRUNE_INTERVAL))
+
+    # Apply catalog edits to the vector store as they happen
+    syncer = None
+    if CATALOG_SYNC_INTERVAL > 0:
+        syncer = asyncio.create_task(catalog_sync.run(CATALOG_SYNC_INTERVAL))
+
+    try:
+        await conversation_loop(config, stream)
+    finally:
+        for task in (pruner, syncer):
+            if task:
+                task.cancel()
+        await checkpointer.aclose()
+
+
+async def stream_turn(input_package, config):
+    """Run one graph turn, printing answer tokens and tool progress as they arrive.
+
+    Args:
+        input_package: The graph input for this turn.
+        config: The graph config carrying the thread ID.
+
+    Returns:
+        dict: The final graph state for the turn.
+    """
+    start = time.perf_counter()
+    first_token_at = None
+    streamed = False
+    needs_prefix = True
+    final_state = None
+
+    async for event in multi_agent_final_graph.astream_events(input_package, config, version="v2",
+                                                              durability=CHECKPOINT_DURABILITY):
+        kind = event["event"]
+        node = event.get("metadata", {}).get("langgraph_node")
+
+        if kind == "on_chat_model_stream" and node in STREAMED_NODES:
+            content = event["data"]["chunk"].content
+            # Tool-call chunks carry no text
+            if content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                if needs_prefix:
+                    print("\nAssistant: ", end="")
+                    needs_prefix = False
+                streamed = True
+                print(content, end="", flush=True)
+        elif kind == "on_tool_start":
+            print(f"\n  [looking up: {event['name']}]", end="", flush=True)
+            needs_prefix = True
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            final_state = event["data"].get("output")
+
+    # Answers built without a streamed LLM call (e.g. verification) arrive only in the final state
+    if not streamed and final_state and final_state.get("messages"):
+        first_token_at = time.perf_counter()
+        print(f"\nAssistant: {final_state['messages'][-1].content}", end="")
+    print("\n")
+
+    if DEBUG:
+        total_ms = (time.perf_counter() - start) * 1000
+        ttft_ms = (first_token_at - start) * 1000 if first_token_at else total_ms
+        print(f"[debug] time to first token: {ttft_ms:.0f} ms, total: {total_ms:.0f} ms\n")
+    return final_state
+
+
+async def conversation_loop(config, stream=False):
+    """Read user input and run one graph turn per message until 'exit'."""
     while True:
         try:
-            user_input = input("You: ")
+            # Read input off the event loop so background tasks keep running
+            user_input = await asyncio.to_thread(input, "You: ")
             if user_input.lower() == 'exit':
                 print("Thank you for using Customer Support. Goodbye!")
                 break
 
             input_package = {"messages": [HumanMessage(content=user_input)]}
-            
-            # Use ainvoke instead of astream_events for simpler handling
-            result = await multi_agent_final_graph.ainvoke(input_package, config)
+
+            if stream:
+                await stream_turn(input_package, config)
+                continue
+
+            result = await multi_agent_final_graph.ainvoke(input_package, config,
+                                                           durability=CHECKPOINT_DURABILITY)
             
             # Extract the last AI message
             if result and "messages" in result:
@@ -51,4 +145,7 @@ async def main():
             print("Please restart the application or contact support.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Customer support chat")
+    parser.add_argument("--stream", action="store_true", help="Stream answers token by token")
+    args = parser.parse_args()
+    asyncio.run(main(stream=args.stream or STREAM_OUTPUT))
\ No newline at end of file
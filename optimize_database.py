@@ -0,0 +1,92 @@
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Indexes backing the queries in queries.py. Trigram GIN indexes serve the
+# similarity and leading-wildcard ILIKE lookups that a B-tree index cannot.
+# The customer name and email indexes are on the same expressions the
+# customer lookups filter on, so they must stay in sync with queries.py.
+INDEXES = [
+    ("idx_customer_email_lower",
+     'CREATE INDEX IF NOT EXISTS idx_customer_email_lower '
+     'ON "Customer" (lower("Email"))'),
+    ("idx_customer_full_name_lower",
+     'CREATE INDEX IF NOT EXISTS idx_customer_full_name_lower '
+     'ON "Customer" (lower("FirstName" || \' \' || "LastName"))'),
+    ("idx_invoice_customer_date",
+     'CREATE INDEX IF NOT EXISTS idx_invoice_customer_date '
+     'ON "Invoice" ("CustomerId", "InvoiceDate" DESC, "InvoiceId" DESC)'),
+    ("idx_invoiceline_invoice_covering",
+     'CREATE INDEX IF NOT EXISTS idx_invoiceline_invoice_covering '
+     'ON "InvoiceLine" ("InvoiceId") INCLUDE ("TrackId", "UnitPrice", "Quantity")'),
+    ("idx_customer_email_trgm",
+     'CREATE INDEX IF NOT EXISTS idx_customer_email_trgm '
+     'ON "Customer" USING gin ("Email" gin_trgm_ops)'),
+    ("idx_customer_full_name_trgm",
+     'CREATE INDEX IF NOT EXISTS idx_customer_full_name_trgm '
+     'ON "Customer" USING gin (("FirstName" || \' \' || "LastName") gin_trgm_ops)'),
+    ("idx_artist_name_trgm",
+     'CREATE INDEX IF NOT EXISTS idx_artist_name_trgm '
+     'ON "Artist" USING gin ("Name" gin_trgm_ops)'),
+]
+
+
+def optimize_database():
+    """
+    Creates the pg_trgm extension and the indexes used by the agent tools.
+
+    Safe to run repeatedly; existing indexes are left in place.
+    """
+    print("Starting Database Optimization")
+    print("-" * 50)
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': os.getenv('DB_PORT', '5432'),
+        'user': os.getenv('DB_USER', 'chinook_user'),
+        'password': os.getenv('DB_PASSWORD', 'chinook_password'),
+        'database': os.getenv('DB_NAME', 'chinook_db')
+    }
+
+    try:
+        conn = psycopg2.connect(**db_config)
+        conn.autocommit = False  # Use transactions
+        cursor = conn.cursor()
+        print(f"SUCCESS: Connected to database '{db_config['database']}'")
+    except psycopg2.Error as e:
+        print(f"ERROR: Failed to connect to PostgreSQL: {e}")
+        sys.exit(1)
+
+    try:
+        print("Enabling pg_trgm extension...")
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+        for name, statement in INDEXES:
+            print(f"Creating index {name}...")
+            cursor.execute(statement)
+
+        # Refresh planner statistics so the new indexes are considered
+        print("Analyzing tables...")
+        for table in ("Customer", "Invoice", "InvoiceLine", "Artist"):
+            cursor.execute(f'ANALYZE "{table}"')
+
+        conn.commit()
+        print(f"SUCCESS: {len(INDEXES)} indexes in place")
+
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"ERROR: Database optimization failed: {e}")
+        sys.exit(1)
+
+    finally:
+        cursor.close()
+        conn.close()
+        print("\nDatabase connection closed")
+
+
+if __name__ == "__main__":
+    optimize_database()
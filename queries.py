@@ -0,0 +1,101 @@
+"""
+SQL used by the agent tools.
+
+Queries use SQLAlchemy ``:name`` bind parameters and are executed through
+``database.fetch_rows``. The indexes they rely on are created by
+``optimize_database.py``; run ``explain_queries.py`` to check the plans.
+"""
+
+# Customer lookup tiers used by verification.CustomerLookup, most precise first.
+# Each fetches two rows so the caller can reject ambiguous matches.
+CUSTOMER_BY_EMAIL = """
+    SELECT "CustomerId"
+    FROM "Customer"
+    WHERE lower("Email") = lower(:email)
+    LIMIT 2
+"""
+
+CUSTOMER_BY_FULL_NAME = """
+    SELECT "CustomerId"
+    FROM "Customer"
+    WHERE lower("FirstName" || ' ' || "LastName") = lower(:full_name)
+    LIMIT 2
+"""
+
+# Needs the pg_trgm extension from optimize_database.py
+CUSTOMER_BY_SIMILARITY = """
+    SELECT "CustomerId",
+           greatest(similarity("Email", :identifier),
+                    similarity("FirstName" || ' ' || "LastName", :identifier)) AS "Score"
+    FROM "Customer"
+    WHERE ("Email" % :identifier OR ("FirstName" || ' ' || "LastName") % :identifier)
+      AND greatest(similarity("Email", :identifier),
+                   similarity("FirstName" || ' ' || "LastName", :identifier)) >= :min_similarity
+    ORDER BY "Score" DESC, "CustomerId"
+    LIMIT 2
+"""
+
+# Substring fallback for databases without pg_trgm
+CUSTOMER_BY_PATTERN = """
+    SELECT "CustomerId"
+    FROM "Customer"
+    WHERE "Email" ILIKE :pattern ESCAPE '\\'
+    OR ("FirstName" || ' ' || "LastName") ILIKE :pattern ESCAPE '\\'
+    ORDER BY "CustomerId"
+    LIMIT 2
+"""
+
+# Optional date range; a NULL bound disables that side of the filter
+_INVOICE_DATE_RANGE = """
+      AND (CAST(:start_date AS date) IS NULL OR "Invoice"."InvoiceDate" >= CAST(:start_date AS date))
+      AND (CAST(:end_date AS date) IS NULL OR "Invoice"."InvoiceDate" < CAST(:end_date AS date) + 1)
+"""
+
+INVOICES_BY_DATE = """
+    SELECT "Invoice"."InvoiceId", "Invoice"."InvoiceDate", "Invoice"."BillingCity",
+           "Invoice"."BillingCountry", "Invoice"."Total"
+    FROM "Invoice"
+    WHERE "CustomerId" = :customer_id
+""" + _INVOICE_DATE_RANGE + """
+    ORDER BY "InvoiceDate" DESC, "InvoiceId" DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+INVOICES_BY_UNIT_PRICE = """
+    SELECT "Invoice"."InvoiceId", "Invoice"."InvoiceDate", "Track"."Name" AS "TrackName",
+           "InvoiceLine"."UnitPrice", "InvoiceLine"."Quantity"
+    FROM "Invoice"
+    JOIN "InvoiceLine" ON "Invoice"."InvoiceId" = "InvoiceLine"."InvoiceId"
+    JOIN "Track" ON "Track"."TrackId" = "InvoiceLine"."TrackId"
+    WHERE "Invoice"."CustomerId" = :customer_id
+""" + _INVOICE_DATE_RANGE + """
+    ORDER BY "InvoiceLine"."UnitPrice" DESC, "Invoice"."InvoiceDate" DESC
+    LIMIT :limit
+"""
+
+INVOICE_TOTALS_BY_MONTH = """
+    SELECT to_char(date_trunc('month', "Invoice"."InvoiceDate"), 'YYYY-MM') AS "Month",
+           count(*) AS "Invoices",
+           sum("Invoice"."Total") AS "Total"
+    FROM "Invoice"
+    WHERE "Invoice"."CustomerId" = :customer_id
+""" + _INVOICE_DATE_RANGE + """
+    GROUP BY 1
+    ORDER BY 1 DESC
+"""
+
+EMPLOYEE_BY_INVOICE_AND_CUSTOMER = """
+    SELECT "Employee"."FirstName", "Employee"."Title", "Employee"."Email"
+    FROM "Employee"
+    JOIN "Customer" ON "Customer"."SupportRepId" = "Employee"."EmployeeId"
+    JOIN "Invoice" ON "Invoice"."CustomerId" = "Customer"."CustomerId"
+    WHERE "Invoice"."InvoiceId" = :invoice_id
+      AND "Invoice"."CustomerId" = :customer_id
+"""
+
+ALBUMS_BY_ARTIST = """
+    SELECT "Album"."Title"
+    FROM "Album"
+    JOIN "Artist" ON "Album"."ArtistId" = "Artist"."ArtistId"
+    WHERE "Artist"."Name" ILIKE :artist_name
+"""
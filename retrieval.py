@@ -0,0 +1,221 @@
+"""
+Hybrid lexical and vector retrieval over the music catalog.
+
+A BM25 index over track, artist and album names answers exact name lookups
+in-process, without embedding the query or touching the vector store. Other
+queries run both the lexical and the vector search and merge the rankings
+with reciprocal rank fusion, so exact names and fuzzy descriptions both rank
+well. The lexical index is built from the documents already stored in the
+Chroma collection, so it always matches what ``seed_music_data.py`` wrote.
+"""
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# Metadata fields indexed for lexical search
+NAME_FIELDS = ("track_name", "artist_name", "album_title")
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip accents so 'Beyoncé' and 'beyonce' match."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    """Split normalized text into word tokens."""
+    return _TOKEN_PATTERN.findall(normalize_text(text))
+
+
+def matches_filters(metadata: dict, genre: Optional[str] = None,
+                    min_price: Optional[float] = None, max_price: Optional[float] = None) -> bool:
+    """Whether a document's metadata passes the genre and price filters."""
+    if genre and normalize_text(str(metadata.get("genre") or "")) != normalize_text(genre):
+        return False
+    price = float(metadata.get("price") or 0)
+    if min_price is not None and price < min_price:
+        return False
+    if max_price is not None and price > max_price:
+        return False
+    return True
+
+
+def chroma_filter(genre: Optional[str] = None, min_price: Optional[float] = None,
+                  max_price: Optional[float] = None) -> Optional[dict]:
+    """The same filters as a Chroma ``where`` clause, or ``None`` if unfiltered.
+
+    Chroma compares strings exactly, so pass ``genre`` as stored (see
+    ``BM25Index.stored_genre``).
+    """
+    clauses = []
+    if genre:
+        clauses.append({"genre": genre})
+    if min_price is not None:
+        clauses.append({"price": {"$gte": min_price}})
+    if max_price is not None:
+        clauses.append({"price": {"$lte": max_price}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class BM25Index:
+    """
+    In-memory BM25 index over a fixed set of documents.
+
+    Args:
+        documents: The documents to index; ``Document.metadata`` supplies the
+            name fields that are searched.
+        k1: Term-frequency saturation.
+        b: Document-length normalization.
+    """
+
+    def __init__(self, documents: List[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.names: Dict[str, List[int]] = defaultdict(list)
+        self.genres: Dict[str, str] = {}
+        self.lengths: List[int] = []
+
+        for index, doc in enumerate(documents):
+            fields = [str(doc.metadata.get(field) or "") for field in NAME_FIELDS]
+            tokens = tokenize(" ".join(fields))
+            self.lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                self.postings[term].append((index, count))
+            for name in fields:
+                if name:
+                    self.names[" ".join(tokenize(name))].append(index)
+            genre = doc.metadata.get("genre")
+            if genre:
+                self.genres.setdefault(normalize_text(str(genre)), str(genre))
+
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        # Per-document BM25 length normalization, precomputed once
+        self.norms = [k1 * (1 - b + b * length / self.avg_length) if self.avg_length else k1
+                      for length in self.lengths]
+        self.idf = {term: math.log(1 + (len(documents) - len(docs) + 0.5) / (len(docs) + 0.5))
+                    for term, docs in self.postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def stored_genre(self, genre: str) -> str:
+        """The genre as spelled in the catalog, e.g. 'Jazz' for 'jazz'; unknown genres are returned as given."""
+        return self.genres.get(normalize_text(genre), genre)
+
+    def exact_name_matches(self, query: str) -> List[int]:
+        """Documents whose track, artist or album name equals the query."""
+        return self.names.get(" ".join(tokenize(query)), [])
+
+    def search(self, query: str, k: int = 10, **filters: Any) -> List[Tuple[int, float]]:
+        """Return up to ``k`` ``(document index, score)`` pairs, best first."""
+        scores: Dict[int, float] = defaultdict(float)
+        norms = self.norms
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            weight = idf * (self.k1 + 1)
+            for index, count in self.postings[term]:
+                scores[index] += weight * count / (count + norms[index])
+
+        candidates = scores.items()
+        if any(value is not None for value in filters.values()):
+            candidates = [(index, score) for index, score in candidates
+                          if matches_filters(self.documents[index].metadata, **filters)]
+        return heapq.nlargest(k, candidates, key=lambda item: item[1])
+
+
+class HybridRetriever:
+    """
+    Music search combining a BM25 name index with the Chroma vector store.
+
+    Args:
+        vector_store: The Chroma store holding the catalog documents.
+        k: Default number of results.
+        rrf_k: Reciprocal rank fusion constant; larger values flatten the
+            influence of top ranks.
+        candidates: Results fetched from each ranker per requested result.
+    """
+
+    def __init__(self, vector_store: Any, k: int = 5, rrf_k: int = 60, candidates: int = 4):
+        self.vector_store = vector_store
+        self.k = k
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self._index: Optional[BM25Index] = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> BM25Index:
+        """The lexical index, built from the vector store on first use."""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build_index()
+        return self._index
+
+    def _build_index(self) -> BM25Index:
+        stored = self.vector_store.get(include=["documents", "metadatas"])
+        documents = [Document(page_content=content, metadata=metadata or {})
+                     for content, metadata in zip(stored["documents"], stored["metadatas"])]
+        return BM25Index(documents)
+
+    def refresh(self) -> None:
+        """Drop the lexical index so it is rebuilt after the catalog changes."""
+        with self._lock:
+            self._index = None
+
+    def search(self, query: str, k: Optional[int] = None, genre: Optional[str] = None,
+               min_price: Optional[float] = None, max_price: Optional[float] = None) -> List[Document]:
+        """Find catalog documents for a query.
+
+        Args:
+            query: Free text or an exact track, artist or album name.
+            k: Number of results; defaults to the retriever's ``k``.
+            genre: Only return tracks of this genre.
+            min_price: Only return tracks costing at least this much.
+            max_price: Only return tracks costing at most this much.
+
+        Returns:
+            The best matching documents, best first.
+        """
+        k = k or self.k
+        filters = {"genre": genre, "min_price": min_price, "max_price": max_price}
+        index = self.index
+
+        # Exact name lookups are answered from the lexical index alone
+        exact = [i for i in index.exact_name_matches(query)
+                 if matches_filters(index.documents[i].metadata, **filters)]
+        if exact:
+            return [index.documents[i] for i in exact[:k]]
+
+        lexical = [index.documents[i] for i, _ in index.search(query, k * self.candidates, **filters)]
+        if genre:
+            # The lexical filter ignores case and accents; Chroma needs the stored spelling
+            filters["genre"] = index.stored_genre(genre)
+        vector = self.vector_store.similarity_search(query, k=k * self.candidates,
+                                                     filter=chroma_filter(**filters))
+        return self.fuse([lexical, vector])[:k]
+
+    def fuse(self, rankings: List[List[Document]]) -> List[Document]:
+        """Merge ranked lists with reciprocal rank fusion, keyed on page content."""
+        scores: Dict[str, float] = defaultdict(float)
+        documents: Dict[str, Document] = {}
+        for ranking in rankings:
+            for rank, doc in enumerate(ranking):
+                scores[doc.page_content] += 1.0 / (self.rrf_k + rank + 1)
+                documents.setdefault(doc.page_content, doc)
+        return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
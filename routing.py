@@ -0,0 +1,245 @@
+"""
+Routing helpers used by the top-level workflow router.
+"""
+
+import re
+import string
+import threading
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from cache import LRUCache
+
+
+# Keywords that route a message without any model call
+INTENT_KEYWORDS: Dict[str, List[str]] = {
+    "invoice": ["invoice", "bill", "payment", "charge", "receipt", "purchase", "buy", "order"],
+    "music": ["music", "song", "artist", "album", "band", "track"],
+}
+
+
+class KeywordMatcher:
+    """
+    Single-pass, whole-word keyword matcher for routing intents.
+
+    Every keyword is expanded once into its simple inflections ("bills",
+    "ordered", "buying") and indexed by intent. A message is then lowercased,
+    split into words in one pass and intersected with that index, so
+    keywords embedded in other words ("buyer", "trackpad") never match and
+    the cost does not grow with the number of keywords.
+
+    Args:
+        keywords: Mapping of intent name to its single-word keywords.
+    """
+
+    SUFFIXES = ("", "s", "es", "d", "ed", "ing")
+    SEPARATORS = str.maketrans({char: " " for char in string.punctuation + string.digits + "\u2018\u2019\u201c\u201d"})
+
+    def __init__(self, keywords: Dict[str, Iterable[str]]):
+        self.intents: FrozenSet[str] = frozenset(keywords)
+        self._forms: Dict[str, str] = {}
+        for intent, words in keywords.items():
+            for word in words:
+                if not word.isalpha():
+                    raise ValueError(f"Keywords must be single words, got {word!r}")
+                for suffix in self.SUFFIXES:
+                    self._forms.setdefault(word.lower() + suffix, intent)
+        self._form_set = frozenset(self._forms)
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """Return every intent with at least one keyword in ``text``."""
+        words = text.lower().translate(self.SEPARATORS).split()
+        return frozenset(self._forms[word] for word in self._form_set.intersection(words))
+
+
+keyword_matcher = KeywordMatcher(INTENT_KEYWORDS)
+
+
+def normalize_route_text(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace for cache keys."""
+    text = re.sub(r"[^\w\s@.]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+class RouteCache:
+    """
+    Cache of LLM routing decisions.
+
+    Lookups first try an exact match on the normalized message text and can
+    then fall back to cosine similarity against the embeddings of previously
+    routed messages.
+
+    Args:
+        maxsize: Maximum number of cached decisions.
+        ttl: Seconds a decision stays valid. ``None`` disables expiry.
+        similarity_threshold: Minimum cosine similarity for a semantic hit.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: Optional[float] = 3600,
+                 similarity_threshold: float = 0.9):
+        self.similarity_threshold = similarity_threshold
+        self.semantic_hits = 0
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    @property
+    def stats(self):
+        return self._entries.stats
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups answered from the cache, exact or semantic."""
+        lookups = self.stats.hits + self.stats.misses
+        return (self.stats.hits + self.semantic_hits) / lookups if lookups else 0.0
+
+    def get(self, text: str) -> Optional[str]:
+        """Return the cached destination for an exact (normalized) match."""
+        entry = self._entries.get(normalize_route_text(text))
+        return entry[0] if entry else None
+
+    def get_similar(self, vector: Sequence[float]) -> Optional[str]:
+        """Return the destination of the most similar cached message, if close enough."""
+        candidates = [(key, entry) for key, entry in self._entries.items()
+                      if entry[1] is not None]
+        if not candidates:
+            return None
+
+        matrix = np.stack([entry[1] for _, entry in candidates])
+        scores = matrix @ _unit(vector)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+
+        key, entry = candidates[best]
+        self._entries.touch(key)
+        self.semantic_hits += 1
+        return entry[0]
+
+    def put(self, text: str, destination: str,
+            vector: Optional[Sequence[float]] = None) -> None:
+        """Remember a routing decision for ``text``."""
+        unit = _unit(vector) if vector is not None else None
+        self._entries.set(normalize_route_text(text), (destination, unit))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Labelled example utterances for the local intent classifier
+ROUTE_EXAMPLES: Dict[str, List[str]] = {
+    "verify_customer": [
+        "My email is jane.doe@example.com",
+        "my name is John Smith",
+        "It's luisg@embraer.com.br",
+        "You can look me up as Frank Harris",
+        "I am Helena Holy, customer since last year",
+        "Here is my email address: tgoyer@apple.com",
+        "The account is under the name Mark Philips",
+        "Sure, my full name is Leonie Kohler",
+    ],
+    "invoice": [
+        "Show me my last invoice",
+        "How much did I spend on my most recent order?",
+        "What was the total of my purchases last month?",
+        "Which employee handled my invoice?",
+        "List everything I have been charged for",
+        "Can I see my billing history?",
+        "What is the most expensive item I ever bought?",
+        "When was my latest payment?",
+        "Who was my support rep on that sale?",
+        "I want a copy of my receipt",
+    ],
+    "music": [
+        "Can you find songs by Queen?",
+        "What albums do you have from AC/DC?",
+        "Recommend me some jazz tracks",
+        "Do you have anything by Led Zeppelin?",
+        "I'm looking for classic rock music",
+        "Which artists play heavy metal?",
+        "Play something similar to Nirvana",
+        "Is Bohemian Rhapsody in your catalog?",
+        "Show me the discography of Iron Maiden",
+        "Any good blues songs?",
+    ],
+    "end": [
+        "Hello",
+        "Hi there!",
+        "Thanks!",
+        "Thank you, that's all",
+        "Goodbye",
+        "Bye, have a nice day",
+        "Good morning",
+        "That's everything, cheers",
+        "Great, thanks for the help",
+        "See you later",
+    ],
+}
+
+
+class IntentClassifier:
+    """
+    Nearest-centroid intent classifier over labelled example utterances.
+
+    Examples are embedded once, averaged into one unit-length centroid per
+    label, and queries are scored with a single matrix-vector product.
+
+    Args:
+        embed_documents: Callable embedding a list of texts in one batch.
+        examples: Mapping of label to example utterances.
+        confidence_threshold: Minimum cosine similarity to the best centroid.
+        min_margin: Minimum gap between the best and second-best label.
+    """
+
+    def __init__(self, embed_documents: Callable[[List[str]], List[List[float]]],
+                 examples: Optional[Dict[str, List[str]]] = None,
+                 confidence_threshold: float = 0.55, min_margin: float = 0.05):
+        self.embed_documents = embed_documents
+        self.examples = examples or ROUTE_EXAMPLES
+        self.confidence_threshold = confidence_threshold
+        self.min_margin = min_margin
+        self.labels: List[str] = list(self.examples)
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @property
+    def fitted(self) -> bool:
+        return self._centroids is not None
+
+    def fit(self) -> None:
+        """Embed the examples and compute the label centroids (idempotent)."""
+        with self._lock:
+            if self._centroids is not None:
+                return
+
+            texts = [text for label in self.labels for text in self.examples[label]]
+            vectors = np.asarray(self.embed_documents(texts), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+            centroids, start = [], 0
+            for label in self.labels:
+                count = len(self.examples[label])
+                centroids.append(_unit(vectors[start:start + count].mean(axis=0)))
+                start += count
+            self._centroids = np.stack(centroids)
+
+    def scores(self, vector: Sequence[float]) -> Dict[str, float]:
+        """Cosine similarity of ``vector`` to every label centroid."""
+        self.fit()
+        similarities = self._centroids @ _unit(vector)
+        return dict(zip(self.labels, similarities.tolist()))
+
+    def predict(self, vector: Sequence[float]) -> Optional[str]:
+        """Return the best label, or ``None`` when the prediction is not confident."""
+        self.fit()
+        similarities = self._centroids @ _unit(vector)
+        order = np.argsort(similarities)[::-1]
+        best, runner_up = similarities[order[0]], similarities[order[1]]
+        if best < self.confidence_threshold or best - runner_up < self.min_margin:
+            return None
+        return self.labels[int(order[0])]
@@ -1,11 +1,16 @@
 from typing import TypedDict, Annotated, List, Optional
 from pydantic import BaseModel, Field
 from langgraph.graph.message import AnyMessage, add_messages
+from langgraph.managed import RemainingSteps
 
 class State(TypedDict):
     """Central state schema that flows through the entire agent graph."""
     customer_id: Optional[str]
     messages: Annotated[List[AnyMessage], add_messages]
+    # Rolling summary of messages dropped from the history window
+    summary: Optional[str]
+    # Step budget used by the prebuilt ReAct sub-agents
+    remaining_steps: RemainingSteps
 
 class UserInput(BaseModel):
     """Schema for extracting customer identifiers during verification."""
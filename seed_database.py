@@ -4,6 +4,9 @@ import re
 import requests
 import psycopg2
 from dotenv import load_dotenv
+from langchain.storage import LocalFileStore
+
+from catalog_cache import mark_catalog_changed
 
 # Load environment variables
 load_dotenv()
@@ -102,6 +105,12 @@ def seed_database():
         conn.commit()
         print("SUCCESS: SQL script executed")
 
+        # Running servers drop catalog tool results cached from the old data, and
+        # identities verified against the old customers (VerifiedIdentityCache) are forgotten
+        storage = LocalFileStore("./storage")
+        mark_catalog_changed(storage)
+        storage.mdelete(list(storage.yield_keys(prefix="verified_identity/")))
+
     except psycopg2.Error as e:
         conn.rollback()
         print(f"ERROR: Database seeding failed: {e}")
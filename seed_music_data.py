@@ -1,95 +1,147 @@
 """
 Seed music catalog data into the vector database.
+
+Tracks are streamed from Postgres in pages and stored under their TrackId,
+so re-running the seeder updates documents in place instead of duplicating
+them. Each document's content hash is kept in its metadata; unchanged tracks
+are skipped, and only new or edited ones are embedded. Documents for tracks
+that no longer exist (or were written by older seeders without stable IDs)
+are removed at the end of a run. The catalog change-log position at the
+start of the run is recorded, so ``catalog_sync.py`` picks up from there,
+and running servers drop their cached catalog tool results.
+
+Usage:
+    poetry run python seed_music_data.py [--batch-size 1000] [--processes 4] [--full]
 """
-import os
+import argparse
+
 from dotenv import load_dotenv
-from config import db, vector_store
+from sqlalchemy import text
+
+from catalog_cache import mark_catalog_changed
+from catalog_sync import CatalogSync, TRACKS_SELECT, track_document
+from config import (engine, vector_store, embedding_function, store, EMBEDDING_MODEL,
+                    SEED_BATCH_SIZE, SEED_EMBEDDING_PROCESSES)
 
 load_dotenv()
 
-def seed_music_catalog():
-    """Extract music data from SQL database and populate vector store."""
-    print("Seeding music catalog into vector database...")
-    
-    # Query to get comprehensive music data
-    music_query = """
-    SELECT 
-        t."Name" as track_name,
-        a."Name" as artist_name,
-        al."Title" as album_title,
-        g."Name" as genre,
-        t."Composer",
-        t."Milliseconds",
-        t."UnitPrice"
-    FROM "Track" t
-    JOIN "Album" al ON t."AlbumId" = al."AlbumId"
-    JOIN "Artist" a ON al."ArtistId" = a."ArtistId"
-    LEFT JOIN "Genre" g ON t."GenreId" = g."GenreId"
-    ORDER BY a."Name", al."Title", t."TrackId"
+TRACKS_QUERY = TRACKS_SELECT + """
+    ORDER BY t."TrackId"
+"""
+
+
+def iter_track_batches(batch_size: int):
+    """Yield pages of track rows from a server-side cursor."""
+    with engine.connect().execution_options(yield_per=batch_size) as conn:
+        result = conn.execute(text(TRACKS_QUERY))
+        for rows in result.partitions():
+            yield rows
+
+
+class Encoder:
+    """
+    Sentence-transformer encoder, optionally spread over several processes.
+
+    Uses the same model as ``config.embedding_function`` but calls it
+    directly, so large batches bypass the query cache and can use a
+    multi-process pool.
     """
-    
+
+    def __init__(self, model_name: str, processes: int = 1, batch_size: int = 256):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.batch_size = batch_size
+        self.pool = self.model.start_multi_process_pool(["cpu"] * processes) if processes > 1 else None
+
+    def encode(self, texts: list) -> list:
+        if self.pool is not None:
+            vectors = self.model.encode_multi_process(texts, self.pool, batch_size=self.batch_size)
+        else:
+            vectors = self.model.encode(texts, batch_size=self.batch_size)
+        return vectors.tolist()
+
+    def close(self):
+        if self.pool is not None:
+            self.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+
+def seed_music_catalog(batch_size: int = SEED_BATCH_SIZE, processes: int = SEED_EMBEDDING_PROCESSES,
+                       full: bool = False):
+    """Extract music data from SQL database and upsert it into the vector store.
+
+    Args:
+        batch_size: Tracks fetched, embedded and written per batch.
+        processes: Encoder processes; 1 encodes in this process.
+        full: Re-embed every track even if its content is unchanged.
+    """
+    print("Seeding music catalog into vector database...")
+    collection = vector_store._collection
+    sync = CatalogSync(engine, vector_store, embedding_function, store)
+    # Changes from transactions still running or started from here on are picked up by catalog_sync.py
+    start_xmin = sync.snapshot_xmin()
+    encoder = Encoder(EMBEDDING_MODEL, processes=processes)
+    seen_ids = set()
+    total = changed = 0
+
     try:
-        # Get music data from database
-        result = db.run(music_query)
-        
-        if not result or result == "[]":
-            print("No music data found in database")
-            return
-            
-        import json
-        music_data = json.loads(result)
-        print(f"Found {len(music_data)} tracks to process")
-        
-        # Prepare documents for vector store
-        documents = []
-        metadatas = []
-        
-        for track in music_data:
-            # Create searchable text content
-            content = f"""
-Track: {track['track_name']}
-Artist: {track['artist_name']}
-Album: {track['album_title']}
-Genre: {track.get('genre', 'Unknown')}
-Composer: {track.get('composer', 'Unknown')}
-Duration: {track.get('milliseconds', 0)} ms
-Price: ${track.get('unitprice', 0)}
-            """.strip()
-            
-            documents.append(content)
-            metadatas.append({
-                'track_name': track['track_name'],
-                'artist_name': track['artist_name'],
-                'album_title': track['album_title'],
-                'genre': track.get('genre', 'Unknown'),
-                'price': track.get('unitprice', 0)
-            })
-        
-        # Add to vector store in batches
-        batch_size = 100
-        for i in range(0, len(documents), batch_size):
-            batch_docs = documents[i:i + batch_size]
-            batch_metas = metadatas[i:i + batch_size]
-            
-            vector_store.add_texts(
-                texts=batch_docs,
-                metadatas=batch_metas
-            )
-            
-            print(f"Processed batch {i//batch_size + 1}/{(len(documents)-1)//batch_size + 1}")
-        
-        # Persist the changes
-        vector_store.persist()
-        print(f"Successfully seeded {len(documents)} tracks into vector database")
-        
-        # Test the vector store
-        test_results = vector_store.similarity_search("nirvana", k=3)
-        print(f"\nTest search for 'nirvana' returned {len(test_results)} results")
-        for result in test_results[:2]:
-            print(f"- {result.page_content.split('Track: ')[1].split('Artist: ')[0].strip()}")
-            
-    except Exception as e:
-        print(f"Error seeding music catalog: {e}")
+        for batch_number, rows in enumerate(iter_track_batches(batch_size), start=1):
+            ids, documents, metadatas = zip(*(track_document(row) for row in rows))
+            seen_ids.update(ids)
+            total += len(ids)
+
+            # Skip tracks whose stored content hash is unchanged
+            if not full:
+                stored = collection.get(ids=list(ids), include=["metadatas"])
+                stored_hashes = {doc_id: (meta or {}).get('content_hash')
+                                 for doc_id, meta in zip(stored["ids"], stored["metadatas"])}
+                keep = [i for i, doc_id in enumerate(ids)
+                        if stored_hashes.get(doc_id) != metadatas[i]['content_hash']]
+                ids, documents, metadatas = ([values[i] for i in keep] for values in (ids, documents, metadatas))
+
+            if ids:
+                collection.upsert(ids=list(ids),
+                                  embeddings=encoder.encode(list(documents)),
+                                  documents=list(documents),
+                                  metadatas=list(metadatas))
+                changed += len(ids)
+
+            print(f"Processed batch {batch_number}: {len(ids)} of {len(rows)} tracks updated")
+    finally:
+        encoder.close()
+
+    if total == 0:
+        print("No music data found in database")
+        return
+
+    # Remove deleted tracks and duplicates left by earlier seeders
+    stale = [doc_id for doc_id in collection.get(include=[])["ids"] if doc_id not in seen_ids]
+    for i in range(0, len(stale), batch_size):
+        collection.delete(ids=stale[i:i + batch_size])
+
+    print(f"Successfully seeded {total} tracks: {changed} embedded, "
+          f"{total - changed} unchanged, {len(stale)} stale documents removed")
+    if start_xmin is not None:
+        sync.high_water_mark = start_xmin
+    if changed or stale:
+        mark_catalog_changed(store)
+
+    # Test the vector store
+    test_results = vector_store.similarity_search("nirvana", k=3)
+    print(f"\nTest search for 'nirvana' returned {len(test_results)} results")
+    for result in test_results[:2]:
+        print(f"- {result.metadata.get('track_name')}")
+
 
 if __name__ == "__main__":
-    seed_music_catalog()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Seed the music catalog into the vector database")
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+    parser.add_argument("--processes", type=int, default=SEED_EMBEDDING_PROCESSES,
+                        help="Encoder processes (default: SEED_EMBEDDING_PROCESSES)")
+    parser.add_argument("--full", action="store_true", help="Re-embed tracks even if unchanged")
+    args = parser.parse_args()
+    try:
+        seed_music_catalog(args.batch_size, args.processes, args.full)
+    except Exception as e:
+        print(f"Error seeding music catalog: {e}")
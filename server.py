@@ -0,0 +1,151 @@
+"""
+HTTP entry point serving many conversations from one process.
+
+Endpoints:
+    POST /chat    {"thread_id": "...", "message": "..."} -> {"thread_id", "response"}
+    GET  /health  -> session load and cache figures
+    GET  /metrics -> per-node latency, token and query metrics (Prometheus text format)
+
+A missing ``thread_id`` starts a new conversation. When a conversation
+already has too many pending messages the server answers 429, and when
+too many conversations are open it refuses new ones with 503.
+"""
+import json
+import uuid
+import asyncio
+from dataclasses import asdict
+
+from config import (checkpointer, embedding_function, CHECKPOINT_DURABILITY, CHECKPOINT_TTL, CHECKPOINT_PRUNE_INTERVAL,
+                    SERVER_HOST, SERVER_PORT, SERVER_MAX_CONCURRENCY, SERVER_MAX_SESSIONS, SESSION_QUEUE_SIZE,
+                    SESSION_IDLE_TIMEOUT, CATALOG_SYNC_INTERVAL, STARTUP_WARMUP, INSTRUMENTATION_ENABLED,
+                    warm_up)
+from embeddings import EmbeddingCacheStats
+from instrumentation import InstrumentationHandler, metrics
+from sessions import SessionManager, SessionBusyError, SessionLimitError
+from workflow import multi_agent_final_graph
+from agents.music_agent import catalog_sync
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_THREAD_ID_LENGTH = 128
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+           429: "Too Many Requests", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+async def send_json(writer: asyncio.StreamWriter, status: int, payload: dict) -> None:
+    """Write a JSON response and close the connection."""
+    await send_body(writer, status, json.dumps(payload).encode(), "application/json")
+
+
+async def send_body(writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str) -> None:
+    """Write a response with the given body and close the connection."""
+    writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                 f"Content-Type: {content_type}\r\n"
+                 f"Content-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    writer.close()
+
+
+def create_handler(manager: SessionManager):
+    """Create the connection handler for ``asyncio.start_server``.
+
+    Args:
+        manager: The session manager that runs conversation turns.
+
+    Returns:
+        An async callback handling one HTTP request per connection.
+    """
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode().split()
+            if len(request_line) < 2:
+                return await send_json(writer, 400, {"error": "Malformed request"})
+            method, path = request_line[0], request_line[1]
+
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            if method == "GET" and path == "/health":
+                # Report zeros until the model is loaded rather than loading it here
+                embedding_stats = (embedding_function.stats() if embedding_function.initialized
+                                   else EmbeddingCacheStats())
+                return await send_json(writer, 200, {"status": "ok", **asdict(manager.stats()),
+                                                     "embedding_cache": {**asdict(embedding_stats),
+                                                                         "hit_rate": embedding_stats.hit_rate}})
+            if method == "GET" and path == "/metrics":
+                return await send_body(writer, 200, metrics.render().encode(),
+                                       "text/plain; version=0.0.4; charset=utf-8")
+            if method != "POST" or path != "/chat":
+                return await send_json(writer, 404, {"error": f"No route for {method} {path}"})
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                return await send_json(writer, 413, {"error": "Request body too large"})
+            payload = json.loads(await reader.readexactly(length) or b"{}")
+            if not isinstance(payload, dict):
+                return await send_json(writer, 400, {"error": "Request body must be a JSON object"})
+            message = payload.get("message")
+            if not isinstance(message, str) or not message.strip():
+                return await send_json(writer, 400, {"error": "'message' is required"})
+
+            thread_id = payload.get("thread_id") or str(uuid.uuid4())
+            if not isinstance(thread_id, str) or len(thread_id) > MAX_THREAD_ID_LENGTH:
+                return await send_json(writer, 400, {"error": f"'thread_id' must be a string of at most "
+                                                              f"{MAX_THREAD_ID_LENGTH} characters"})
+            response = await manager.submit(thread_id, message)
+            await send_json(writer, 200, {"thread_id": thread_id, "response": response})
+
+        except SessionBusyError as e:
+            await send_json(writer, 429, {"error": str(e)})
+        except SessionLimitError as e:
+            await send_json(writer, 503, {"error": str(e)})
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            await send_json(writer, 400, {"error": f"Invalid request: {e}"})
+        except ConnectionError:
+            writer.close()
+        except Exception as e:
+            await send_json(writer, 500, {"error": f"System error: {e}"})
+
+    return handle
+
+
+async def serve(host: str = SERVER_HOST, port: int = SERVER_PORT) -> None:
+    """Run the HTTP server until cancelled."""
+    if STARTUP_WARMUP:
+        warm_up()
+
+    manager = SessionManager(multi_agent_final_graph,
+                             max_concurrency=SERVER_MAX_CONCURRENCY,
+                             queue_size=SESSION_QUEUE_SIZE,
+                             idle_timeout=SESSION_IDLE_TIMEOUT,
+                             max_sessions=SERVER_MAX_SESSIONS,
+                             callbacks=[InstrumentationHandler()] if INSTRUMENTATION_ENABLED else None,
+                             durability=CHECKPOINT_DURABILITY)
+
+    pruner = None
+    if CHECKPOINT_TTL > 0:
+        pruner = asyncio.create_task(checkpointer.run_pruner(CHECKPOINT_TTL, CHECKPOINT_PRUNE_INTERVAL))
+    syncer = None
+    if CATALOG_SYNC_INTERVAL > 0:
+        syncer = asyncio.create_task(catalog_sync.run(CATALOG_SYNC_INTERVAL))
+
+    server = await asyncio.start_server(create_handler(manager), host, port)
+    print(f"Customer Support server listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in (pruner, syncer):
+            if task:
+                task.cancel()
+        await manager.shutdown()
+        await checkpointer.aclose()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
@@ -0,0 +1,157 @@
+"""
+Concurrent conversation sessions over a single compiled graph.
+
+Each thread ID gets its own bounded queue and worker task, so turns within a
+conversation run in order while different conversations run concurrently.
+A shared semaphore bounds how many graph turns execute at once across all
+sessions, full queues reject new messages instead of buffering forever, and
+new sessions are refused once ``max_sessions`` are open.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from langchain_core.messages import HumanMessage
+
+
+class SessionBusyError(Exception):
+    """Raised when a session's queue is full and the message is rejected."""
+
+
+class SessionLimitError(Exception):
+    """Raised when a new session is rejected because ``max_sessions`` are open."""
+
+
+@dataclass
+class Session:
+    """Pending turns and the worker task for one conversation thread."""
+    thread_id: str
+    queue: asyncio.Queue
+    worker: Optional[asyncio.Task] = None
+    turns: int = 0
+
+
+@dataclass
+class SessionStats:
+    """Point-in-time load figures for the session manager."""
+    sessions: int = 0
+    running: int = 0
+    queued: int = 0
+    rejected: int = 0
+    completed: int = 0
+    failed: int = 0
+
+
+class SessionManager:
+    """
+    Drive a compiled graph for many conversation threads at once.
+
+    Args:
+        graph: The compiled LangGraph to invoke for each turn.
+        max_concurrency: Maximum graph turns running at the same time.
+        queue_size: Maximum pending turns per session before rejecting.
+        idle_timeout: Seconds a session worker waits for input before exiting.
+        max_sessions: Maximum open sessions (each holds a queue and a task).
+        callbacks: Callback handlers added to every turn's config.
+        invoke_kwargs: Extra keyword arguments passed to ``graph.ainvoke``.
+    """
+
+    def __init__(self, graph: Any, max_concurrency: int = 32, queue_size: int = 8,
+                 idle_timeout: float = 300, max_sessions: int = 1024, callbacks: Optional[list] = None,
+                 **invoke_kwargs: Any):
+        self.graph = graph
+        self.callbacks = callbacks or []
+        self.queue_size = queue_size
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.invoke_kwargs = invoke_kwargs
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.sessions: Dict[str, Session] = {}
+        self._running = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+
+    async def submit(self, thread_id: str, message: str) -> str:
+        """Queue a user message on its session and wait for the assistant's reply.
+
+        Args:
+            thread_id: The conversation the message belongs to.
+            message: The user's message.
+
+        Raises:
+            SessionBusyError: If the session already has ``queue_size`` pending turns.
+            SessionLimitError: If this would open a session beyond ``max_sessions``.
+        """
+        session = self.sessions.get(thread_id)
+        if session is None or session.worker is None or session.worker.done():
+            if session is None and len(self.sessions) >= self.max_sessions:
+                self._rejected += 1
+                raise SessionLimitError(f"Too many open sessions ({self.max_sessions})")
+            session = Session(thread_id=thread_id, queue=asyncio.Queue(maxsize=self.queue_size))
+            session.worker = asyncio.create_task(self._work(session))
+            self.sessions[thread_id] = session
+
+        reply: asyncio.Future = asyncio.get_running_loop().create_future()
+        try:
+            session.queue.put_nowait((message, reply))
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise SessionBusyError(f"Too many pending messages for session {thread_id}")
+        return await reply
+
+    async def _work(self, session: Session) -> None:
+        """Process one session's turns in order until it goes idle."""
+        while True:
+            try:
+                message, reply = await asyncio.wait_for(session.queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                # A message may have arrived while the timed-out get was being cancelled
+                if not session.queue.empty():
+                    continue
+                if self.sessions.get(session.thread_id) is session:
+                    del self.sessions[session.thread_id]
+                return
+
+            if reply.cancelled():
+                continue
+
+            config = {"configurable": {"thread_id": session.thread_id}, "callbacks": self.callbacks}
+
+            async with self.semaphore:
+                self._running += 1
+                try:
+                    result = await self.graph.ainvoke({"messages": [HumanMessage(content=message)]},
+                                                      config, **self.invoke_kwargs)
+                    messages = (result or {}).get("messages") or []
+                    content = messages[-1].content if messages else "I'm sorry, I didn't understand that."
+                    if not reply.done():
+                        reply.set_result(content)
+                    self._completed += 1
+                except Exception as e:
+                    if not reply.done():
+                        reply.set_exception(e)
+                    self._failed += 1
+                finally:
+                    self._running -= 1
+                    session.turns += 1
+
+    def stats(self) -> SessionStats:
+        """Current load across all sessions."""
+        return SessionStats(
+            sessions=len(self.sessions),
+            running=self._running,
+            queued=sum(session.queue.qsize() for session in self.sessions.values()),
+            rejected=self._rejected,
+            completed=self._completed,
+            failed=self._failed,
+        )
+
+    async def shutdown(self) -> None:
+        """Cancel every session worker."""
+        workers = [session.worker for session in self.sessions.values() if session.worker]
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self.sessions.clear()
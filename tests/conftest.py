@@ -1,8 +1,14 @@
+import os
 import pytest
 import asyncio
 from unittest.mock import MagicMock
 from langchain_core.messages import AIMessage
 
+# Tests build only the resources they use; skip the background warm-up
+os.environ.setdefault("STARTUP_WARMUP", "false")
+# Keep model responses from leaking between tests through the response cache
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
 @pytest.fixture
 def mock_llm():
     """Mock LLM for testing."""
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+
+from cache import SingleFlight
+
+
+class TestSingleFlight:
+    """Test cases for coalescing calls in flight."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_call(self):
+        """Test that callers arriving while a call runs get its result."""
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "albums"
+
+        results = await asyncio.gather(*(flight.do("queen", fetch) for _ in range(5)))
+
+        assert results == ["albums"] * 5
+        assert len(calls) == 1
+        assert (flight.stats.hits, flight.stats.misses) == (4, 1)
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_completed_calls_are_not_reused(self):
+        """Test that a call after the first finished runs again."""
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return len(calls)
+
+        assert await flight.do("queen", fetch) == 1
+        assert await flight.do("queen", fetch) == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        """Test that a failing call raises in all callers."""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ConnectionError("database unavailable")
+
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        """Test that the shared call keeps running for the remaining callers."""
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        leader = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "done"
@@ -0,0 +1,105 @@
+from typing import Optional
+
+from langchain_core.stores import InMemoryByteStore
+
+from cache import LRUCache
+from catalog_cache import CatalogResultCache, mark_catalog_changed
+
+
+def make_tool(cache, casefold=("artist",)):
+    """Cached tool function recording the arguments it was really called with."""
+    calls = []
+
+    @cache.cached(casefold=casefold)
+    def get_albums(artist: str, genre: Optional[str] = None, limit: int = 10) -> str:
+        """Get albums."""
+        calls.append((artist, genre, limit))
+        return f"albums by {artist} ({len(calls)})"
+
+    return get_albums, calls
+
+
+class TestCatalogResultCache:
+    """Test cases for the catalog tool result cache."""
+
+    def test_normalized_arguments_share_a_result(self):
+        """Test that whitespace, listed-argument case and defaults do not change the key."""
+        get_albums, calls = make_tool(CatalogResultCache())
+
+        first = get_albums("Led Zeppelin")
+        assert get_albums("  led   zeppelin ") == first
+        assert get_albums(artist="LED ZEPPELIN", limit=10.0) == first
+        assert len(calls) == 1
+        assert get_albums.__name__ == "get_albums"
+
+    def test_other_arguments_keep_their_case(self):
+        """Test that arguments not listed for case folding stay distinct."""
+        get_albums, calls = make_tool(CatalogResultCache())
+
+        get_albums("Queen", genre="Rock")
+        get_albums("Queen", genre="rock")
+        get_albums("Queen", genre="Rock", limit=5)
+
+        assert len(calls) == 3
+
+    def test_marker_change_invalidates(self):
+        """Test that marking the catalog changed (e.g. by a reseed) drops results."""
+        store = InMemoryByteStore()
+        cache = CatalogResultCache(LRUCache(maxsize=8), store, check_interval=0)
+        get_albums, calls = make_tool(cache)
+
+        get_albums("Queen")
+        get_albums("Queen")
+        mark_catalog_changed(store)
+        get_albums("Queen")
+
+        assert len(calls) == 2
+
+    def test_marker_is_read_at_most_once_per_interval(self):
+        """Test that the store is not consulted on every call."""
+        store = InMemoryByteStore()
+        cache = CatalogResultCache(store=store, check_interval=3600)
+        get_albums, calls = make_tool(cache)
+
+        get_albums("Queen")
+        mark_catalog_changed(store)
+        get_albums("Queen")
+
+        assert len(calls) == 1
+
+    def test_result_read_during_invalidation_is_not_stored(self):
+        """Test that a result computed across an invalidation is not cached."""
+        cache = CatalogResultCache()
+
+        @cache.cached()
+        def search(query: str) -> str:
+            """Search."""
+            cache.invalidate()
+            return query
+
+        search("queen")
+        assert len(cache.cache) == 0
+
+    def test_marker_change_rebuilds_retriever(self):
+        """Test that a reseed from another process also rebuilds the lexical index."""
+        from unittest.mock import MagicMock
+        from retrieval import HybridRetriever
+
+        vector_store = MagicMock()
+        vector_store.get.return_value = {"documents": ["Track: Halo"], "metadatas": [{"track_name": "Halo"}]}
+        retriever = HybridRetriever(vector_store)
+        store = InMemoryByteStore()
+        cache = CatalogResultCache(LRUCache(maxsize=8), store, check_interval=0, on_invalidate=retriever.refresh)
+
+        @cache.cached()
+        def search_for_music(query: str) -> list:
+            """Search."""
+            return [doc.page_content for doc in retriever.search(query)]
+
+        assert search_for_music("halo") == ["Track: Halo"]
+        vector_store.get.return_value = {"documents": ["Track: Halo (Live)"],
+                                         "metadatas": [{"track_name": "Halo"}]}
+        mark_catalog_changed(store)
+
+        assert search_for_music("halo") == ["Track: Halo (Live)"]
+        assert vector_store.get.call_count == 2
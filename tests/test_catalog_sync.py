@@ -0,0 +1,139 @@
+import pytest
+from collections import namedtuple
+from unittest.mock import MagicMock
+
+from langchain_core.stores import InMemoryByteStore
+from sqlalchemy.exc import ProgrammingError
+
+from catalog_sync import CatalogSync, track_document
+from catalog_cache import catalog_version
+
+TrackRow = namedtuple("TrackRow", "TrackId track_name artist_name album_title genre composer milliseconds unit_price")
+
+BOHEMIAN = TrackRow(1, "Bohemian Rhapsody", "Queen", "A Night at the Opera", "Rock", "Mercury", 354000, 0.99)
+SO_WHAT = TrackRow(2, "So What", "Miles Davis", "Kind of Blue", "Jazz", None, 545000, 0.99)
+
+
+def make_engine(*batches, xmin=100):
+    """Fake engine reporting ``xmin``, then returning (changes, tracks) result pairs, one pair per batch."""
+    engine = MagicMock()
+    conn = engine.connect.return_value.__enter__.return_value
+    results = [MagicMock(scalar=MagicMock(return_value=xmin))]
+    for changes, tracks in batches:
+        results += [MagicMock(all=MagicMock(return_value=changes)),
+                    MagicMock(all=MagicMock(return_value=tracks))]
+    results.append(MagicMock(all=MagicMock(return_value=[])))
+    conn.execute.side_effect = results
+    return engine
+
+
+def make_vector_store(stored=()):
+    """Fake Chroma store whose collection already holds ``stored`` documents."""
+    vector_store = MagicMock()
+    vector_store._collection.get.return_value = {
+        "ids": [doc_id for doc_id, _, _ in stored],
+        "metadatas": [metadata for _, _, metadata in stored],
+    }
+    return vector_store
+
+
+def make_embeddings():
+    embeddings = MagicMock()
+    embeddings.embed_documents.side_effect = lambda texts: [[0.1, 0.2] for _ in texts]
+    return embeddings
+
+
+class TestCatalogSync:
+    """Test cases for incremental catalog sync."""
+
+    def test_track_document_is_deterministic(self):
+        """Test that a track always maps to the same ID and content hash."""
+        assert track_document(BOHEMIAN) == track_document(BOHEMIAN)
+        assert track_document(BOHEMIAN)[0] == "track-1"
+        assert track_document(SO_WHAT)[2]["genre"] == "Jazz"
+
+    def test_changed_track_is_reembedded(self):
+        """Test that a repriced track is upserted and the mark advances."""
+        repriced = BOHEMIAN._replace(unit_price=1.29)
+        vector_store = make_vector_store(stored=[track_document(BOHEMIAN)])
+        embeddings = make_embeddings()
+        on_change = MagicMock()
+        store = InMemoryByteStore()
+        sync = CatalogSync(make_engine(([(10, 1)], [repriced])), vector_store, embeddings,
+                           store, on_change=on_change)
+
+        result = sync.sync_once()
+
+        assert (result.upserted, result.deleted, result.high_water_mark) == (1, 0, 100)
+        assert vector_store._collection.upsert.call_args.kwargs["ids"] == ["track-1"]
+        assert sync.high_water_mark == 100
+        on_change.assert_called_once()
+        assert catalog_version(store) is not None
+
+    def test_unchanged_track_is_skipped(self):
+        """Test that an update not affecting the document costs no embedding."""
+        vector_store = make_vector_store(stored=[track_document(BOHEMIAN)])
+        embeddings = make_embeddings()
+        sync = CatalogSync(make_engine(([(11, 1)], [BOHEMIAN])), vector_store, embeddings, InMemoryByteStore())
+
+        result = sync.sync_once()
+
+        assert result.unchanged == 1
+        assert catalog_version(sync.store) is None
+        embeddings.embed_documents.assert_not_called()
+        vector_store._collection.upsert.assert_not_called()
+
+    def test_deleted_track_is_removed(self):
+        """Test that a logged track missing from the catalog is deleted."""
+        vector_store = make_vector_store()
+        sync = CatalogSync(make_engine(([(12, 2)], [])), vector_store, make_embeddings(), InMemoryByteStore())
+
+        result = sync.sync_once()
+
+        assert result.deleted == 1
+        vector_store._collection.delete.assert_called_once_with(ids=["track-2"])
+
+    def test_resumes_from_high_water_mark(self):
+        """Test that only transactions finished since the stored mark are requested."""
+        engine = make_engine(xmin=50)
+        store = InMemoryByteStore()
+        sync = CatalogSync(engine, make_vector_store(), make_embeddings(), store)
+        sync.high_water_mark = 42
+
+        result = sync.sync_once()
+
+        params = engine.connect.return_value.__enter__.return_value.execute.call_args.args[1]
+        assert (params["since"], params["until"], params["after"]) == (42, 50, 0)
+        assert result.high_water_mark == 50
+
+    def test_mark_waits_for_running_transactions(self):
+        """Test that the mark only moves up to the snapshot xmin, never to the last ChangeId read."""
+        engine = make_engine(([(7, 1), (9, 2)], [BOHEMIAN, SO_WHAT]), xmin=30)
+        sync = CatalogSync(engine, make_vector_store(), make_embeddings(), InMemoryByteStore(), batch_size=2)
+        sync.high_water_mark = 20
+
+        result = sync.sync_once()
+
+        # The second page continues after ChangeId 9 within the same transaction window
+        params = engine.connect.return_value.__enter__.return_value.execute.call_args.args[1]
+        assert (params["since"], params["until"], params["after"]) == (20, 30, 9)
+        assert result.upserted == 2
+        assert sync.high_water_mark == 30
+
+    def test_nothing_finished_since_mark(self):
+        """Test that no change log is read while the oldest running transaction has not moved."""
+        engine = make_engine(xmin=42)
+        sync = CatalogSync(engine, make_vector_store(), make_embeddings(), InMemoryByteStore())
+        sync.high_water_mark = 42
+
+        assert sync.sync_once().high_water_mark == 42
+        assert engine.connect.return_value.__enter__.return_value.execute.call_count == 1
+
+    def test_snapshot_xmin_unavailable(self):
+        """Test that a server without pg_current_snapshot is reported as None."""
+        engine = MagicMock()
+        engine.connect.return_value.__enter__.return_value.execute.side_effect = \
+            ProgrammingError("SELECT", {}, Exception("function pg_current_snapshot() does not exist"))
+
+        sync = CatalogSync(engine, make_vector_store(), make_embeddings(), InMemoryByteStore())
+        assert sync.snapshot_xmin() is None
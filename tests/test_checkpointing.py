@@ -0,0 +1,108 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import MessagesState
+from langchain_core.messages import HumanMessage, AIMessage
+
+from checkpointing import ManagedCheckpointer
+
+
+def build_echo_graph(checkpointer):
+    """Build a one-node graph that answers every message."""
+    def reply(state):
+        return {"messages": [AIMessage(content="echo")]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("reply", reply)
+    graph.add_edge(START, "reply")
+    graph.add_edge("reply", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+class TestManagedCheckpointer:
+    """Test cases for the pluggable checkpointer."""
+
+    def test_unknown_backend_rejected(self):
+        """Test that a misspelled backend fails fast."""
+        with pytest.raises(ValueError):
+            ManagedCheckpointer(backend="redis")
+
+    def test_persistent_backend_requires_async_open(self):
+        """Test that sync access before opening an async backend is explained."""
+        checkpointer = ManagedCheckpointer(backend="sqlite", sqlite_path=":memory:")
+        with pytest.raises(RuntimeError):
+            checkpointer.get_tuple({"configurable": {"thread_id": "t"}})
+
+    @pytest.mark.asyncio
+    async def test_memory_backend_keeps_history(self):
+        """Test that a thread's history survives across turns."""
+        graph = build_echo_graph(ManagedCheckpointer())
+        config = {"configurable": {"thread_id": "memory-thread"}}
+
+        await graph.ainvoke({"messages": [HumanMessage(content="one")]}, config)
+        result = await graph.ainvoke({"messages": [HumanMessage(content="two")]}, config)
+
+        assert len(result["messages"]) == 4
+
+    @pytest.mark.asyncio
+    async def test_sqlite_backend_opens_lazily(self, tmp_path):
+        """Test that the SQLite saver is opened on first async use."""
+        pytest.importorskip("langgraph.checkpoint.sqlite.aio")
+        checkpointer = ManagedCheckpointer(backend="sqlite", sqlite_path=str(tmp_path / "cp.sqlite"))
+        graph = build_echo_graph(checkpointer)
+        config = {"configurable": {"thread_id": "sqlite-thread"}}
+
+        try:
+            await graph.ainvoke({"messages": [HumanMessage(content="one")]}, config)
+            result = await graph.ainvoke({"messages": [HumanMessage(content="two")]}, config)
+            assert len(result["messages"]) == 4
+        finally:
+            await checkpointer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_prune_idle_threads(self, mocker):
+        """Test that only threads idle for longer than the TTL are deleted."""
+        checkpointer = ManagedCheckpointer()
+        graph = build_echo_graph(checkpointer)
+        for thread_id in ("old", "new"):
+            await graph.ainvoke({"messages": [HumanMessage(content="hi")]},
+                                {"configurable": {"thread_id": thread_id}})
+
+        # Pretend the "old" thread was last active two hours ago
+        real_alist = checkpointer.saver.alist
+
+        async def aged_alist(config, **kwargs):
+            async for item in real_alist(config, **kwargs):
+                if item.config["configurable"]["thread_id"] == "old":
+                    stale = datetime.now(timezone.utc) - timedelta(hours=2)
+                    item.checkpoint["ts"] = stale.isoformat()
+                yield item
+
+        mocker.patch.object(checkpointer.saver, "alist", aged_alist)
+        pruned = await checkpointer.prune_idle_threads(ttl_seconds=3600)
+
+        assert pruned == 1
+        assert await checkpointer.aget_tuple({"configurable": {"thread_id": "old"}}) is None
+        assert await checkpointer.aget_tuple({"configurable": {"thread_id": "new"}}) is not None
+
+
+class TestSubagentCheckpointer:
+    """Test cases for resolving sub-agent checkpoint modes."""
+
+    @pytest.mark.parametrize("mode, expected", [("none", False), ("inherit", None)])
+    def test_modes(self, mode, expected):
+        """Test that modes map onto langgraph's compile() semantics."""
+        from checkpointing import resolve_subagent_checkpointer
+        assert resolve_subagent_checkpointer(mode, ManagedCheckpointer()) is expected
+
+    def test_separate_mode_reuses_saver(self):
+        """Test that the separate mode hands the parent saver through."""
+        from checkpointing import resolve_subagent_checkpointer
+        saver = ManagedCheckpointer()
+        assert resolve_subagent_checkpointer("separate", saver) is saver
+
+    def test_unknown_mode_rejected(self):
+        """Test that a misspelled mode fails fast."""
+        from checkpointing import resolve_subagent_checkpointer
+        with pytest.raises(ValueError):
+            resolve_subagent_checkpointer("shared", ManagedCheckpointer())
@@ -0,0 +1,113 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+from config import LazyResource, startup_profile, warm_up
+
+
+class TestLazyResource:
+    """Test cases for lazily built shared resources."""
+
+    def test_nothing_is_built_until_first_use(self):
+        """Test that the factory runs on first attribute access only."""
+        factory = MagicMock(return_value=MagicMock(model_name="gpt-4o-mini"))
+        resource = LazyResource("llm", factory)
+
+        factory.assert_not_called()
+        assert not resource.initialized
+        assert resource.model_name == "gpt-4o-mini"
+        assert resource.model_name == "gpt-4o-mini"
+        factory.assert_called_once()
+        assert resource.init_seconds is not None
+
+    def test_concurrent_first_use_builds_once(self):
+        """Test that threads racing on first use share one instance."""
+        calls = []
+
+        def slow_factory():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        resource = LazyResource("engine", slow_factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(resource.resolve())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert len({id(result) for result in results}) == 1
+
+    def test_failed_build_is_retried(self):
+        """Test that an error is raised to the caller and the next use tries again."""
+        factory = MagicMock(side_effect=[ConnectionError("database down"), "engine"])
+        resource = LazyResource("engine", factory)
+
+        try:
+            resource.resolve()
+        except ConnectionError:
+            pass
+        assert not resource.initialized
+        assert resource.resolve() == "engine"
+
+    def test_override_replaces_the_factory(self):
+        """Test that an overridden resource is used without building it."""
+        factory = MagicMock()
+        resource = LazyResource("llm", factory)
+
+        resource.override("scripted model")
+
+        assert resource.resolve() == "scripted model"
+        factory.assert_not_called()
+
+
+class TestWarmUp:
+    """Test cases for background warm-up and the start-up profile."""
+
+    def test_warm_up_builds_resources_concurrently(self):
+        """Test that independent slow resources overlap in the background."""
+        resources = [LazyResource(f"slow-{i}", lambda: time.sleep(0.2) or object()) for i in range(3)]
+
+        started = time.perf_counter()
+        warm_up(resources, report=False).join()
+
+        assert all(resource.initialized for resource in resources)
+        assert time.perf_counter() - started < 0.5
+
+    def test_warm_up_survives_failures(self):
+        """Test that a failing resource does not stop the others."""
+        broken = LazyResource("broken", MagicMock(side_effect=RuntimeError("no model")))
+        working = LazyResource("working", object)
+
+        warm_up([broken, working], report=False).join()
+
+        assert working.initialized
+        assert not broken.initialized
+
+    def test_startup_profile_lists_resources(self):
+        """Test that the profile reports the import and every shared resource."""
+        report = startup_profile()
+
+        assert "config import" in report
+        for name in ("llm", "engine", "embedding_function", "vector_store"):
+            assert name in report
+
+
+class TestGetLlm:
+    """Test cases for the response cache opt-out."""
+
+    def test_uncached_client_skips_response_cache(self):
+        """Test that get_llm(cache=False) is the shared client with caching disabled."""
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from config import llm, uncached_llm, response_cache, get_llm
+
+        llm.override(FakeListChatModel(responses=["Hi"], cache=response_cache))
+        uncached_llm._value = None
+        try:
+            assert get_llm() is llm.resolve()
+            assert get_llm(cache=False).cache is False
+            assert get_llm(cache=False).responses == ["Hi"]
+        finally:
+            llm._value = uncached_llm._value = None
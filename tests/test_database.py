@@ -0,0 +1,50 @@
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+
+from database import QueryResult
+
+
+class TestQueryResult:
+    """Test cases for structured query results."""
+
+    def test_to_table(self):
+        """Test compact tab-separated rendering with typed values."""
+        result = QueryResult(("InvoiceId", "InvoiceDate", "Total", "BillingState"),
+                             [(98, datetime(2025, 3, 11), Decimal("3.980"), None)])
+
+        assert result.to_table() == "InvoiceId\tInvoiceDate\tTotal\tBillingState\n98\t2025-03-11\t3.98\t"
+
+    def test_to_table_escapes_separators(self):
+        """Test that tabs and newlines inside values cannot break the table."""
+        result = QueryResult(("Title",), [("Live\tin\nParis",)])
+        assert result.to_table() == "Title\nLive in Paris"
+
+    def test_empty_result_is_falsy(self):
+        """Test that an empty result can be checked with a plain if."""
+        result = QueryResult(("CustomerId",), [])
+        assert not result
+        assert result.first() is None
+
+    def test_rows_are_slotted(self):
+        """Test that results carry no per-instance dict."""
+        assert not hasattr(QueryResult(("a",), []), "__dict__")
+
+
+class TestFetchRows:
+    """Test cases for running queries."""
+
+    @patch("database.engine")
+    def test_fetch_rows_returns_tuples(self, mock_engine):
+        """Test that rows and column names come straight from the cursor."""
+        cursor = MagicMock()
+        cursor.keys.return_value = ["CustomerId", "Email"]
+        cursor.__iter__.return_value = iter([(1, "luisg@embraer.com.br")])
+        mock_engine.connect.return_value.__enter__.return_value.execute.return_value = cursor
+
+        from database import fetch_rows
+        result = fetch_rows("SELECT 1", {"identifier": "luis"})
+
+        assert result.columns == ("CustomerId", "Email")
+        assert result.rows == [(1, "luisg@embraer.com.br")]
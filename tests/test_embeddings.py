@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import MagicMock
+
+from langchain_core.stores import InMemoryByteStore
+
+from cache import LRUCache
+from embeddings import CachedEmbeddings
+
+
+def make_model():
+    """Fake model returning a vector derived from the text length."""
+    model = MagicMock()
+    model.embed_query.side_effect = lambda text: [float(len(text)), 0.5]
+    model.embed_documents.side_effect = lambda texts: [[float(len(text)), 0.5] for text in texts]
+    return model
+
+
+class TestCachedEmbeddings:
+    """Test cases for the embedding cache."""
+
+    def test_query_hits_memory_cache(self):
+        """Test that a repeated query is embedded once."""
+        model = make_model()
+        embeddings = CachedEmbeddings(model, model_name="mini")
+
+        assert embeddings.embed_query("songs by queen") == [14.0, 0.5]
+        assert embeddings.embed_query("songs  by queen ") == [14.0, 0.5]
+        model.embed_query.assert_called_once()
+        assert embeddings.stats().hit_rate == 0.5
+
+    def test_lowercase_only_when_enabled(self):
+        """Test that case folding is opt-in for uncased models."""
+        model = make_model()
+        cased = CachedEmbeddings(model, model_name="mini")
+        cased.embed_query("Queen")
+        cased.embed_query("queen")
+        assert model.embed_query.call_count == 2
+
+        uncased = CachedEmbeddings(model, model_name="mini", lowercase=True)
+        uncased.embed_query("Queen")
+        uncased.embed_query("queen")
+        assert model.embed_query.call_count == 3
+
+    def test_documents_embed_only_misses(self):
+        """Test that cached and duplicate texts are not sent to the model."""
+        model = make_model()
+        embeddings = CachedEmbeddings(model, model_name="mini")
+        embeddings.embed_query("rock")
+
+        vectors = embeddings.embed_documents(["rock", "jazz", "jazz"])
+
+        model.embed_documents.assert_called_once_with(["jazz"])
+        assert vectors == [[4.0, 0.5], [4.0, 0.5], [4.0, 0.5]]
+
+    def test_disk_cache_survives_restart(self):
+        """Test that a new instance reads vectors persisted by an old one."""
+        store = InMemoryByteStore()
+        CachedEmbeddings(make_model(), model_name="mini", store=store).embed_query("blues")
+
+        model = make_model()
+        restarted = CachedEmbeddings(model, model_name="mini", cache=LRUCache(maxsize=8), store=store)
+
+        assert restarted.embed_query("blues") == [5.0, 0.5]
+        model.embed_query.assert_not_called()
+        assert restarted.stats().disk_hits == 1
+
+    def test_model_name_separates_keys(self):
+        """Test that vectors from another model are never returned."""
+        store = InMemoryByteStore()
+        CachedEmbeddings(make_model(), model_name="mini", store=store).embed_query("blues")
+
+        model = make_model()
+        CachedEmbeddings(model, model_name="mpnet", store=store).embed_query("blues")
+        model.embed_query.assert_called_once()
+
+    def test_documents_are_not_persisted_by_default(self):
+        """Test that bulk document embeddings stay out of the disk tier unless enabled."""
+        store = InMemoryByteStore()
+        CachedEmbeddings(make_model(), model_name="mini", store=store).embed_documents(["rock", "jazz"])
+        assert list(store.yield_keys()) == []
+
+        CachedEmbeddings(make_model(), model_name="mini", store=store,
+                         persist_documents=True).embed_documents(["rock", "jazz"])
+        assert len(list(store.yield_keys())) == 2
+
+    def test_persisted_vectors_are_capped(self):
+        """Test that the disk tier stops growing at max_persisted, counting earlier runs."""
+        store = InMemoryByteStore()
+        CachedEmbeddings(make_model(), model_name="mini", store=store, max_persisted=2).embed_query("rock")
+
+        embeddings = CachedEmbeddings(make_model(), model_name="mini", store=store, max_persisted=2)
+        for text in ["jazz", "blues", "funk"]:
+            embeddings.embed_query(text)
+
+        assert len(list(store.yield_keys())) == 2
+        assert embeddings.embed_query("funk") == [4.0, 0.5]
@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import AsyncMock
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+
+from history import HistoryPolicy, build_llm_messages, create_summarize_node, trim_history
+
+
+def conversation(turns):
+    """Build a history of human/AI pairs with stable IDs."""
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"question {i}", id=f"h{i}"))
+        messages.append(AIMessage(content=f"answer {i}", id=f"a{i}"))
+    return messages
+
+
+class TestTrimHistory:
+    """Test cases for history windowing and token trimming."""
+
+    def test_window_keeps_last_messages(self):
+        """Test that only the last N messages are kept."""
+        trimmed = trim_history(conversation(10), HistoryPolicy(max_messages=4, max_tokens=0))
+        assert [m.content for m in trimmed] == ["question 8", "answer 8", "question 9", "answer 9"]
+
+    def test_window_never_starts_on_tool_result(self):
+        """Test that the window moves back to a human turn to keep tool calls paired."""
+        messages = [
+            HumanMessage(content="find queen"),
+            AIMessage(content="", tool_calls=[{"name": "search_for_music", "args": {"query": "queen"}, "id": "c1"}]),
+            ToolMessage(content="Bohemian Rhapsody", tool_call_id="c1"),
+            AIMessage(content="Found it"),
+        ]
+        trimmed = trim_history(messages, HistoryPolicy(max_messages=2, max_tokens=0))
+        assert isinstance(trimmed[0], HumanMessage)
+        assert len(trimmed) == 4
+
+    def test_token_budget(self):
+        """Test that the history is trimmed to the token budget."""
+        messages = [HumanMessage(content="word " * 200), AIMessage(content="ok"),
+                    HumanMessage(content="short question"), AIMessage(content="short answer")]
+        trimmed = trim_history(messages, HistoryPolicy(max_messages=0, max_tokens=50))
+        assert [m.content for m in trimmed] == ["short question", "short answer"]
+
+    def test_latest_turn_kept_over_budget(self):
+        """Test that the current turn survives even if it exceeds the budget."""
+        messages = [HumanMessage(content="word " * 500)]
+        trimmed = trim_history(messages, HistoryPolicy(max_tokens=10))
+        assert trimmed == messages
+
+    def test_build_llm_messages_includes_summary(self):
+        """Test that the system prompt and rolling summary lead the LLM input."""
+        state = {"messages": conversation(1), "summary": "Customer asked about Queen."}
+        messages = build_llm_messages(state, "You are helpful.", HistoryPolicy())
+
+        assert isinstance(messages[0], SystemMessage) and messages[0].content == "You are helpful."
+        assert "Customer asked about Queen." in messages[1].content
+        assert messages[2].content == "question 0"
+
+
+class TestSummarizeNode:
+    """Test cases for the rolling summary node."""
+
+    @pytest.mark.asyncio
+    async def test_short_history_untouched(self):
+        """Test that nothing happens below the window size."""
+        llm = AsyncMock()
+        node = create_summarize_node(llm, HistoryPolicy(max_messages=10))
+
+        assert await node({"messages": conversation(2)}) == {}
+        llm.ainvoke.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_overflow_folded_into_summary(self):
+        """Test that old messages are summarized and removed from state."""
+        llm = AsyncMock()
+        llm.ainvoke.return_value = AIMessage(content="New summary")
+        node = create_summarize_node(llm, HistoryPolicy(max_messages=8))
+
+        update = await node({"messages": conversation(6), "summary": "Old summary"})
+
+        assert update["summary"] == "New summary"
+        removed = [m.id for m in update["messages"]]
+        assert all(isinstance(m, RemoveMessage) for m in update["messages"])
+        assert removed == ["h0", "a0", "h1", "a1", "h2", "a2", "h3", "a3"]
+        assert "Old summary" in llm.ainvoke.call_args.args[0][1][1]
+
+    @pytest.mark.asyncio
+    async def test_summarization_disabled(self):
+        """Test that summarize=False leaves the state alone."""
+        llm = AsyncMock()
+        node = create_summarize_node(llm, HistoryPolicy(max_messages=2, summarize=False))
+
+        assert await node({"messages": conversation(5)}) == {}
@@ -0,0 +1,148 @@
+import json
+import pytest
+from typing import TypedDict
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph, START, END
+
+from instrumentation import (Metrics, InstrumentationHandler, instrumented_tool, record_query,
+                             enable_trace, disable_trace, node_label, metrics)
+
+
+class State(TypedDict):
+    question: str
+    answer: str
+
+
+def make_graph():
+    """Two-node graph with a conditional edge and an LLM call in the second node."""
+    model = GenericFakeChatModel(messages=iter([
+        AIMessage(content="Hello", usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15})
+    ]))
+
+    def lookup(state):
+        return {"question": state["question"].strip()}
+
+    async def respond(state):
+        return {"answer": (await model.ainvoke(state["question"])).content}
+
+    def route(state):
+        return "respond" if state["question"] else END
+
+    builder = StateGraph(State)
+    builder.add_node("lookup", lookup)
+    builder.add_node("respond", respond)
+    builder.add_edge(START, "lookup")
+    builder.add_conditional_edges("lookup", route, ["respond", END])
+    builder.add_edge("respond", END)
+    return builder.compile()
+
+
+class TestMetrics:
+    """Test cases for the metrics registry."""
+
+    def test_render_prometheus_format(self):
+        """Test counters and cumulative histogram buckets in the text format."""
+        registry = Metrics(prefix="t_")
+        registry.increment("calls_total", node="router")
+        registry.increment("calls_total", 2, node="router")
+        registry.observe("latency_seconds", 0.02, buckets=(0.01, 0.1), node="a")
+        registry.observe("latency_seconds", 0.005, buckets=(0.01, 0.1), node="a")
+
+        lines = registry.render().splitlines()
+        assert "# TYPE t_calls_total counter" in lines
+        assert 't_calls_total{node="router"} 3' in lines
+        assert 't_latency_seconds_bucket{node="a",le="0.01"} 1' in lines
+        assert 't_latency_seconds_bucket{node="a",le="0.1"} 2' in lines
+        assert 't_latency_seconds_bucket{node="a",le="+Inf"} 2' in lines
+        assert 't_latency_seconds_count{node="a"} 2' in lines
+        assert registry.histogram("latency_seconds", node="a") == (2, pytest.approx(0.025))
+
+    def test_node_label(self):
+        """Test that sub-agent namespaces become readable labels."""
+        assert node_label("music_agent:1f2e|tools:9a8b") == "music_agent/tools"
+        assert node_label("router:abc") == "router"
+
+
+class TestInstrumentationHandler:
+    """Test cases for the callback handler."""
+
+    @pytest.mark.asyncio
+    async def test_records_nodes_edges_and_tokens(self):
+        """Test that a turn records its nodes, conditional edge and LLM tokens."""
+        registry = Metrics()
+        graph = make_graph()
+
+        result = await graph.ainvoke({"question": " hi "}, {"callbacks": [InstrumentationHandler(registry)]})
+
+        assert result["answer"] == "Hello"
+        assert registry.histogram("graph_turn_duration_seconds", status="ok")[0] == 1
+        assert registry.histogram("graph_node_duration_seconds", node="lookup")[0] == 1
+        assert registry.histogram("graph_node_duration_seconds", node="respond")[0] == 1
+        assert registry.histogram("graph_node_duration_seconds", node="route")[0] == 1
+        assert registry.histogram("llm_duration_seconds", node="respond")[0] == 1
+        assert registry.counter("llm_tokens_total", node="respond", type="prompt") == 12
+        assert registry.counter("llm_tokens_total", node="respond", type="completion") == 3
+
+    @pytest.mark.asyncio
+    async def test_node_error_is_counted(self):
+        """Test that a failing node records an error."""
+        registry = Metrics()
+        builder = StateGraph(State)
+        builder.add_node("broken", RunnableLambda(lambda state: 1 / 0))
+        builder.add_edge(START, "broken")
+        graph = builder.compile()
+
+        with pytest.raises(ZeroDivisionError):
+            await graph.ainvoke({"question": "x"}, {"callbacks": [InstrumentationHandler(registry)]})
+
+        assert registry.counter("graph_node_errors_total", node="broken") == 1
+        assert registry.histogram("graph_turn_duration_seconds", status="error")[0] == 1
+
+
+class TestInstrumentedTool:
+    """Test cases for tool and query attribution."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    def teardown_method(self):
+        disable_trace()
+
+    def test_query_attributed_to_tool(self):
+        """Test that queries run inside a tool are labelled with it."""
+        @instrumented_tool
+        def get_invoices(customer_id: str) -> int:
+            """Fetch invoices."""
+            record_query(0.01, 4)
+            return 4
+
+        assert get_invoices("1") == 4
+        assert get_invoices.__doc__ == "Fetch invoices."
+        assert metrics.counter("tool_calls_total", node="", tool="get_invoices", status="ok") == 1
+        assert metrics.histogram("db_query_duration_seconds", node="", tool="get_invoices")[0] == 1
+        assert metrics.histogram("db_query_rows", node="", tool="get_invoices") == (1, 4)
+
+        record_query(0.01, 0)
+        assert metrics.histogram("db_query_duration_seconds", node="", tool="")[0] == 1
+
+    def test_failed_call_and_trace_file(self, tmp_path):
+        """Test that failures are counted and spans are written to the trace file."""
+        path = tmp_path / "trace.jsonl"
+        enable_trace(str(path))
+
+        @instrumented_tool
+        def broken_tool():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            broken_tool()
+        disable_trace()
+
+        assert metrics.counter("tool_calls_total", node="", tool="broken_tool", status="error") == 1
+        span = json.loads(path.read_text().splitlines()[0])
+        assert span["kind"] == "tool"
+        assert span["name"] == "broken_tool"
+        assert span["status"] == "error"
@@ -1,5 +1,6 @@
 import pytest
 import os
+from decimal import Decimal
 from unittest.mock import patch, MagicMock
 
 
@@ -15,22 +16,23 @@ class TestInvoiceTools:
         "OPENAI_API_KEY": "test_key"
     })
     @patch("config.create_engine")
-    @patch("agents.invoice_agent.db")
-    def test_get_invoices_by_customer_sorted_by_date(self, mock_db, mock_engine):
+    @patch("agents.invoice_agent.fetch_rows")
+    def test_get_invoices_by_customer_sorted_by_date(self, mock_fetch_rows, mock_engine):
         """Test getting invoices sorted by date."""
         mock_engine.return_value = MagicMock()
 
         from agents.invoice_agent import get_invoices_by_customer_sorted_by_date
+        from database import QueryResult
 
-        mock_db.run.return_value = "[{'InvoiceId': 1, 'Total': 10.99}]"
+        mock_fetch_rows.return_value = QueryResult(("InvoiceId", "Total"), [(1, Decimal("10.99"))])
 
-        get_invoices_by_customer_sorted_by_date.invoke({"customer_id": "123"})
+        result = get_invoices_by_customer_sorted_by_date.invoke({"customer_id": "123"})
 
-        mock_db.run.assert_called_once()
-        query = mock_db.run.call_args.args[0]
-        params = mock_db.run.call_args.kwargs["parameters"]
-        assert "WHERE \"CustomerId\" = %(customer_id)s" in query
-        assert params == {"customer_id": 123}
+        mock_fetch_rows.assert_called_once()
+        query, params = mock_fetch_rows.call_args.args
+        assert "WHERE \"CustomerId\" = :customer_id" in query
+        assert params == {"customer_id": 123, "start_date": None, "end_date": None, "limit": 11, "offset": 0}
+        assert result == "InvoiceId\tTotal\n1\t10.99"
 
     @patch.dict("os.environ", {
         "DB_USER": "test_user",
@@ -41,22 +43,22 @@ class TestInvoiceTools:
         "OPENAI_API_KEY": "test_key"
     })
     @patch("config.create_engine")
-    @patch("agents.invoice_agent.db")
-    def test_get_invoices_sorted_by_unit_price(self, mock_db, mock_engine):
+    @patch("agents.invoice_agent.fetch_rows")
+    def test_get_invoices_sorted_by_unit_price(self, mock_fetch_rows, mock_engine):
         """Test getting invoices sorted by unit price."""
         mock_engine.return_value = MagicMock()
 
         from agents.invoice_agent import get_invoices_sorted_by_unit_price
+        from database import QueryResult
 
-        mock_db.run.return_value = "[{'InvoiceId': 1, 'UnitPrice': 0.99}]"
+        mock_fetch_rows.return_value = QueryResult(("InvoiceId", "UnitPrice"), [(1, Decimal("0.99"))])
 
         get_invoices_sorted_by_unit_price.invoke({"customer_id": "123"})
 
-        mock_db.run.assert_called_once()
-        query = mock_db.run.call_args.args[0]
-        params = mock_db.run.call_args.kwargs["parameters"]
-        assert "WHERE \"Invoice\".\"CustomerId\" = %(customer_id)s" in query
-        assert params == {"customer_id": 123}
+        mock_fetch_rows.assert_called_once()
+        query, params = mock_fetch_rows.call_args.args
+        assert "WHERE \"Invoice\".\"CustomerId\" = :customer_id" in query
+        assert params == {"customer_id": 123, "start_date": None, "end_date": None, "limit": 10}
 
     @patch.dict("os.environ", {
         "DB_USER": "test_user",
@@ -67,18 +69,97 @@ class TestInvoiceTools:
         "OPENAI_API_KEY": "test_key"
     })
     @patch("config.create_engine")
-    @patch("agents.invoice_agent.db")
-    def test_get_employee_by_invoice_and_customer_found(self, mock_db, mock_engine):
+    @patch("agents.invoice_agent.fetch_rows")
+    def test_get_invoices_by_date_paginates(self, mock_fetch_rows, mock_engine):
+        """Test that a full page is trimmed and points to the next offset."""
+        mock_engine.return_value = MagicMock()
+
+        from agents.invoice_agent import get_invoices_by_customer_sorted_by_date
+        from database import QueryResult
+
+        mock_fetch_rows.return_value = QueryResult(("InvoiceId",), [(3,), (2,), (1,)])
+
+        result = get_invoices_by_customer_sorted_by_date.invoke(
+            {"customer_id": "123", "limit": 2, "offset": 4, "start_date": "2024-01-01"})
+
+        _, params = mock_fetch_rows.call_args.args
+        assert params["limit"] == 3
+        assert params["offset"] == 4
+        assert params["start_date"] == "2024-01-01"
+        assert result == "InvoiceId\n3\n2\nMore invoices available: call again with offset=6."
+
+    @patch.dict("os.environ", {
+        "DB_USER": "test_user",
+        "DB_PASSWORD": "test_pass",
+        "DB_HOST": "localhost",
+        "DB_PORT": "5432",
+        "DB_NAME": "test_db",
+        "OPENAI_API_KEY": "test_key"
+    })
+    @patch("config.create_engine")
+    @patch("agents.invoice_agent.fetch_rows")
+    def test_get_invoices_by_date_rejects_bad_date(self, mock_fetch_rows, mock_engine):
+        """Test that malformed dates never reach the database."""
+        mock_engine.return_value = MagicMock()
+
+        from agents.invoice_agent import get_invoices_by_customer_sorted_by_date
+
+        result = get_invoices_by_customer_sorted_by_date.invoke(
+            {"customer_id": "123", "end_date": "last spring"})
+
+        mock_fetch_rows.assert_not_called()
+        assert "Invalid customer ID or date format" in result
+
+    @patch.dict("os.environ", {
+        "DB_USER": "test_user",
+        "DB_PASSWORD": "test_pass",
+        "DB_HOST": "localhost",
+        "DB_PORT": "5432",
+        "DB_NAME": "test_db",
+        "OPENAI_API_KEY": "test_key"
+    })
+    @patch("config.create_engine")
+    @patch("agents.invoice_agent.fetch_rows")
+    def test_get_invoice_totals_by_month(self, mock_fetch_rows, mock_engine):
+        """Test the monthly aggregate is computed in SQL."""
+        mock_engine.return_value = MagicMock()
+
+        from agents.invoice_agent import get_invoice_totals_by_month
+        from database import QueryResult
+
+        mock_fetch_rows.return_value = QueryResult(("Month", "Invoices", "Total"),
+                                                   [("2024-02", 2, Decimal("3.96"))])
+
+        result = get_invoice_totals_by_month.invoke({"customer_id": "123"})
+
+        query, params = mock_fetch_rows.call_args.args
+        assert "GROUP BY" in query
+        assert params == {"customer_id": 123, "start_date": None, "end_date": None}
+        assert result == "Month\tInvoices\tTotal\n2024-02\t2\t3.96"
+
+    @patch.dict("os.environ", {
+        "DB_USER": "test_user",
+        "DB_PASSWORD": "test_pass",
+        "DB_HOST": "localhost",
+        "DB_PORT": "5432",
+        "DB_NAME": "test_db",
+        "OPENAI_API_KEY": "test_key"
+    })
+    @patch("config.create_engine")
+    @patch("agents.invoice_agent.fetch_rows")
+    def test_get_employee_by_invoice_and_customer_found(self, mock_fetch_rows, mock_engine):
         """Test getting employee info when found."""
         mock_engine.return_value = MagicMock()
 
         from agents.invoice_agent import get_employee_by_invoice_and_customer
+        from database import QueryResult
 
-        mock_db.run.return_value = "[{'FirstName': 'John', 'Title': 'Sales', 'Email': 'john@test.com'}]"
+        mock_fetch_rows.return_value = QueryResult(("FirstName", "Title", "Email"),
+                                                   [("John", "Sales", "john@test.com")])
 
         result = get_employee_by_invoice_and_customer.invoke({"invoice_id": "1", "customer_id": "123"})
 
-        assert result == "[{'FirstName': 'John', 'Title': 'Sales', 'Email': 'john@test.com'}]"
+        assert result == "FirstName\tTitle\tEmail\nJohn\tSales\tjohn@test.com"
 
     @patch.dict("os.environ", {
     "DB_USER": "test_user",
@@ -89,14 +170,15 @@ class TestInvoiceTools:
     "OPENAI_API_KEY": "test_key"
     })
     @patch("config.create_engine")
-    @patch("agents.invoice_agent.db")
-    def test_get_employee_by_invoice_and_customer_not_found(self, mock_db, mock_engine):
+    @patch("agents.invoice_agent.fetch_rows")
+    def test_get_employee_by_invoice_and_customer_not_found(self, mock_fetch_rows, mock_engine):
         """Test getting employee info when not found."""
         mock_engine.return_value = MagicMock()
 
         from agents.invoice_agent import get_employee_by_invoice_and_customer
+        from database import QueryResult
 
-        mock_db.run.return_value = ""
+        mock_fetch_rows.return_value = QueryResult(("FirstName", "Title", "Email"), [])
 
         result = get_employee_by_invoice_and_customer.invoke({"invoice_id": "999", "customer_id": "123"})
 
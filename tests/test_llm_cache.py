@@ -0,0 +1,202 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from cache import LRUCache
+from llm_cache import ResponseCache
+
+
+class CountingChatModel(FakeListChatModel):
+    """Fake chat model answering with numbered replies, so repeats are visible."""
+
+    responses: list = [f"reply {i}" for i in range(10)]
+
+
+PROMPT = [SystemMessage(content="You are a helpful assistant."), HumanMessage(content="Hi there!")]
+
+
+class TestResponseCache:
+    """Test cases for the LLM response cache."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_prompt_is_answered_from_cache(self):
+        """Test that an identical prompt reaches the model once."""
+        model = CountingChatModel(cache=ResponseCache())
+
+        first = await model.ainvoke(PROMPT)
+        second = await model.ainvoke(PROMPT)
+
+        assert first.content == second.content == "reply 0"
+        assert model.i == 1
+        assert (await model.ainvoke([HumanMessage(content="Thanks!")])).content == "reply 1"
+
+    def test_bound_tools_are_part_of_the_key(self):
+        """Test that the same prompt with different tools is not shared."""
+        cache = ResponseCache()
+        model = CountingChatModel(cache=cache)
+        tool = {"type": "function", "function": {"name": "get_invoices", "parameters": {}}}
+
+        assert model.invoke(PROMPT).content == "reply 0"
+        assert model.bind(tools=[tool]).invoke(PROMPT).content == "reply 1"
+        assert model.bind(tools=[tool]).invoke(PROMPT).content == "reply 1"
+        assert model.i == 2
+
+    def test_hit_reports_no_token_usage(self):
+        """Test that cached responses do not count as spent tokens."""
+        cache = ResponseCache()
+        model = CountingChatModel(cache=cache)
+        model.invoke(PROMPT)
+        key = next(iter(cache.cache.items()))[0]
+        # Give the stored response some usage, as the OpenAI client would
+        stored = cache.cache.get(key).replace('"usage_metadata": null',
+                                              '"usage_metadata": {"input_tokens": 9, "output_tokens": 2, '
+                                              '"total_tokens": 11}')
+        cache.cache.set(key, stored)
+
+        assert model.invoke(PROMPT).usage_metadata["total_tokens"] == 0
+
+    def test_sqlite_tier_survives_restart(self, tmp_path):
+        """Test that persisted responses are found by a new cache instance."""
+        path = str(tmp_path / "llm_cache.sqlite")
+        CountingChatModel(cache=ResponseCache(path=path)).invoke(PROMPT)
+
+        model = CountingChatModel(cache=ResponseCache(cache=LRUCache(maxsize=4), path=path))
+        assert model.invoke(PROMPT).content == "reply 0"
+        assert model.i == 0
+
+        model.cache.clear()
+        assert model.invoke(PROMPT).content == "reply 0"
+        assert model.i == 1
+
+    def test_expired_responses_are_ignored(self, tmp_path, monkeypatch):
+        """Test that persisted responses older than the TTL miss."""
+        path = str(tmp_path / "llm_cache.sqlite")
+        CountingChatModel(cache=ResponseCache(path=path, ttl=60)).invoke(PROMPT)
+
+        import llm_cache
+        real_time = llm_cache.time.time
+        monkeypatch.setattr(llm_cache.time, "time", lambda: real_time() + 120)
+        model = CountingChatModel(cache=ResponseCache(path=path, ttl=60))
+        model.invoke(PROMPT)
+        assert model.i == 1
+
+
+class TestCoalescedInvoke:
+    """Test cases for sharing identical LLM calls in flight."""
+
+    @pytest.mark.asyncio
+    async def test_identical_prompts_share_one_call(self):
+        """Test that concurrent identical prompts reach the model once, each with its own message."""
+        import asyncio
+        from cache import SingleFlight
+        from llm_cache import ainvoke_coalesced
+
+        model = CountingChatModel(sleep=0.02)
+        flight = SingleFlight()
+
+        first, second, other = await asyncio.gather(
+            ainvoke_coalesced(model, PROMPT, "final_answer", flight),
+            ainvoke_coalesced(model, PROMPT, "final_answer", flight),
+            ainvoke_coalesced(model, [HumanMessage(content="Bye")], "final_answer", flight))
+
+        assert first.content == second.content
+        assert first is not second
+        assert other.content != first.content
+        assert model.i == 2
+
+    @pytest.mark.asyncio
+    async def test_followers_are_counted(self):
+        """Test that callers answered by another call in flight are recorded."""
+        import asyncio
+        from cache import SingleFlight
+        from instrumentation import metrics
+        from llm_cache import ainvoke_coalesced
+
+        metrics.reset()
+        model = CountingChatModel(sleep=0.02)
+        flight = SingleFlight()
+
+        await asyncio.gather(*(ainvoke_coalesced(model, PROMPT, "final_answer", flight) for _ in range(3)))
+
+        assert model.i == 1
+        assert metrics.counter("llm_coalesced_total", node="final_answer") == 2
+
+    @pytest.mark.asyncio
+    async def test_streaming_callers_are_not_shared(self):
+        """Test that callers streaming tokens make their own calls, so no stream comes back empty."""
+        import asyncio
+        from langchain_core.runnables import RunnableLambda
+        from cache import SingleFlight
+        from llm_cache import ainvoke_coalesced
+
+        model = CountingChatModel(sleep=0.02)
+        flight = SingleFlight()
+
+        async def respond(_):
+            return await ainvoke_coalesced(model, PROMPT, "final_answer", flight)
+
+        node = RunnableLambda(respond)
+
+        async def stream():
+            return [event async for event in node.astream_events({}, version="v2")
+                    if event["event"] == "on_chat_model_stream"]
+
+        first, second = await asyncio.gather(stream(), stream())
+
+        assert model.i == 2
+        assert first and second
+
+    def test_prompt_key_ignores_message_ids(self):
+        """Test that the same conversation stored under different IDs hashes the same."""
+        from llm_cache import prompt_key
+
+        assert prompt_key([HumanMessage(content="Hi", id="a")]) == prompt_key([HumanMessage(content="Hi", id="b")])
+        assert prompt_key([HumanMessage(content="Hi")]) != prompt_key([HumanMessage(content="Hey")])
+
+
+class TestCachedReplies:
+    """Test cases for cached responses added to conversation state."""
+
+    @pytest.mark.asyncio
+    async def test_same_message_twice_in_one_thread(self):
+        """Test that a cached reply is appended as a new message, not merged into the earlier one."""
+        from langgraph.checkpoint.memory import InMemorySaver
+        from langgraph.graph import StateGraph, MessagesState, START, END
+
+        model = CountingChatModel(cache=ResponseCache())
+
+        async def final_answer(state):
+            return {"messages": [await model.ainvoke([("human", state["messages"][-1].content)])]}
+
+        builder = StateGraph(MessagesState)
+        builder.add_node("final_answer", final_answer)
+        builder.add_edge(START, "final_answer")
+        builder.add_edge("final_answer", END)
+        graph = builder.compile(checkpointer=InMemorySaver())
+        config = {"configurable": {"thread_id": "t1"}}
+
+        await graph.ainvoke({"messages": [HumanMessage(content="Thanks!")]}, config)
+        result = await graph.ainvoke({"messages": [HumanMessage(content="Thanks!")]}, config)
+
+        assert [message.type for message in result["messages"]] == ["human", "ai", "human", "ai"]
+        assert result["messages"][-1].content == "reply 0"
+        assert result["messages"][1].id != result["messages"][3].id
+        assert model.i == 1
+
+    def test_hit_reissues_tool_call_ids(self):
+        """Test that a cached tool call gets a new ID on every hit."""
+        from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+        from langchain_core.messages import AIMessage
+
+        call = {"name": "search_for_music", "args": {"query": "queen"}, "id": "call_1"}
+        model = GenericFakeChatModel(messages=iter([AIMessage(content="", tool_calls=[call])]),
+                                     cache=ResponseCache())
+
+        first = model.invoke(PROMPT)
+        second = model.invoke(PROMPT)
+        third = model.invoke(PROMPT)
+
+        assert second.tool_calls[0]["name"] == "search_for_music"
+        assert second.tool_calls[0]["args"] == {"query": "queen"}
+        assert len({first.tool_calls[0]["id"], second.tool_calls[0]["id"], third.tool_calls[0]["id"]}) == 3
+        assert second.id is None or second.id != first.id
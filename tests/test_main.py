@@ -54,4 +54,34 @@ class TestMain:
         from main import main
         await main()
 
-        assert mock_graph.ainvoke.call_count == 2
\ No newline at end of file
+        assert mock_graph.ainvoke.call_count == 2
+    @pytest.mark.asyncio
+    @patch('main.multi_agent_final_graph')
+    @patch('builtins.input')
+    @patch('builtins.print')
+    async def test_main_streaming_flow(self, mock_print, mock_input, mock_graph):
+        """Test that streamed tokens and tool progress are printed as they arrive."""
+        from langchain_core.messages import AIMessageChunk
+
+        mock_input.side_effect = ['Songs by Queen', 'exit']
+
+        async def fake_events(*args, **kwargs):
+            yield {"event": "on_chat_model_stream", "metadata": {"langgraph_node": "summarize_history"},
+                   "data": {"chunk": AIMessageChunk(content='{"destination": "music"}')}}
+            yield {"event": "on_tool_start", "name": "search_for_music", "metadata": {}, "data": {}}
+            for token in ("Bohemian", " Rhapsody"):
+                yield {"event": "on_chat_model_stream", "metadata": {"langgraph_node": "agent"},
+                       "data": {"chunk": AIMessageChunk(content=token)}}
+            yield {"event": "on_chain_end", "parent_ids": [], "metadata": {},
+                   "data": {"output": {"messages": [AIMessage(content="Bohemian Rhapsody")]}}}
+
+        mock_graph.astream_events.side_effect = fake_events
+
+        from main import main
+        await main(stream=True)
+
+        printed = [call.args[0] for call in mock_print.call_args_list if call.args]
+        assert "Bohemian" in printed and " Rhapsody" in printed
+        assert any("search_for_music" in text for text in printed)
+        assert not any("destination" in text for text in printed)
+        mock_graph.ainvoke.assert_not_called()
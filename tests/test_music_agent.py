@@ -9,19 +9,34 @@ class TestMusicTools:
     
     @patch.dict("os.environ", {"OPENAI_API_KEY": "test_key"})
     @patch("config.create_engine")
-    @patch("agents.music_agent.vector_retriever.similarity_search")
-    def test_search_for_music_valid(self, mock_similarity_search, mock_engine):
-        """Test the semantic search tool for music."""
+    @patch("agents.music_agent.music_retriever.search")
+    def test_search_for_music_valid(self, mock_search, mock_engine):
+        """Test the hybrid search tool for music."""
         mock_engine.return_value = MagicMock()
         from agents.music_agent import search_for_music
         
-        mock_similarity_search.return_value = [Document(page_content="Track: Smells Like Teen Spirit")]
+        mock_search.return_value = [Document(page_content="Track: Smells Like Teen Spirit")]
 
         result = search_for_music.invoke({"query": "songs by nirvana"})
         
-        mock_similarity_search.assert_called_once_with("songs by nirvana", k=5)
+        mock_search.assert_called_once_with("songs by nirvana", k=5, genre=None, min_price=None, max_price=None)
         assert "Smells Like Teen Spirit" in result
 
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_key"})
+    @patch("config.create_engine")
+    @patch("agents.music_agent.music_retriever.search")
+    def test_search_for_music_filters_and_caps_k(self, mock_search, mock_engine):
+        """Test that filters are passed through and k is bounded."""
+        mock_engine.return_value = MagicMock()
+        from agents.music_agent import search_for_music
+
+        mock_search.return_value = []
+
+        result = search_for_music.invoke({"query": "guitar", "genre": "Rock", "max_price": 0.99, "k": 500})
+
+        mock_search.assert_called_once_with("guitar", k=20, genre="Rock", min_price=None, max_price=0.99)
+        assert "No results found" in result
+
 class TestMusicAgentGraph:
     """Test cases for the music agent graph itself."""
 
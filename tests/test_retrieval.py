@@ -0,0 +1,103 @@
+import pytest
+from unittest.mock import MagicMock
+
+from langchain_core.documents import Document
+
+from retrieval import BM25Index, HybridRetriever, chroma_filter, tokenize
+
+CATALOG = [
+    ("Bohemian Rhapsody", "Queen", "A Night at the Opera", "Rock", 0.99),
+    ("Love of My Life", "Queen", "A Night at the Opera", "Rock", 0.99),
+    ("Smells Like Teen Spirit", "Nirvana", "Nevermind", "Rock", 0.99),
+    ("So What", "Miles Davis", "Kind of Blue", "Jazz", 1.99),
+    ("Halo", "Beyoncé", "I Am... Sasha Fierce", "Pop", 1.29),
+]
+
+
+def make_vector_store(similar=()):
+    """Fake Chroma store holding the catalog above."""
+    store = MagicMock()
+    store.get.return_value = {
+        "documents": [f"Track: {track}\nArtist: {artist}" for track, artist, *_ in CATALOG],
+        "metadatas": [{"track_name": track, "artist_name": artist, "album_title": album,
+                       "genre": genre, "price": price}
+                      for track, artist, album, genre, price in CATALOG],
+    }
+    store.similarity_search.return_value = [Document(page_content=content) for content in similar]
+    return store
+
+
+class TestBM25Index:
+    """Test cases for the lexical name index."""
+
+    def test_tokenize_folds_accents(self):
+        """Test that accents and case do not affect matching."""
+        assert tokenize("Beyoncé HALO") == ["beyonce", "halo"]
+
+    def test_search_ranks_name_matches(self):
+        """Test that the document containing the rare term ranks first."""
+        retriever = HybridRetriever(make_vector_store())
+        results = retriever.index.search("teen spirit", k=2)
+
+        assert retriever.index.documents[results[0][0]].metadata["artist_name"] == "Nirvana"
+
+    def test_search_applies_filters(self):
+        """Test metadata filters on lexical results."""
+        index = HybridRetriever(make_vector_store()).index
+        results = index.search("queen miles", k=5, genre="Jazz")
+
+        assert [index.documents[i].metadata["track_name"] for i, _ in results] == ["So What"]
+
+    def test_empty_index(self):
+        """Test that an empty catalog returns no hits."""
+        assert BM25Index([]).search("anything") == []
+
+
+class TestHybridRetriever:
+    """Test cases for hybrid lexical and vector search."""
+
+    def test_exact_name_skips_vector_search(self):
+        """Test that an exact artist name is answered lexically."""
+        store = make_vector_store()
+        results = HybridRetriever(store).search("queen")
+
+        assert [doc.metadata["track_name"] for doc in results] == ["Bohemian Rhapsody", "Love of My Life"]
+        store.similarity_search.assert_not_called()
+
+    def test_free_text_fuses_both_rankings(self):
+        """Test that a document found by both rankers is ranked first."""
+        store = make_vector_store(similar=["Track: Plush\nArtist: Stone Temple Pilots",
+                                           "Track: Smells Like Teen Spirit\nArtist: Nirvana"])
+        results = HybridRetriever(store).search("grunge like teen spirit", k=3)
+
+        assert results[0].page_content == "Track: Smells Like Teen Spirit\nArtist: Nirvana"
+        assert "Track: Plush\nArtist: Stone Temple Pilots" in [doc.page_content for doc in results]
+
+    def test_filters_reach_vector_store(self):
+        """Test that genre and price filters become a Chroma where clause."""
+        store = make_vector_store()
+        HybridRetriever(store, k=2).search("relaxing trumpet", genre="Jazz", max_price=1.5)
+
+        store.similarity_search.assert_called_once_with(
+            "relaxing trumpet", k=8, filter={"$and": [{"genre": "Jazz"}, {"price": {"$lte": 1.5}}]})
+
+    def test_genre_filter_uses_stored_casing(self):
+        """Test that a genre typed in another case reaches Chroma as stored in the catalog."""
+        store = make_vector_store()
+        HybridRetriever(store, k=2).search("relaxing trumpet", genre="jazz")
+
+        store.similarity_search.assert_called_once_with("relaxing trumpet", k=8, filter={"genre": "Jazz"})
+
+    def test_chroma_filter_unfiltered(self):
+        """Test that no filters produce no where clause."""
+        assert chroma_filter() is None
+
+    def test_refresh_rebuilds_index(self):
+        """Test that the lexical index reloads after a catalog change."""
+        store = make_vector_store()
+        retriever = HybridRetriever(store)
+        retriever.search("queen")
+        retriever.refresh()
+        retriever.search("queen")
+
+        assert store.get.call_count == 2
@@ -0,0 +1,152 @@
+import pytest
+from routing import RouteCache, normalize_route_text
+
+
+class TestRouteCache:
+    """Test cases for the routing decision cache."""
+
+    def test_normalize_route_text(self):
+        """Test that punctuation, case and spacing do not affect the key."""
+        assert normalize_route_text("  Songs by   QUEEN?! ") == "songs by queen"
+
+    def test_exact_hit_after_put(self):
+        """Test that a stored decision is returned for the same normalized text."""
+        cache = RouteCache()
+        cache.put("Songs by Queen?", "music")
+
+        assert cache.get("songs by queen") == "music"
+        assert cache.stats.hits == 1
+
+    def test_miss_is_counted(self):
+        """Test that unknown messages miss and are counted."""
+        cache = RouteCache()
+
+        assert cache.get("hello there") is None
+        assert cache.stats.misses == 1
+        assert cache.hit_rate == 0.0
+
+    def test_semantic_hit_above_threshold(self):
+        """Test that a similar embedding resolves to the cached destination."""
+        cache = RouteCache(similarity_threshold=0.9)
+        cache.put("songs by queen", "music", vector=[1.0, 0.0, 0.1])
+
+        assert cache.get_similar([0.98, 0.0, 0.12]) == "music"
+        assert cache.semantic_hits == 1
+
+    def test_semantic_miss_below_threshold(self):
+        """Test that dissimilar embeddings do not reuse a decision."""
+        cache = RouteCache(similarity_threshold=0.9)
+        cache.put("songs by queen", "music", vector=[1.0, 0.0, 0.0])
+
+        assert cache.get_similar([0.0, 1.0, 0.0]) is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used decision is evicted first."""
+        cache = RouteCache(maxsize=2)
+        cache.put("a", "music")
+        cache.put("b", "end")
+        cache.get("a")
+        cache.put("c", "music")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "music"
+
+    def test_ttl_expiry(self, mocker):
+        """Test that decisions expire after the configured TTL."""
+        clock = mocker.patch("cache.time.monotonic", return_value=100.0)
+        cache = RouteCache(ttl=10)
+        cache.put("thanks", "end")
+
+        clock.return_value = 111.0
+        assert cache.get("thanks") is None
+
+    def test_semantic_hit_keeps_expiry(self, mocker):
+        """Test that a semantic hit refreshes recency but not the TTL."""
+        clock = mocker.patch("cache.time.monotonic", return_value=100.0)
+        cache = RouteCache(ttl=10)
+        cache.put("play some rock", "music", [1.0, 0.0, 0.0])
+
+        clock.return_value = 108.0
+        assert cache.get_similar([1.0, 0.0, 0.0]) == "music"
+
+        clock.return_value = 111.0
+        assert cache.get_similar([1.0, 0.0, 0.0]) is None
+
+
+class TestIntentClassifier:
+    """Test cases for the nearest-centroid intent classifier."""
+
+    EXAMPLES = {"music": ["songs", "albums"], "end": ["hello", "bye"]}
+    VECTORS = {"songs": [1.0, 0.1, 0.0], "albums": [0.9, 0.0, 0.1],
+               "hello": [0.0, 1.0, 0.1], "bye": [0.1, 0.9, 0.0]}
+
+    def _classifier(self, **kwargs):
+        from routing import IntentClassifier
+
+        def embed(texts):
+            return [self.VECTORS[text] for text in texts]
+
+        return IntentClassifier(embed, examples=self.EXAMPLES, **kwargs)
+
+    def test_fit_is_lazy_and_idempotent(self, mocker):
+        """Test that examples are embedded once, on first use."""
+        classifier = self._classifier()
+        spy = mocker.spy(classifier, "embed_documents")
+
+        assert not classifier.fitted
+        classifier.predict([1.0, 0.0, 0.0])
+        classifier.predict([0.0, 1.0, 0.0])
+
+        assert classifier.fitted
+        spy.assert_called_once()
+
+    def test_predict_confident_label(self):
+        """Test that a vector close to one centroid is classified."""
+        classifier = self._classifier(confidence_threshold=0.8)
+        assert classifier.predict([1.0, 0.05, 0.05]) == "music"
+        assert classifier.predict([0.05, 1.0, 0.05]) == "end"
+
+    def test_predict_low_confidence_escalates(self):
+        """Test that ambiguous or distant vectors return None."""
+        classifier = self._classifier(confidence_threshold=0.8)
+        assert classifier.predict([1.0, 1.0, 0.0]) is None
+        assert classifier.predict([0.0, 0.0, 1.0]) is None
+
+    def test_scores_cover_every_label(self):
+        """Test that scores are reported for all labels."""
+        scores = self._classifier().scores([1.0, 0.0, 0.0])
+        assert set(scores) == {"music", "end"}
+        assert scores["music"] > scores["end"]
+
+
+class TestKeywordMatcher:
+    """Test cases for the compiled intent keyword matcher."""
+
+    @pytest.mark.parametrize("text, intents",
+                             [("I need my last invoice.", {"invoice"}),
+                              ("Show my BILLS and the songs I bought", {"invoice", "music"}),
+                              ("What have I ordered?", {"invoice"}),
+                              ("Any albums by Queen?", {"music"}),
+                              ("Hello there", set())])
+    def test_match_intents(self, text, intents):
+        """Test that all intents present are found in one scan."""
+        from routing import keyword_matcher
+        assert keyword_matcher.match(text) == intents
+
+    @pytest.mark.parametrize("text", ["Is the buyer happy?", "My trackpad broke", "A bandwidth issue"])
+    def test_no_partial_word_matches(self, text):
+        """Test that keywords embedded in longer words are ignored."""
+        from routing import keyword_matcher
+        assert keyword_matcher.match(text) == set()
+
+    def test_custom_keywords(self):
+        """Test that the matcher works for arbitrary intent maps."""
+        from routing import KeywordMatcher
+        matcher = KeywordMatcher({"refund": ["refund", "chargeback"]})
+        assert matcher.match("Was that refunded?") == {"refund"}
+
+    def test_rejects_multi_word_keywords(self):
+        """Test that phrases are rejected since matching is word based."""
+        from routing import KeywordMatcher
+        with pytest.raises(ValueError):
+            KeywordMatcher({"refund": ["money back"]})
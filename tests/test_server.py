@@ -0,0 +1,129 @@
+import pytest
+import json
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from sessions import SessionBusyError, SessionLimitError, SessionStats
+
+
+async def http_request(port, method, path, payload=None):
+    """Send one HTTP request to the local test server and parse the JSON reply."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.fixture
+async def running_server():
+    """Start the request handler on a free port with a mocked session manager."""
+    from server import create_handler
+
+    manager = MagicMock()
+    manager.submit = AsyncMock(return_value="Hello! How can I help you?")
+    manager.stats.return_value = SessionStats(sessions=1)
+    server = await asyncio.start_server(create_handler(manager), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    yield manager, port
+    server.close()
+    await server.wait_closed()
+
+
+class TestServer:
+    """Test cases for the HTTP server entry point."""
+
+    @pytest.mark.asyncio
+    async def test_chat_returns_response(self, running_server):
+        """Test that a chat request is routed to its session."""
+        manager, port = running_server
+        status, body = await http_request(port, "POST", "/chat", {"thread_id": "t1", "message": "Hi"})
+
+        assert status == 200
+        assert body == {"thread_id": "t1", "response": "Hello! How can I help you?"}
+        manager.submit.assert_awaited_once_with("t1", "Hi")
+
+    @pytest.mark.asyncio
+    async def test_chat_assigns_thread_id(self, running_server):
+        """Test that a new conversation gets a generated thread ID."""
+        manager, port = running_server
+        status, body = await http_request(port, "POST", "/chat", {"message": "Hi"})
+
+        assert status == 200
+        assert body["thread_id"]
+
+    @pytest.mark.asyncio
+    async def test_busy_session_returns_429(self, running_server):
+        """Test that backpressure is surfaced as Too Many Requests."""
+        manager, port = running_server
+        manager.submit.side_effect = SessionBusyError("Too many pending messages")
+        status, _ = await http_request(port, "POST", "/chat", {"thread_id": "t1", "message": "Hi"})
+
+        assert status == 429
+
+    @pytest.mark.asyncio
+    async def test_session_limit_returns_503(self, running_server):
+        """Test that a full session table is surfaced as Service Unavailable."""
+        manager, port = running_server
+        manager.submit.side_effect = SessionLimitError("Too many open sessions")
+        status, _ = await http_request(port, "POST", "/chat", {"thread_id": "t9", "message": "Hi"})
+
+        assert status == 503
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("payload", [[], "Hi", {"thread_id": 7, "message": "Hi"},
+                                         {"thread_id": "t" * 129, "message": "Hi"}])
+    async def test_malformed_body_returns_400(self, running_server, payload):
+        """Test that non-object bodies and invalid thread IDs are rejected, not answered with 500."""
+        manager, port = running_server
+        status, _ = await http_request(port, "POST", "/chat", payload)
+
+        assert status == 400
+        manager.submit.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_missing_message_returns_400(self, running_server):
+        """Test that requests without a message are rejected."""
+        _, port = running_server
+        status, _ = await http_request(port, "POST", "/chat", {"thread_id": "t1"})
+
+        assert status == 400
+
+    @pytest.mark.asyncio
+    async def test_health(self, running_server):
+        """Test that the health endpoint reports session load."""
+        _, port = running_server
+        status, body = await http_request(port, "GET", "/health")
+
+        assert status == 200
+        assert body["status"] == "ok" and body["sessions"] == 1
+        assert "hit_rate" in body["embedding_cache"]
+
+    @pytest.mark.asyncio
+    async def test_metrics(self, running_server):
+        """Test that the metrics endpoint serves the Prometheus text format."""
+        from instrumentation import metrics
+
+        _, port = running_server
+        metrics.increment("tool_calls_total", node="music_agent/tools", tool="search_for_music", status="ok")
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: test\r\n\r\n")
+        await writer.drain()
+        head, _, body = (await reader.read()).partition(b"\r\n\r\n")
+        writer.close()
+
+        assert head.split()[1] == b"200"
+        assert b"Content-Type: text/plain" in head
+        assert b'support_tool_calls_total{node="music_agent/tools",status="ok",tool="search_for_music"}' in body
+
+    @pytest.mark.asyncio
+    async def test_client_user_id_is_ignored(self, running_server):
+        """Test that an unauthenticated user ID in the body is not passed on."""
+        manager, port = running_server
+        status, _ = await http_request(port, "POST", "/chat", {"thread_id": "t1", "message": "Hi", "user_id": "u-7"})
+
+        assert status == 200
+        manager.submit.assert_awaited_once_with("t1", "Hi")
@@ -0,0 +1,117 @@
+import pytest
+import asyncio
+from unittest.mock import MagicMock
+from langchain_core.messages import AIMessage
+
+from sessions import SessionManager, SessionBusyError, SessionLimitError
+
+
+def make_graph(delay=0.0, tracker=None):
+    """Fake graph echoing the last message after an optional delay."""
+    graph = MagicMock()
+
+    async def ainvoke(state, config, **kwargs):
+        if tracker is not None:
+            tracker["running"] += 1
+            tracker["peak"] = max(tracker["peak"], tracker["running"])
+        await asyncio.sleep(delay)
+        if tracker is not None:
+            tracker["running"] -= 1
+        thread_id = config["configurable"]["thread_id"]
+        return {"messages": [AIMessage(content=f"{thread_id}: {state['messages'][-1].content}")]}
+
+    graph.ainvoke.side_effect = ainvoke
+    return graph
+
+
+class TestSessionManager:
+    """Test cases for the concurrent session manager."""
+
+    @pytest.mark.asyncio
+    async def test_submit_returns_reply(self):
+        """Test that a message is answered on its own thread."""
+        manager = SessionManager(make_graph())
+        assert await manager.submit("t1", "hello") == "t1: hello"
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_turns_within_a_session_are_ordered(self):
+        """Test that one session processes its messages sequentially."""
+        tracker = {"running": 0, "peak": 0}
+        manager = SessionManager(make_graph(delay=0.01, tracker=tracker))
+
+        replies = await asyncio.gather(*(manager.submit("t1", str(i)) for i in range(3)))
+
+        assert replies == ["t1: 0", "t1: 1", "t1: 2"]
+        assert tracker["peak"] == 1
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """Test that the semaphore caps concurrent graph turns across sessions."""
+        tracker = {"running": 0, "peak": 0}
+        manager = SessionManager(make_graph(delay=0.01, tracker=tracker), max_concurrency=2)
+
+        await asyncio.gather(*(manager.submit(f"t{i}", "hi") for i in range(6)))
+
+        assert tracker["peak"] == 2
+        assert manager.stats().completed == 6
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_full_queue_applies_backpressure(self):
+        """Test that messages beyond the queue size are rejected."""
+        manager = SessionManager(make_graph(delay=0.05), queue_size=1)
+
+        first = asyncio.create_task(manager.submit("t1", "one"))
+        await asyncio.sleep(0.01)  # worker picks up "one"
+        second = asyncio.create_task(manager.submit("t1", "two"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(SessionBusyError):
+            await manager.submit("t1", "three")
+        assert await first == "t1: one"
+        assert await second == "t1: two"
+        assert manager.stats().rejected == 1
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_new_sessions_beyond_limit_are_rejected(self):
+        """Test that max_sessions caps open sessions while existing ones keep working."""
+        manager = SessionManager(make_graph(), max_sessions=2)
+        await manager.submit("t1", "one")
+        await manager.submit("t2", "two")
+
+        with pytest.raises(SessionLimitError):
+            await manager.submit("t3", "three")
+        assert await manager.submit("t1", "again") == "t1: again"
+        assert "t3" not in manager.sessions
+        assert manager.stats().rejected == 1
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_idle_sessions_are_released(self):
+        """Test that an idle session worker exits and frees its slot."""
+        manager = SessionManager(make_graph(), idle_timeout=0.01)
+        await manager.submit("t1", "hello")
+        await asyncio.sleep(0.05)
+
+        assert "t1" not in manager.sessions
+        assert await manager.submit("t1", "again") == "t1: again"
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_graph_errors_propagate(self):
+        """Test that a failed turn raises for its caller only."""
+        graph = MagicMock()
+
+        async def fail(*args, **kwargs):
+            raise RuntimeError("boom")
+
+        graph.ainvoke.side_effect = fail
+        manager = SessionManager(graph)
+
+        with pytest.raises(RuntimeError):
+            await manager.submit("t1", "hello")
+        assert manager.stats().failed == 1
+        await manager.shutdown()
@@ -46,4 +46,66 @@ class TestUtils:
         finally:
             # Clean up by removing the mocked module
             if 'nest_asyncio' in sys.modules:
-                del sys.modules['nest_asyncio']
\ No newline at end of file
+                del sys.modules['nest_asyncio']
+
+class TestOffloadedTool:
+    """Test cases for the executor-offloaded tool decorator."""
+
+    def _make_tool(self, executor=None):
+        import threading
+        from utils import offloaded_tool
+
+        @offloaded_tool(executor)
+        def lookup(name: str) -> str:
+            """Look up a name."""
+            return f"{name} on {threading.current_thread().name}"
+
+        return lookup
+
+    def test_tool_metadata_matches_function(self):
+        """Test that name, description and arguments come from the function."""
+        lookup = self._make_tool()
+        assert lookup.name == "lookup"
+        assert lookup.description == "Look up a name."
+        assert list(lookup.args) == ["name"]
+
+    def test_invoke_runs_inline(self):
+        """Test that the sync path calls the function directly."""
+        import threading
+        lookup = self._make_tool()
+        assert lookup.invoke({"name": "queen"}) == f"queen on {threading.current_thread().name}"
+
+    @pytest.mark.asyncio
+    async def test_ainvoke_runs_in_executor(self):
+        """Test that the async path runs on the given executor's threads."""
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sql")
+        lookup = self._make_tool(executor)
+
+        result = await lookup.ainvoke({"name": "queen"})
+
+        assert result.startswith("queen on sql")
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_identical_calls_in_flight_are_coalesced(self):
+        """Test that concurrent calls with the same arguments run the function once."""
+        import asyncio
+        import time
+        from cache import SingleFlight
+        from utils import offloaded_tool
+
+        calls = []
+
+        @offloaded_tool(coalesce=SingleFlight())
+        def lookup(name: str) -> str:
+            """Look up a name."""
+            calls.append(name)
+            time.sleep(0.05)
+            return f"found {name}"
+
+        results = await asyncio.gather(lookup.ainvoke({"name": "queen"}), lookup.ainvoke({"name": "queen"}),
+                                       lookup.ainvoke({"name": "abba"}))
+
+        assert results == ["found queen", "found queen", "found abba"]
+        assert sorted(calls) == ["abba", "queen"]
@@ -0,0 +1,199 @@
+import pytest
+from unittest.mock import patch
+
+from langchain_core.stores import InMemoryByteStore
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from database import QueryResult
+from queries import CUSTOMER_BY_EMAIL, CUSTOMER_BY_FULL_NAME, CUSTOMER_BY_PATTERN, CUSTOMER_BY_SIMILARITY
+from verification import CustomerLookup, VerifiedIdentityCache, extract_identifier, normalize_identifier
+
+
+def ids(*customer_ids):
+    return QueryResult(("CustomerId",), [(customer_id,) for customer_id in customer_ids])
+
+
+def scored(*rows):
+    return QueryResult(("CustomerId", "Score"), list(rows))
+
+
+class DriverError(Exception):
+    """Stand-in for a psycopg2 error carrying its SQLSTATE."""
+
+    def __init__(self, message, pgcode):
+        super().__init__(message)
+        self.pgcode = pgcode
+
+
+class TestCustomerLookup:
+    """Test cases for tiered customer identity lookup."""
+
+    def test_normalize_identifier(self):
+        """Test that case and spacing do not change the cache key."""
+        assert normalize_identifier("  Luis   GONCALVES ") == "luis goncalves"
+
+    @patch("verification.fetch_rows")
+    def test_email_exact_match(self, mock_fetch_rows):
+        """Test that an email resolves on the exact tier without fuzzy search."""
+        mock_fetch_rows.return_value = ids(1)
+
+        assert CustomerLookup().find("LuisG@Embraer.com.br") == 1
+        mock_fetch_rows.assert_called_once_with(CUSTOMER_BY_EMAIL, {"email": "luisg@embraer.com.br"})
+
+    @patch("verification.fetch_rows")
+    def test_name_exact_match(self, mock_fetch_rows):
+        """Test that a name without '@' skips the email tier."""
+        mock_fetch_rows.return_value = ids(7)
+
+        assert CustomerLookup().find("Astrid Gruber") == 7
+        assert mock_fetch_rows.call_args.args[0] == CUSTOMER_BY_FULL_NAME
+
+    @patch("verification.fetch_rows")
+    def test_ambiguous_name_falls_through(self, mock_fetch_rows):
+        """Test that a name shared by two customers does not verify either."""
+        mock_fetch_rows.side_effect = [ids(3, 9), scored((3, 0.9), (9, 0.9))]
+
+        assert CustomerLookup().find("Mark Taylor") is None
+        assert mock_fetch_rows.call_args.args[0] == CUSTOMER_BY_SIMILARITY
+
+    @patch("verification.fetch_rows")
+    def test_similarity_accepts_clear_winner(self, mock_fetch_rows):
+        """Test that the fuzzy tier picks a best match that beats the runner-up."""
+        mock_fetch_rows.side_effect = [ids(), scored((1, 0.8), (12, 0.4))]
+
+        lookup = CustomerLookup(min_similarity=0.5)
+        assert lookup.find("luis goncalvez") == 1
+        assert mock_fetch_rows.call_args.args[1] == {"identifier": "luis goncalvez", "min_similarity": 0.5}
+
+    @patch("verification.fetch_rows")
+    def test_similarity_rejects_near_tie(self, mock_fetch_rows):
+        """Test that a best match only slightly ahead of the runner-up does not verify."""
+        mock_fetch_rows.side_effect = [ids(), scored((1, 0.71), (12, 0.7))]
+
+        assert CustomerLookup(min_margin=0.1).find("mark tailor") is None
+
+    @patch("verification.fetch_rows")
+    def test_pattern_fallback_without_trigram(self, mock_fetch_rows):
+        """Test the ILIKE fallback when pg_trgm is not installed."""
+        error = ProgrammingError("SELECT", {}, DriverError("function similarity does not exist", "42883"))
+        mock_fetch_rows.side_effect = [ids(), error, ids(4)]
+
+        lookup = CustomerLookup()
+        assert lookup.find("gruber") == 4
+        assert mock_fetch_rows.call_args.args == (CUSTOMER_BY_PATTERN, {"pattern": "%gruber%"})
+        assert not lookup._trigram_available
+
+    @patch("verification.fetch_rows")
+    def test_other_database_errors_keep_trigram(self, mock_fetch_rows):
+        """Test that a transient database error is raised without disabling the fuzzy tier."""
+        error = OperationalError("SELECT", {}, DriverError("server closed the connection", "08006"))
+        mock_fetch_rows.side_effect = [ids(), error]
+
+        lookup = CustomerLookup()
+        with pytest.raises(OperationalError):
+            lookup.find("gruber")
+        assert lookup._trigram_available
+
+    @patch("verification.fetch_rows")
+    def test_pattern_escapes_wildcards(self, mock_fetch_rows):
+        """Test that '%' and '_' in the identifier are matched literally."""
+        mock_fetch_rows.side_effect = [ids(), ids()]
+
+        lookup = CustomerLookup()
+        lookup._trigram_available = False
+        assert lookup.find("%_a") is None
+        assert mock_fetch_rows.call_args.args == (CUSTOMER_BY_PATTERN, {"pattern": "%\\%\\_a%"})
+
+    @patch("verification.fetch_rows")
+    def test_verified_identifiers_are_cached(self, mock_fetch_rows):
+        """Test that a repeat verification skips the database."""
+        mock_fetch_rows.return_value = ids(1)
+        lookup = CustomerLookup()
+
+        lookup.find("luisg@embraer.com.br")
+        assert lookup.find("  LUISG@embraer.com.br") == 1
+        assert mock_fetch_rows.call_count == 1
+
+    @patch("verification.fetch_rows")
+    def test_misses_are_not_cached(self, mock_fetch_rows):
+        """Test that an unknown identifier is looked up again next time."""
+        mock_fetch_rows.side_effect = [ids(), scored(), ids(), scored((5, 0.9))]
+        lookup = CustomerLookup()
+
+        assert lookup.find("new customer") is None
+        assert lookup.find("new customer") == 5
+
+    @patch("verification.fetch_rows")
+    def test_shared_cache_skips_database(self, mock_fetch_rows):
+        """Test that an identity verified by another process is reused."""
+        shared = VerifiedIdentityCache(InMemoryByteStore())
+        shared.set("luisg@embraer.com.br", 1)
+
+        assert CustomerLookup(shared_cache=shared).find("LuisG@embraer.com.br") == 1
+        mock_fetch_rows.assert_not_called()
+
+    @patch("verification.fetch_rows")
+    def test_invalidate_clears_both_tiers(self, mock_fetch_rows):
+        """Test that an invalidated identifier is looked up again."""
+        mock_fetch_rows.return_value = ids(1)
+        shared = VerifiedIdentityCache(InMemoryByteStore())
+        lookup = CustomerLookup(shared_cache=shared)
+
+        lookup.find("luisg@embraer.com.br")
+        lookup.invalidate("LUISG@embraer.com.br")
+
+        assert shared.get("luisg@embraer.com.br") is None
+        lookup.find("luisg@embraer.com.br")
+        assert mock_fetch_rows.call_count == 2
+
+
+class TestVerifiedIdentityCache:
+    """Test cases for the cross-thread verified identity cache."""
+
+    def test_keys_are_hashed(self):
+        """Test that identifiers are not stored in clear text."""
+        store = InMemoryByteStore()
+        VerifiedIdentityCache(store).set("luisg@embraer.com.br", 1)
+
+        (key,) = store.yield_keys()
+        assert key.startswith("verified_identity/")
+        assert "luisg" not in key
+
+    @patch("verification.time.time")
+    def test_entries_expire(self, mock_time):
+        """Test that a verification older than the TTL is dropped."""
+        cache = VerifiedIdentityCache(InMemoryByteStore(), ttl=60)
+        mock_time.return_value = 1000.0
+        cache.set("user:42", 7)
+
+        assert cache.get("user:42") == 7
+        mock_time.return_value = 1061.0
+        assert cache.get("user:42") is None
+
+    def test_keys_depend_on_secret(self):
+        """Test that entries are only found with the secret they were written under."""
+        store = InMemoryByteStore()
+        VerifiedIdentityCache(store, secret=b"k1").set("luisg@embraer.com.br", 1)
+
+        assert VerifiedIdentityCache(store, secret=b"k1").get("luisg@embraer.com.br") == 1
+        assert VerifiedIdentityCache(store, secret=b"k2").get("luisg@embraer.com.br") is None
+        assert VerifiedIdentityCache(store).get("luisg@embraer.com.br") is None
+
+
+class TestExtractIdentifier:
+    """Test cases for pulling identifiers out of user messages."""
+
+    @pytest.mark.parametrize("message, identifier",
+                             [("my email is LuisG@embraer.com.br.", "LuisG@embraer.com.br"),
+                              ("My name is luis goncalves and I want my invoice", "luis goncalves"),
+                              ("Hi, this is Frank Harris. Show me my bills", "Frank Harris"),
+                              ("I'm Astrid Gruber", "Astrid Gruber"),
+                              ("Astrid Gruber", "Astrid Gruber")])
+    def test_extracts_identifier(self, message, identifier):
+        """Test emails and introduced names are found."""
+        assert extract_identifier(message) == identifier
+
+    @pytest.mark.parametrize("message", ["I am looking for my invoice", "invoices please", "my name is Bob"])
+    def test_no_identifier(self, message):
+        """Test that ordinary requests and single names are left to the LLM."""
+        assert extract_identifier(message) is None
@@ -12,21 +12,14 @@ class TestRouter:
                              [("I need my last invoice.", "verify_customer", False),
                               ("Can you find songs by Queen?", "music", True),
                               ("Thanks!", "end", True)])
-    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_key"})
-    @patch("langchain_openai.ChatOpenAI.ainvoke", new_callable=AsyncMock)
-    async def test_router_logic(self, mock_llm_ainvoke, message_content, destination, should_call_llm):
+    @patch("workflow._embed_route_text", new_callable=AsyncMock, return_value=None)
+    @patch("workflow.structured_llm_router")
+    async def test_router_logic(self, mock_router_llm, mock_embed, message_content, destination, should_call_llm):
         """Test that the router correctly directs queries based on content."""
-        from workflow import router
+        from workflow import router, route_cache
 
-        if should_call_llm:
-            mock_llm_ainvoke.return_value = AIMessage(
-                content="",
-                tool_calls=[{
-                    "name": "RouteQuery",
-                    "args": {"destination": destination},
-                    "id": "test_call"
-                }]
-            )
+        route_cache.clear()
+        mock_router_llm.ainvoke = AsyncMock(return_value=RouteQuery(destination=destination))
 
         state = {"messages": [HumanMessage(content=message_content)]}
         result = await router(state)
@@ -34,6 +27,115 @@ class TestRouter:
         assert result == destination
         
         if should_call_llm:
-            mock_llm_ainvoke.assert_called_once()
+            mock_router_llm.ainvoke.assert_called_once()
+            # Only routes decided by the LLM are cached, not the keyword fallback
+            assert route_cache.get(message_content) == destination
         else:
-            mock_llm_ainvoke.assert_not_called()
+            mock_router_llm.ainvoke.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("workflow._embed_route_text", new_callable=AsyncMock, return_value=None)
+    @patch("workflow.structured_llm_router")
+    async def test_router_reuses_cached_route(self, mock_router_llm, mock_embed):
+        """Test that a repeated message is routed from the cache without the LLM."""
+        from workflow import router, route_cache
+
+        route_cache.clear()
+        mock_router_llm.ainvoke = AsyncMock(return_value=RouteQuery(destination="music"))
+
+        state = {"messages": [HumanMessage(content="Play something by Queen")]}
+        assert await router(state) == "music"
+        assert await router(state) == "music"
+
+        mock_router_llm.ainvoke.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch("workflow._embed_route_text", new_callable=AsyncMock, return_value=None)
+    @patch("workflow.structured_llm_router")
+    async def test_cached_invoice_route_checks_customer(self, mock_router_llm, mock_embed):
+        """Test that a cached invoice route still depends on whether the customer is verified."""
+        from workflow import router, route_cache
+
+        route_cache.clear()
+        mock_router_llm.ainvoke = AsyncMock(return_value=RouteQuery(destination="invoice"))
+        message = [HumanMessage(content="How much did I spend last month?")]
+
+        assert await router({"messages": message}) == "verify_customer"
+        assert await router({"messages": message, "customer_id": "7"}) == "invoice"
+        assert await router({"messages": message}) == "verify_customer"
+        mock_router_llm.ainvoke.assert_called_once()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("intent, customer_id, destination",
+                             [("music", None, "music"),
+                              ("end", None, "end"),
+                              ("invoice", None, "verify_customer"),
+                              ("verify_customer", "42", "invoice")])
+    @patch("workflow._embed_route_text", new_callable=AsyncMock, return_value=[1.0, 0.0, 0.0])
+    @patch("workflow.intent_classifier.fit")
+    @patch("workflow.structured_llm_router")
+    async def test_router_confident_intent_skips_llm(self, mock_router_llm, mock_fit, mock_embed,
+                                                     intent, customer_id, destination):
+        """Test that confident local classifications never reach the LLM."""
+        from workflow import router, route_cache, intent_classifier
+
+        route_cache.clear()
+        mock_router_llm.ainvoke = AsyncMock()
+        state = {"messages": [HumanMessage(content="Anything at all")], "customer_id": customer_id}
+        with patch.object(intent_classifier, "predict", return_value=intent):
+            result = await router(state)
+
+        assert result == destination
+        mock_router_llm.ainvoke.assert_not_called()
+
+
+class TestCustomerVerification:
+    """Test cases for the customer verification node."""
+
+    @pytest.mark.asyncio
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_key"})
+    @patch("workflow.customer_lookup.find", return_value=1)
+    @patch("langchain_openai.ChatOpenAI.ainvoke", new_callable=AsyncMock)
+    async def test_identifier_in_message_skips_llm(self, mock_llm_ainvoke, mock_find):
+        """Test that an email in the message is verified without an LLM call."""
+        from workflow import customer_verification
+
+        state = {"messages": [HumanMessage(content="Hi, my email is luisg@embraer.com.br")]}
+        result = await customer_verification(state)
+
+        assert result["customer_id"] == "1"
+        mock_find.assert_called_once_with("luisg@embraer.com.br")
+        mock_llm_ainvoke.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_key"})
+    @patch("workflow.customer_lookup.find")
+    @patch("langchain_openai.ChatOpenAI.ainvoke", new_callable=AsyncMock)
+    async def test_falls_back_to_llm_without_identifier(self, mock_llm_ainvoke, mock_find):
+        """Test that the LLM asks for details when nothing can be extracted."""
+        from workflow import customer_verification
+
+        mock_llm_ainvoke.return_value = AIMessage(content="Could you share your email address?")
+
+        state = {"messages": [HumanMessage(content="Show me my invoices")]}
+        result = await customer_verification(state)
+
+        assert "customer_id" not in result
+        mock_find.assert_not_called()
+        mock_llm_ainvoke.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_key"})
+    @patch("workflow.verified_identities.get", return_value=5)
+    @patch("workflow.customer_lookup.find")
+    @patch("langchain_openai.ChatOpenAI.ainvoke", new_callable=AsyncMock)
+    async def test_new_thread_must_identify(self, mock_llm_ainvoke, mock_find, mock_get):
+        """Test that no stored verification is reused until the customer gives an identifier."""
+        from workflow import customer_verification
+
+        mock_llm_ainvoke.return_value = AIMessage(content="Could you share your email address?")
+        state = {"messages": [HumanMessage(content="Show me my invoices")]}
+        result = await customer_verification(state)
+
+        assert "customer_id" not in result
+        mock_get.assert_not_called()
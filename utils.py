@@ -2,7 +2,17 @@
 Utility functions for the CoderLLM application.
 """
 
+import asyncio
+import contextvars
+import functools
+import json
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
 from langchain_core.runnables.graph import MermaidDrawMethod
+from langchain_core.tools import StructuredTool
+
+from cache import SingleFlight
 
 
 def save_graph_diagram(graph, output_filename="graph.png"):
@@ -45,6 +55,40 @@ def save_graph_diagram(graph, output_filename="graph.png"):
             print(f"Could not save graph diagram: {fallback_error}")
 
 
+def offloaded_tool(executor: Optional[Executor] = None,
+                   coalesce: Optional[SingleFlight] = None) -> Callable[[Callable], StructuredTool]:
+    """
+    Decorator turning a blocking function into a tool whose async path runs
+    in ``executor``, so ``ainvoke`` never blocks the event loop.
+
+    The tool is built exactly like ``@tool`` would build it (name, docstring
+    description and argument schema come from the function); ``invoke``
+    still calls the function directly.
+
+    The call runs in a copy of the caller's context, like ``asyncio.to_thread``,
+    so context variables such as the current run config reach the function.
+
+    Args:
+        executor: Executor for async calls; ``None`` uses the loop's default.
+        coalesce: Share one execution among concurrent async calls with the
+            same arguments. Only for tools without side effects.
+    """
+    def decorator(func: Callable) -> StructuredTool:
+        async def run_in_executor(**kwargs):
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(executor, functools.partial(context.run, func, **kwargs))
+
+        async def run_coalesced(**kwargs):
+            key = (func.__name__, json.dumps(kwargs, sort_keys=True, default=str))
+            return await coalesce.do(key, functools.partial(run_in_executor, **kwargs))
+
+        coroutine = run_coalesced if coalesce is not None else run_in_executor
+        return StructuredTool.from_function(func=func, coroutine=coroutine, name=func.__name__)
+
+    return decorator
+
+
 def get_langgraph_docs_retriever():
     """
     Create a retriever for LangGraph documentation.
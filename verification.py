@@ -0,0 +1,216 @@
+"""
+Customer identity lookup used by the verification step.
+
+Identifiers are resolved in tiers, cheapest and most precise first: an exact
+case-insensitive email match, an exact full-name match, and only then a
+trigram similarity ranking. A tier only verifies when it singles out one
+customer (for the ranking, by a clear margin over the runner-up), so a
+partial or shared name can never verify the wrong account.
+Successful lookups are kept in an LRU so repeat verifications skip the
+database, and in a ``VerifiedIdentityCache`` shared by every conversation
+thread and process using the same store.
+"""
+
+import hashlib
+import hmac
+import json
+import re
+import secrets
+import time
+from typing import Optional
+
+from langchain_core.stores import ByteStore
+from sqlalchemy.exc import DBAPIError
+
+from cache import LRUCache
+from database import QueryResult, fetch_rows
+from queries import CUSTOMER_BY_EMAIL, CUSTOMER_BY_FULL_NAME, CUSTOMER_BY_PATTERN, CUSTOMER_BY_SIMILARITY
+
+
+EMAIL_PATTERN = re.compile(r"[\w.+'-]+@[\w-]+(?:\.[\w-]+)+")
+
+_NAME_WORD = r"[^\W\d_][\w'-]*"
+# SQLSTATEs for a missing similarity()/% (undefined_function) or pg_trgm itself (undefined_object)
+_TRIGRAM_MISSING_CODES = frozenset({"42883", "42704"})
+
+# Words that end a lowercase name, as in "my name is luis goncalves and ..."
+_NAME_STOP = r"(?!(?:and|or|but|from|here|please|i|my|want|need|would)\b)"
+_CAPITALIZED_NAME = r"[^\W\d_a-z][\w'-]*(?:\s+[^\W\d_a-z][\w'-]*){1,2}"
+
+# Phrases that introduce a full name. Explicit "name is" phrasing accepts any
+# casing; looser openers like "I'm" only count when followed by capitalized words.
+NAME_PATTERNS = [
+    re.compile(rf"\bname\s*(?:is|:)\s+({_NAME_WORD}(?:\s+{_NAME_STOP}{_NAME_WORD}){{1,2}})", re.IGNORECASE),
+    re.compile(rf"\b(?:[Ii] am|[Ii]'m|[Tt]his is|[Ii]t's)\s+({_CAPITALIZED_NAME})"),
+    re.compile(rf"^\s*({_CAPITALIZED_NAME})\s*[.!]?\s*$"),
+]
+
+
+def extract_identifier(text: str) -> Optional[str]:
+    """Pull an email address or full name out of a user message.
+
+    Returns:
+        The first email address found, else a two- or three-word name
+        introduced by a phrase like "my name is", else ``None``.
+    """
+    match = EMAIL_PATTERN.search(text)
+    if match:
+        return match.group(0).rstrip(".")
+    for pattern in NAME_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return " ".join(match.group(1).split())
+    return None
+
+
+def normalize_identifier(identifier: str) -> str:
+    """Case- and whitespace-insensitive form of an email or name.
+
+    Uses ``str.lower`` rather than ``casefold`` to agree with Postgres ``lower()``.
+    """
+    return " ".join(identifier.split()).lower()
+
+
+def escape_like(text: str) -> str:
+    """Escape ``%``, ``_`` and the backslash so ``text`` matches literally in a LIKE pattern."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _trigram_missing(error: DBAPIError) -> bool:
+    """Whether ``error`` means pg_trgm is not installed, rather than a transient failure."""
+    code = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+    return code in _TRIGRAM_MISSING_CODES
+
+
+def _single_customer_id(result: QueryResult) -> Optional[int]:
+    """The customer ID if the result names exactly one customer."""
+    return result.first()[0] if len(result) == 1 else None
+
+
+class VerifiedIdentityCache:
+    """
+    Verified customer IDs kept in a key-value store shared across threads.
+
+    Keys are HMAC-SHA256 digests under a secret, so no email address or name
+    is written to the store in clear text, and the store alone is not enough
+    to test guesses against it.
+
+    Args:
+        store: Byte store holding the entries, e.g. ``config.store``.
+        secret: HMAC key shared by every process using the store. ``None``
+            uses a random key, so entries only help this instance.
+        ttl: Seconds a verification stays valid. ``None`` disables expiry.
+        namespace: Key prefix separating these entries from other store users.
+    """
+
+    def __init__(self, store: ByteStore, secret: Optional[bytes] = None, ttl: Optional[float] = 86400,
+                 namespace: str = "verified_identity"):
+        self.store = store
+        self.secret = secret or secrets.token_bytes(32)
+        self.ttl = ttl
+        self.namespace = namespace
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}/{hmac.new(self.secret, key.encode(), hashlib.sha256).hexdigest()}"
+
+    def get(self, key: str) -> Optional[int]:
+        """Return the customer ID verified for ``key``, if still valid."""
+        store_key = self._key(key)
+        raw = self.store.mget([store_key])[0]
+        if raw is None:
+            return None
+
+        entry = json.loads(raw)
+        if entry["expires_at"] and entry["expires_at"] < time.time():
+            self.store.mdelete([store_key])
+            return None
+        return entry["customer_id"]
+
+    def set(self, key: str, customer_id: int) -> None:
+        """Record that ``key`` verified as ``customer_id``."""
+        entry = {"customer_id": customer_id,
+                 "expires_at": time.time() + self.ttl if self.ttl else 0}
+        self.store.mset([(self._key(key), json.dumps(entry).encode())])
+
+    def invalidate(self, key: str) -> None:
+        """Forget a single verified key."""
+        self.store.mdelete([self._key(key)])
+
+
+class CustomerLookup:
+    """
+    Resolve an email address or full name to a customer ID.
+
+    Args:
+        cache: LRU holding recently verified identifiers.
+        min_similarity: Lowest trigram similarity accepted by the fuzzy tier.
+        min_margin: How much the best fuzzy match must out-score the
+            runner-up; closer scores are treated as ambiguous.
+        shared_cache: Verified identities shared across threads and processes,
+            consulted after the LRU and before the database.
+    """
+
+    def __init__(self, cache: Optional[LRUCache] = None, min_similarity: float = 0.6,
+                 shared_cache: Optional[VerifiedIdentityCache] = None, min_margin: float = 0.1):
+        self.cache = cache if cache is not None else LRUCache(maxsize=1024, ttl=900)
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.shared_cache = shared_cache
+        self._trigram_available = True
+
+    def find(self, identifier: str) -> Optional[int]:
+        """Return the matching customer ID, or ``None`` if no single customer matches."""
+        key = normalize_identifier(identifier)
+        if not key:
+            return None
+
+        customer_id = self.cache.get(key)
+        if customer_id is not None:
+            return customer_id
+
+        if self.shared_cache is not None:
+            customer_id = self.shared_cache.get(key)
+        if customer_id is None:
+            customer_id = self._lookup(key)
+            # Misses are not cached: the customer may sign up or fix a typo next turn
+            if customer_id is not None and self.shared_cache is not None:
+                self.shared_cache.set(key, customer_id)
+        if customer_id is not None:
+            self.cache.set(key, customer_id)
+        return customer_id
+
+    def invalidate(self, identifier: str) -> None:
+        """Forget a verified identifier in both cache tiers."""
+        key = normalize_identifier(identifier)
+        self.cache.invalidate(key)
+        if self.shared_cache is not None:
+            self.shared_cache.invalidate(key)
+
+    def _lookup(self, identifier: str) -> Optional[int]:
+        if "@" in identifier:
+            customer_id = _single_customer_id(fetch_rows(CUSTOMER_BY_EMAIL, {"email": identifier}))
+        else:
+            customer_id = _single_customer_id(fetch_rows(CUSTOMER_BY_FULL_NAME, {"full_name": identifier}))
+        if customer_id is not None:
+            return customer_id
+        return self._fuzzy_lookup(identifier)
+
+    def _fuzzy_lookup(self, identifier: str) -> Optional[int]:
+        if self._trigram_available:
+            try:
+                result = fetch_rows(CUSTOMER_BY_SIMILARITY, {"identifier": identifier,
+                                                             "min_similarity": self.min_similarity})
+            except DBAPIError as e:
+                if not _trigram_missing(e):
+                    raise
+                print(f"Trigram customer search unavailable ({e.orig}); "
+                      "run optimize_database.py to enable pg_trgm.")
+                self._trigram_available = False
+            else:
+                # Accept the best match only if it clearly beats the runner-up
+                if len(result) == 1 or (result and result.rows[0][1] - result.rows[1][1] >= self.min_margin):
+                    return result.first()[0]
+                return None
+
+        pattern = f"%{escape_like(identifier)}%"
+        return _single_customer_id(fetch_rows(CUSTOMER_BY_PATTERN, {"pattern": pattern}))
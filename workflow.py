@@ -1,11 +1,22 @@
-from typing import Literal
+import asyncio
+from typing import Literal, Optional
 from langchain_core.messages import AIMessage, HumanMessage
 from pydantic import BaseModel, Field
 from langgraph.graph import StateGraph, END
-from langchain_core.tools import tool
 
-from config import llm, checkpointer, db
+from config import (llm, uncached_llm, get_llm, LazyResource, checkpointer, embedding_function, llm_flight,
+                    ROUTE_CACHE_SIZE, ROUTE_CACHE_TTL, ROUTE_CACHE_SIMILARITY_THRESHOLD,
+                    INTENT_CONFIDENCE_THRESHOLD, INTENT_MIN_MARGIN, VERIFICATION_CACHE_SIZE,
+                    VERIFICATION_CACHE_TTL, VERIFICATION_MIN_SIMILARITY, VERIFICATION_MIN_MARGIN,
+                    VERIFIED_IDENTITY_TTL, VERIFIED_IDENTITY_SECRET,
+                    history_policy, store)
 from schemas import State, UserInput
+from history import build_llm_messages, create_summarize_node
+from routing import IntentClassifier, RouteCache, keyword_matcher
+from cache import LRUCache
+from database import sql_tool
+from llm_cache import ainvoke_coalesced
+from verification import CustomerLookup, VerifiedIdentityCache, extract_identifier
 from agents.invoice_agent import create_invoice_agent
 from agents.music_agent import create_music_agent_graph
 
@@ -21,121 +32,181 @@ class RouteQuery(BaseModel):
                     "'end' for greetings/farewells."
     )
 
-@tool
+# Verified customers shared by every thread, keyed on the hashed email or name
+verified_identities = VerifiedIdentityCache(store, secret=VERIFIED_IDENTITY_SECRET, ttl=VERIFIED_IDENTITY_TTL)
+
+# Tiered exact/fuzzy customer lookup with a cache of verified identifiers
+customer_lookup = CustomerLookup(cache=LRUCache(maxsize=VERIFICATION_CACHE_SIZE, ttl=VERIFICATION_CACHE_TTL),
+                                 min_similarity=VERIFICATION_MIN_SIMILARITY,
+                                 shared_cache=verified_identities,
+                                 min_margin=VERIFICATION_MIN_MARGIN)
+
+@sql_tool
 def verify_customer_identity(email_or_name: str) -> str:
     """Verify customer identity by email or name and return customer ID."""
     if not email_or_name or not email_or_name.strip():
         return "Please provide your email address or full name."
     
-    query = """
-        SELECT "CustomerId", "FirstName", "LastName", "Email"
-        FROM "Customer"
-        WHERE "Email" ILIKE %(identifier)s 
-        OR (CONCAT("FirstName", ' ', "LastName")) ILIKE %(identifier)s
-        LIMIT 1
-    """
-    
-    result = db.run(query, parameters={"identifier": f"%{email_or_name.strip()}%"})
+    customer_id = customer_lookup.find(email_or_name)
     
-    if result and result != "[]":
-        import json
-        customer_data = json.loads(result)[0]
-        return f"CUSTOMER_VERIFIED:{customer_data['CustomerId']}"
+    if customer_id is not None:
+        return f"CUSTOMER_VERIFIED:{customer_id}"
     
     return "Customer not found. Please check your email address or full name."
 
-structured_llm_router = llm.with_structured_output(RouteQuery)
-structured_llm_input = llm.with_structured_output(UserInput)
+# Bound on first use, so importing the graph does not build the LLM client
+structured_llm_router = LazyResource("structured_llm_router", lambda: get_llm().with_structured_output(RouteQuery))
+structured_llm_input = LazyResource("structured_llm_input",
+                                    lambda: get_llm(cache=False).with_structured_output(UserInput))
+
+# Cache of LLM routing decisions, keyed on message text with an embedding fallback
+route_cache = RouteCache(maxsize=ROUTE_CACHE_SIZE,
+                         ttl=ROUTE_CACHE_TTL,
+                         similarity_threshold=ROUTE_CACHE_SIMILARITY_THRESHOLD)
+
+# Zero-LLM routing tier over labelled example utterances
+intent_classifier = IntentClassifier(lambda texts: embedding_function.embed_documents(texts),
+                                     confidence_threshold=INTENT_CONFIDENCE_THRESHOLD,
+                                     min_margin=INTENT_MIN_MARGIN)
+
+
+async def _embed_route_text(text: str) -> Optional[list]:
+    """Embed a message for the local routing tiers without blocking the event loop."""
+    try:
+        # Resolve the embeddings in the worker too; the first use loads the model
+        return await asyncio.to_thread(lambda: embedding_function.embed_query(text))
+    except Exception:
+        return None
+
+
+def _resolve_destination(destination: str, state: State) -> str:
+    """Send invoice intents to verification until the customer is known."""
+    if destination in ("verify_customer", "invoice"):
+        return "invoice" if state.get("customer_id") else "verify_customer"
+    return destination
+
 
 async def router(state: State) -> Literal["verify_customer", "invoice", "music", "end"]:
     """Route user queries to appropriate handlers."""
-    last_message = state["messages"][-1].content.lower()
+    message_text = state["messages"][-1].content
+    keyword_intents = keyword_matcher.match(message_text)
     
     # Direct routing for invoice queries
-    invoice_keywords = ["invoice", "bill", "payment", "charge", "receipt", "purchase", "buy", "order"]
-    needs_invoice = any(keyword in last_message for keyword in invoice_keywords)
+    needs_invoice = "invoice" in keyword_intents
     
     if needs_invoice and not state.get("customer_id"):
         return "verify_customer"
     elif needs_invoice and state.get("customer_id"):
         return "invoice"
     
+    # Reuse earlier decisions for identical or near-identical messages
+    # (cached by message text only, so re-check the customer before invoice routes)
+    cached_destination = route_cache.get(message_text)
+    if cached_destination:
+        return _resolve_destination(cached_destination, state)
+
+    vector = await _embed_route_text(message_text)
+    if vector is not None:
+        # Classify locally and only escalate low-confidence turns
+        if not intent_classifier.fitted:
+            await asyncio.to_thread(intent_classifier.fit)
+        intent = intent_classifier.predict(vector)
+        if intent:
+            return _resolve_destination(intent, state)
+
+        cached_destination = route_cache.get_similar(vector)
+        if cached_destination:
+            return _resolve_destination(cached_destination, state)
+
     # Use LLM for other queries
     try:
-        route = await structured_llm_router.ainvoke([
+        route = await ainvoke_coalesced(structured_llm_router, [
             ("system", "Route user queries: 'music' for songs/artists/albums, 'end' for greetings/farewells."),
-            ("human", state["messages"][-1].content),
-        ])
+            ("human", message_text),
+        ], "router", llm_flight)
         
         if isinstance(route, AIMessage) and route.tool_calls:
-            return route.tool_calls[0]['args']['destination']
+            destination = route.tool_calls[0]['args']['destination']
+            route_cache.put(message_text, destination, vector)
+            return _resolve_destination(destination, state)
         elif hasattr(route, 'destination'):
-            return route.destination
+            route_cache.put(message_text, route.destination, vector)
+            return _resolve_destination(route.destination, state)
         else:
             # Fallback routing
-            music_keywords = ["music", "song", "artist", "album", "band", "track"]
-            if any(keyword in last_message for keyword in music_keywords):
-                return "music"
-            return "end"
+            return "music" if "music" in keyword_intents else "end"
     except Exception:
         # Fallback routing on error
-        music_keywords = ["music", "song", "artist", "album", "band", "track"]
-        if any(keyword in last_message for keyword in music_keywords):
-            return "music"
-        return "end"
+        return "music" if "music" in keyword_intents else "end"
 
-async def customer_verification(state: State) -> dict:
-    """Handle customer identity verification for invoice queries."""
-    verification_prompt = """You are a customer service agent. The user needs invoice information but must be verified first.
+VERIFICATION_PROMPT = """You are a customer service agent. The user needs invoice information but must be verified first.
 
 Ask for their email address or full name politely. If they provide it, use the verify_customer_identity tool to look them up."""
 
-    messages = [
-        ("system", verification_prompt),
-        *[(msg.type, msg.content) for msg in state["messages"]]
-    ]
-    
-    tools = [verify_customer_identity]
-    llm_with_tools = llm.bind_tools(tools)
+VERIFIED_MESSAGE = "Great! I found your account. How can I help you with your invoices?"
+
+llm_with_verification_tools = LazyResource("llm_with_verification_tools",
+                                           lambda: get_llm(cache=False).bind_tools([verify_customer_identity]))
+
+
+async def _verify(identifier: str) -> Optional[str]:
+    """Run the verification tool and return the customer ID if it matched."""
+    tool_result = await verify_customer_identity.ainvoke({"email_or_name": identifier})
+    if tool_result.startswith("CUSTOMER_VERIFIED:"):
+        return tool_result.split(":")[1]
+    return None
+
+
+async def customer_verification(state: State) -> dict:
+    """Handle customer identity verification for invoice queries."""
+    # Most users state their email or name outright; look it up without an LLM call
+    last_message = state["messages"][-1] if state["messages"] else None
+    if isinstance(last_message, HumanMessage):
+        identifier = extract_identifier(last_message.content)
+        if identifier:
+            customer_id = await _verify(identifier)
+            if customer_id:
+                return {"customer_id": customer_id, "messages": [AIMessage(content=VERIFIED_MESSAGE)]}
+
+    messages = [(msg.type, msg.content)
+                for msg in build_llm_messages(state, VERIFICATION_PROMPT, history_policy)]
     
-    response = await llm_with_tools.ainvoke(messages)
+    response = await llm_with_verification_tools.ainvoke(messages)
     
     updated_state = {"messages": [response]}
     
     # Only process tool calls if they exist
     if hasattr(response, 'tool_calls') and response.tool_calls:
-        tool_result = verify_customer_identity.invoke({
-            "email_or_name": response.tool_calls[0]["args"]["email_or_name"]
-        })
+        customer_id = await _verify(response.tool_calls[0]["args"]["email_or_name"])
         
-        if tool_result.startswith("CUSTOMER_VERIFIED:"):
-            customer_id = tool_result.split(":")[1]
+        if customer_id:
             updated_state["customer_id"] = customer_id
-            success_msg = AIMessage(content="Great! I found your account. How can I help you with your invoices?")
-            updated_state["messages"] = [success_msg]
+            updated_state["messages"] = [AIMessage(content=VERIFIED_MESSAGE)]
     
     return updated_state
 
 async def final_answer(state: State) -> dict:
     """Generate responses for simple queries."""
-    response = await llm.ainvoke([
+    response = await ainvoke_coalesced(llm, [
         ("system", "You are a friendly customer support assistant. Keep responses brief and helpful."),
         ("human", state["messages"][-1].content)
-    ])
+    ], "final_answer", llm_flight)
     return {"messages": [response]}
 
 # Build workflow
 workflow = StateGraph(State)
 
 # Add nodes
+workflow.add_node("summarize_history", create_summarize_node(uncached_llm, history_policy))
 workflow.add_node("verify_customer", customer_verification)
 workflow.add_node("invoice_agent", invoice_agent_runnable)
 workflow.add_node("music_agent", music_agent_runnable)
 workflow.add_node("final_answer", final_answer)
 
-# Routing from start
+# Compact long histories, then route
+workflow.add_edge("__start__", "summarize_history")
 workflow.add_conditional_edges(
-    "__start__",
+    "summarize_history",
     router,
     {
         "verify_customer": "verify_customer",